@@ -1,6 +1,7 @@
 #!/usr/bin/python
 # (Generated by Acceldata Inc.)
 
+import os
 import sys
 import json
 try:
@@ -217,27 +218,105 @@ def printStyleSheet():
 	printLine('}')
 	printLine('</style>')
 
-def runUsingPyCurl(url, username, password):
+# Ambari answers a Basic-auth request with an AMBARISESSIONID cookie; sending that cookie instead
+# of the credentials saves an LDAP bind per request. Cookies are kept per Ambari server and user,
+# and also shared with other runs/tools through $AMBARI_SESSION_FILE when that is set.
+SESSION_COOKIE = 'AMBARISESSIONID'
+sessionCookies = {}
+
+
+def sessionKey(url, username):
+    return url.split('/api/', 1)[0] + '|' + username
+
+
+def loadSessionFile():
+    path = os.environ.get('AMBARI_SESSION_FILE')
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def rememberSessionCookie(key, cookie):
+    sessionCookies[key] = cookie
+    path = os.environ.get('AMBARI_SESSION_FILE')
+    if not path:
+        return
+    sessions = loadSessionFile()
+    sessions[key] = {'cookie': cookie, 'saved_at': int(time.time())}
+    tmp = '%s.tmp.%d' % (path, os.getpid())
+    try:
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump(sessions, f, indent=1, sort_keys=True)
+        os.rename(tmp, path)
+    except (IOError, OSError) as e:
+        sys.stderr.write("Could not save Ambari session to '%s': %s\n" % (path, e))
+
+
+def knownSessionCookie(key):
+    if key not in sessionCookies:
+        sessionCookies[key] = (loadSessionFile().get(key) or {}).get('cookie')
+    return sessionCookies[key]
+
+
+def curlGet(url, username, password, cookie):
+    """(HTTP code, body, AMBARISESSIONID set by the server or None) using pycurl."""
     c = pycurl.Curl()
     c.setopt(pycurl.URL, url)
     s = StringIO()
     c.setopt(c.WRITEFUNCTION, s.write)
-    c.setopt(pycurl.USERPWD, (username + ':' + password))
+    newCookie = []
+
+    def readHeader(line):
+        if not isinstance(line, str):
+            line = line.decode('iso-8859-1')
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'set-cookie' and value.strip().startswith(SESSION_COOKIE + '='):
+            newCookie.append(value.strip().split(';', 1)[0].split('=', 1)[1])
+
+    c.setopt(pycurl.HEADERFUNCTION, readHeader)
+    if cookie:
+        c.setopt(pycurl.COOKIE, SESSION_COOKIE + '=' + cookie)
+    else:
+        c.setopt(pycurl.USERPWD, (username + ':' + password))
     # Disable certificate verification for testing
     c.setopt(pycurl.SSL_VERIFYPEER, 0)
     c.setopt(pycurl.SSL_VERIFYHOST, 0)
     c.perform()
-    response = c.getinfo(pycurl.HTTP_CODE)
+    return c.getinfo(pycurl.HTTP_CODE), s.getvalue(), (newCookie or [None])[-1]
+
+
+def runUsingPyCurl(url, username, password):
+    key = sessionKey(url, username)
+    cookie = knownSessionCookie(key)
+    if cookie:
+        response, body, _ = curlGet(url, username, password, cookie)
+    if not cookie or response in (401, 403):
+        # no session yet, or it expired: log in with the credentials and keep the new cookie
+        response, body, cookie = curlGet(url, username, password, None)
+        if cookie:
+            rememberSessionCookie(key, cookie)
     if response != 200:
         errorString = "Error executing the URL: '%s' for the username: '%s'\n" % (url, username)
         sys.stderr.write(errorString)
         sys.exit(2)
-    return s.getvalue()
+    return body
 
 
 def runUsingRequests(url, username, password):
-    # allow skipping SSL verification
-    r = requests.get(url, auth=(username, password), verify=False)
+    key = sessionKey(url, username)
+    cookie = knownSessionCookie(key)
+    if cookie:
+        # allow skipping SSL verification
+        r = requests.get(url, cookies={SESSION_COOKIE: cookie}, verify=False)
+    if not cookie or r.status_code in (401, 403):
+        # no session yet, or it expired: log in with the credentials and keep the new cookie
+        r = requests.get(url, auth=(username, password), verify=False)
+        if r.cookies.get(SESSION_COOKIE):
+            rememberSessionCookie(key, r.cookies.get(SESSION_COOKIE))
     if r.status_code != 200:
         errorString = "Error executing the URL: '%s' for the username: '%s'\n" % (url, username)
         sys.stderr.write(errorString)
@@ -1,87 +1,929 @@
-import os
-import requests
+#!/usr/bin/env python3
+"""
+Wrapper around the Ambari REST API.
+
+ambari.cfg is read when a command runs (not at import). Every [ambari] or [ambari:<name>] section
+describes one cluster; --cluster picks which ones to act on, and all selected clusters are handled
+concurrently by one asyncio event loop. Blocking HTTP calls run in worker threads
+(asyncio.to_thread), so the loop itself never waits on the network.
+"""
+import argparse
+import asyncio
+import configparser
+import difflib
 import json
+import os
+import sqlite3
+import sys
+import threading
+import time
 from base64 import b64encode
-import argparse
-import ConfigParser
-
-def get_ambari_credentials():
-    """Get the Ambari credentials from the configuration file."""
-    config = ConfigParser.ConfigParser()
-    if not os.path.exists("ambari.cfg"):
-            return "nil","nil","nil","nil","nil","nil"
-    config.read("ambari.cfg")
-
-    hostname = config.get("ambari", "hostname")
-    port = config.get("ambari", "port")
-    username = config.get("ambari", "username")
-    password = config.get("ambari", "password")
-    cluster_name = config.get("ambari", "cluster_name")
-    httpss = config.get("ambari", "httpss")
-    return hostname, port, username, password, cluster_name, httpss
+
+import requests
+
+CONFIG_FILE = "ambari.cfg"
+CONFIG_SECTION = "ambari"
+PLACEHOLDER_HOSTNAME = "ambari.server.hostname"
+SESSION_COOKIE = "AMBARISESSIONID"
+
+
+class AmbariError(Exception):
+    """An Ambari call or a command failed for one cluster; other clusters keep running."""
+
 
 def basic_auth(username, password):
     token = b64encode("{0}:{1}".format(username, password).encode('utf-8')).decode("ascii")
     return 'Basic {0}'.format(token)
 
-hostname, port, username, password, cluster_name, httpss = get_ambari_credentials()
 
-url = "{0}://{1}:{2}/api/v1/clusters/{3}/request_schedules".format(httpss, hostname, port, cluster_name)
+def load_sessions(path):
+    """{"<base_url>|<username>": {"cookie": ..., "saved_at": ...}} from the shared session file; {} if unreadable."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
 
-headers = {
-    "Authorization": basic_auth(username, password),
-    "X-Requested-By": "ambari",
-}
 
-def stop_rolling_restart():
-    response = requests.get(url, headers=headers)
-    print "response:", response
+def save_session(path, key, cookie):
+    """Store one session cookie in the shared session file (mode 0600, replaced atomically)."""
+    sessions = load_sessions(path)
+    sessions[key] = {"cookie": cookie, "saved_at": int(time.time())}
+    tmp = "{0}.tmp.{1}".format(path, os.getpid())
+    try:
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(sessions, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as exc:
+        print("could not save Ambari session to {0}: {1}".format(path, exc), file=sys.stderr)
+
+
+class Ambari:
+    """Connection details and HTTP helpers for one Ambari cluster.
+
+    Credentials are sent once; after that requests carry the AMBARISESSIONID cookie Ambari
+    returned (with LDAP, every Basic-auth request is a directory bind). When the session has
+    expired (401/403) the request is repeated with credentials and the new cookie kept. With
+    session_file, the cookie is also shared with other processes (see generate_auth_token.py).
+    """
+
+    def __init__(self, name, httpss, hostname, port, username, password, cluster_name):
+        self.name = name
+        self.hostname = hostname
+        self.cluster_name = cluster_name
+        self.base_url = "{0}://{1}:{2}".format(httpss, hostname, port)
+        self.api_url = self.base_url + "/api/v1"
+        self.cluster_url = "{0}/clusters/{1}".format(self.api_url, cluster_name)
+        self.schedules_url = self.cluster_url + "/request_schedules"
+        self.prefix = ""
+        self.authorization = basic_auth(username, password)
+        self.session_key = "{0}|{1}".format(self.base_url, username)
+        self.session_file = None
+        self.login_lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers.update({"X-Requested-By": "ambari"})
+
+    def use_session_file(self, path):
+        """Start from the cookie another process saved in path, and save renewed cookies there."""
+        self.session_file = path
+        entry = load_sessions(path).get(self.session_key) or {}
+        if entry.get("cookie"):
+            self.session.cookies.set(SESSION_COOKIE, entry["cookie"])
+
+    def session_cookie(self):
+        return next((c.value for c in self.session.cookies if c.name == SESSION_COOKIE), None)
+
+    def echo(self, message=""):
+        for line in str(message).splitlines() or [""]:
+            print(self.prefix + line)
+
+    def request(self, method, url, body=None):
+        data = json.dumps(body) if body is not None else None
+        cookie = self.session_cookie()
+        if cookie:
+            response = self.session.request(method, url, data=data)
+            if response.status_code not in (401, 403):
+                return response
+        with self.login_lock:
+            if self.session_cookie() not in (None, cookie):
+                # another thread logged in meanwhile
+                return self.session.request(method, url, data=data)
+            self.session.cookies.clear()
+            response = self.session.request(method, url, data=data, headers={"Authorization": self.authorization})
+            new_cookie = self.session_cookie()
+            if new_cookie and self.session_file:
+                save_session(self.session_file, self.session_key, new_cookie)
+        return response
+
+    def get_json(self, url):
+        """GET an Ambari API URL and return the decoded JSON; raise AmbariError on any non-200 answer."""
+        response = self.request("GET", url)
+        if response.status_code != 200:
+            raise AmbariError("GET {0} failed: HTTP {1}".format(url, response.status_code))
+        return response.json()
+
+    async def arequest(self, method, url, body=None):
+        return await asyncio.to_thread(self.request, method, url, body)
+
+    async def aget(self, url):
+        return await asyncio.to_thread(self.get_json, url)
+
+
+def find_config_file(path=None):
+    """--config, else ambari.cfg in the current directory, else next to this script."""
+    if path:
+        return path
+    if os.path.exists(CONFIG_FILE):
+        return CONFIG_FILE
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), CONFIG_FILE)
+
+
+def load_clusters(path):
+    """Read every [ambari] / [ambari:<name>] section: {name: Ambari}. [ambari] is named "default"."""
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise AmbariError("{0} does not exist".format(path))
+
+    clusters = {}
+    for section in config.sections():
+        if section == CONFIG_SECTION:
+            name = "default"
+        elif section.startswith(CONFIG_SECTION + ":"):
+            name = section.split(":", 1)[1].strip()
+        else:
+            continue
+        get = lambda key: config.get(section, key)
+        clusters[name] = Ambari(name, get("httpss"), get("hostname"), get("port"), get("username"),
+                                get("password"), get("cluster_name"))
+    if not clusters:
+        raise AmbariError("{0} has no [ambari] or [ambari:<name>] section".format(path))
+    return clusters
+
+
+def select_clusters(clusters, selection):
+    """--cluster value -> list of Ambari; default is the [ambari] section, or the only one there is."""
+    if not selection:
+        if "default" in clusters:
+            return [clusters["default"]]
+        if len(clusters) == 1:
+            return list(clusters.values())
+        raise AmbariError("several clusters configured ({0}); pick with --cluster".format(", ".join(sorted(clusters))))
+    if selection == "all":
+        return [clusters[name] for name in sorted(clusters)]
+    names = [n.strip() for n in selection.split(",") if n.strip()]
+    unknown = [n for n in names if n not in clusters]
+    if unknown:
+        raise AmbariError("unknown cluster(s) {0}; configured: {1}".format(", ".join(unknown), ", ".join(sorted(clusters))))
+    return [clusters[n] for n in names]
+
+
+async def stop_rolling_restart(amb, args):
+    response = await amb.arequest("GET", amb.schedules_url)
+    amb.echo("response: {0}".format(response))
 
     if response.status_code == 200:
         json_data = response.json()
         lst = json_data["items"]
-        url_det = url + "/" + str(lst[-1]['RequestSchedule']['id'])
-        response = requests.get(url_det, headers=headers)
-        json_data = response.json()
+        if not lst:
+            amb.echo("No request schedules found")
+            return 0
+        url_det = amb.schedules_url + "/" + str(lst[-1]['RequestSchedule']['id'])
+        json_data = await amb.aget(url_det)
         temp = json_data["RequestSchedule"]["batch"]["batch_requests"][0]['request_body']
         data = json.loads(temp)
-        print ":::::::::::::::::::::  STOPPING THE BELOW SERVICE ROLLING RESTART AND SUBSEQUENT BATCHES :::::::::::::::::::: \n", data["Requests/resource_filters"][0]["component_name"]
-        resp = requests.delete(url_det, headers=headers)
+        amb.echo(":::::::::::::::::::::  STOPPING THE BELOW SERVICE ROLLING RESTART AND SUBSEQUENT BATCHES :::::::::::::::::::: ")
+        amb.echo(data["Requests/resource_filters"][0].get("component_name", ""))
+        resp = await amb.arequest("DELETE", url_det)
         if resp.status_code == 200:
-            print "::::::::::::::::::::: STOPPED SUCCESSFULLY ::::::::::::::::::::"
+            amb.echo("::::::::::::::::::::: STOPPED SUCCESSFULLY ::::::::::::::::::::")
+            return 0
+        return 1
+    amb.echo(response.text)
+    return 1
+
+
+# ---------------------------------------------------------------------------
+# Batch executor: plan file (YAML/JSON) -> one request_schedule
+# ---------------------------------------------------------------------------
+
+# Service checks whose command is not simply "<SERVICE>_SERVICE_CHECK".
+SERVICE_CHECK_COMMANDS = {
+    "ZOOKEEPER": "ZOOKEEPER_QUORUM_SERVICE_CHECK",
+}
+
+TERMINAL_REQUEST_STATUSES = ("COMPLETED", "FAILED", "ABORTED", "TIMEDOUT", "SKIPPED_FAILED")
+
+
+def service_check_command(service):
+    return SERVICE_CHECK_COMMANDS.get(service, "{0}_SERVICE_CHECK".format(service))
+
+
+def load_plan(path):
+    """Load a batch plan from a .yaml/.yml or .json file."""
+    with open(path) as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise AmbariError("PyYAML is required for YAML plans (pip install pyyaml), or use a .json plan")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+async def get_component_hosts(amb, service, component):
+    """Return the host names that run service/component."""
+    data = await amb.aget("{0}/services/{1}/components/{2}?fields=host_components/HostRoles/host_name".format(
+        amb.cluster_url, service, component))
+    return sorted(hc["HostRoles"]["host_name"] for hc in data.get("host_components", []))
+
+
+async def plan_action_requests(amb, action, parallelism):
+    """Expand one plan action into (type, uri, RequestBodyInfo) tuples, in execution order."""
+    kind = action["action"]
+    service = action["service"]
+    component = action.get("component")
+    requests_uri = "/api/v1/clusters/{0}/requests".format(amb.cluster_name)
+
+    if kind == "service_check":
+        command = service_check_command(service)
+        body = {
+            "RequestInfo": {"context": action.get("context", "{0} Service Check".format(service)), "command": command},
+            "Requests/resource_filters": [{"service_name": service}],
+        }
+        return [("POST", requests_uri, body)]
+
+    if kind == "restart":
+        if not component:
+            raise AmbariError("restart action for {0} needs a component".format(service))
+        hosts = action.get("hosts") or await get_component_hosts(amb, service, component)
+        if not hosts:
+            amb.echo("WARN: no hosts run {0}/{1}; skipping restart".format(service, component))
+            return []
+        size = int(action.get("parallelism", parallelism))
+        chunks = [hosts[i:i + size] for i in range(0, len(hosts), size)]
+        out = []
+        for n, chunk in enumerate(chunks, 1):
+            body = {
+                "RequestInfo": {
+                    "context": "Restart {0} ({1} of {2})".format(component, n, len(chunks)),
+                    "command": "RESTART",
+                },
+                "Requests/resource_filters": [
+                    {"service_name": service, "component_name": component, "hosts": ",".join(chunk)}
+                ],
+            }
+            out.append(("POST", requests_uri, body))
+        return out
+
+    if kind in ("maintenance_on", "maintenance_off"):
+        state = "ON" if kind == "maintenance_on" else "OFF"
+        context = "Turn {0} Maintenance Mode for {1}".format(state, service)
+        if action.get("hosts"):
+            return [("PUT", "/api/v1/clusters/{0}/hosts/{1}".format(amb.cluster_name, h),
+                     {"RequestInfo": {"context": context + " on " + h},
+                      "Body": {"Hosts": {"maintenance_state": state}}})
+                    for h in action["hosts"]]
+        return [("PUT", "/api/v1/clusters/{0}/services/{1}".format(amb.cluster_name, service),
+                 {"RequestInfo": {"context": context},
+                  "Body": {"ServiceInfo": {"maintenance_state": state}}})]
+
+    raise AmbariError("Unknown action '{0}' (expected service_check, restart, maintenance_on, maintenance_off)".format(kind))
+
+
+async def build_request_schedule(amb, plan):
+    """Turn a plan dict into the request_schedules POST payload."""
+    settings = plan.get("batch") or {}
+    parallelism = int(settings.get("parallelism", 1))
+    if parallelism < 1:
+        raise AmbariError("batch.parallelism must be >= 1")
+
+    batch_requests = []
+    for action in plan.get("actions") or []:
+        for req_type, uri, body in await plan_action_requests(amb, action, parallelism):
+            batch_requests.append({
+                "order_id": len(batch_requests) + 1,
+                "type": req_type,
+                "uri": uri,
+                "RequestBodyInfo": body,
+            })
+    if not batch_requests:
+        raise AmbariError("Plan produced no requests")
+
+    total = len(batch_requests)
+    for req in batch_requests:
+        info = req["RequestBodyInfo"]["RequestInfo"]
+        info["context"] = "{0} (batch {1} of {2})".format(info["context"], req["order_id"], total)
+
+    return [{
+        "RequestSchedule": {
+            "batch": [
+                {"requests": batch_requests},
+                {"batch_settings": {
+                    "batch_separation_in_seconds": int(settings.get("separation_seconds", 1)),
+                    "task_failure_tolerance": int(settings.get("tolerance", 1)),
+                }},
+            ]
+        }
+    }]
+
+
+async def stream_request_schedule(amb, schedule_id, poll_interval):
+    """Print each batch request as its status changes until the schedule finishes."""
+    url_det = amb.schedules_url + "/" + str(schedule_id)
+    seen = {}
+    while True:
+        schedule = (await amb.aget(url_det))["RequestSchedule"]
+        batch_requests = schedule["batch"]["batch_requests"]
+        for req in sorted(batch_requests, key=lambda r: r["order_id"]):
+            status = req.get("request_status") or "PENDING"
+            if seen.get(req["order_id"]) != status:
+                seen[req["order_id"]] = status
+                context = json.loads(req.get("request_body") or "{}").get("RequestInfo", {}).get("context", req["request_uri"])
+                amb.echo("[{0}/{1}] {2:<15} request_id={3} {4}".format(
+                    req["order_id"], len(batch_requests), status, req.get("request_id", "-"), context))
+
+        finished = all(seen.get(r["order_id"]) in TERMINAL_REQUEST_STATUSES for r in batch_requests)
+        if finished or schedule.get("status") == "COMPLETED":
+            failed = [r for r in batch_requests if seen.get(r["order_id"]) != "COMPLETED"]
+            amb.echo("::::::::::::::::::::: BATCH {0}: {1} of {2} requests completed ::::::::::::::::::::".format(
+                schedule_id, len(batch_requests) - len(failed), len(batch_requests)))
+            return 1 if failed else 0
+        await asyncio.sleep(poll_interval)
+
+
+async def run_batch(amb, args):
+    if not args.plan:
+        raise AmbariError("batch needs --plan <file.yaml|file.json>")
+    payload = await build_request_schedule(amb, load_plan(args.plan))
+    if args.dry_run:
+        amb.echo(json.dumps(payload, indent=2))
+        return 0
+
+    response = await amb.arequest("POST", amb.schedules_url, payload)
+    if response.status_code not in (200, 201, 202):
+        amb.echo("request_schedules POST failed: HTTP {0}\n{1}".format(response.status_code, response.text))
+        return 1
+    schedule_id = response.json()["resources"][0]["RequestSchedule"]["id"]
+    amb.echo("::::::::::::::::::::: SUBMITTED REQUEST SCHEDULE {0} ::::::::::::::::::::".format(schedule_id))
+    if args.no_wait:
+        return 0
+    return await stream_request_schedule(amb, schedule_id, args.poll_interval)
+
+
+# ---------------------------------------------------------------------------
+# Service checks: discover, order by role_command_order.json, run concurrently
+# ---------------------------------------------------------------------------
+
+DEFAULT_STACKS_DIR = "/var/lib/ambari-server/resources/stacks"
+
+
+async def get_cluster_stack(amb):
+    """Return (stack_name, stack_version) of the cluster, e.g. ("ODP", "3.3")."""
+    version = (await amb.aget(amb.cluster_url + "?fields=Clusters/version"))["Clusters"]["version"]
+    stack_name, _, stack_version = version.partition("-")
+    return stack_name, stack_version
+
+
+async def discover_service_check_services(amb, stack_name, stack_version):
+    """Installed services whose stack definition supports a service check."""
+    installed_data, stack_data = await asyncio.gather(
+        amb.aget(amb.cluster_url + "/services?fields=ServiceInfo/service_name"),
+        amb.aget("{0}/stacks/{1}/versions/{2}/services?fields=StackServices/service_check_supported".format(
+            amb.api_url, stack_name, stack_version)))
+    installed = sorted(item["ServiceInfo"]["service_name"] for item in installed_data["items"])
+    supported = {item["StackServices"]["service_name"] for item in stack_data["items"]
+                 if item["StackServices"].get("service_check_supported")}
+    return [service for service in installed if service in supported]
+
+
+def load_service_check_deps(amb, path, commands):
+    """Map each check command to the check commands it must wait for.
+
+    Only SERVICE_CHECK -> SERVICE_CHECK edges between the selected checks are kept: services are
+    already started, so component START blockers do not apply. All sections are merged
+    (general_deps plus the optional HA/glusterfs ones), which can only add ordering, never drop it.
+    """
+    deps = {command: set() for command in commands}
+    if not path or not os.path.exists(path):
+        amb.echo("WARN: role_command_order.json not found ({0}); running all checks without ordering".format(path))
+        return deps
+    with open(path) as f:
+        order = json.load(f)
+    suffix = "-SERVICE_CHECK"
+    for records in order.values():
+        if not isinstance(records, dict):
+            continue
+        for blocked, blockers in records.items():
+            role = blocked[:-len(suffix)] if blocked.endswith(suffix) else None
+            if role not in deps:
+                continue
+            for blocker in blockers:
+                if blocker.endswith(suffix) and blocker[:-len(suffix)] in deps:
+                    deps[role].add(blocker[:-len(suffix)])
+    return deps
+
+
+async def submit_service_check(amb, service, command):
+    body = {
+        "RequestInfo": {"context": "{0} Service Check (ambari-api)".format(service), "command": command},
+        "Requests/resource_filters": [{"service_name": service}],
+    }
+    response = await amb.arequest("POST", amb.cluster_url + "/requests", body)
+    if response.status_code not in (200, 201, 202):
+        amb.echo("WARN: {0} could not be submitted: HTTP {1}".format(command, response.status_code))
+        return None
+    return response.json()["Requests"]["id"]
+
+
+async def poll_requests(amb, request_ids):
+    """One GET for every in-flight request: {request_id: Requests dict}."""
+    data = await amb.aget("{0}/requests?Requests/id.in({1})&fields=Requests/id,Requests/request_status,"
+                          "Requests/start_time,Requests/end_time".format(
+                              amb.cluster_url, ",".join(str(r) for r in request_ids)))
+    return {item["Requests"]["id"]: item["Requests"] for item in data.get("items", [])}
+
+
+def print_service_check_table(amb, services, results, wall_seconds):
+    amb.echo("{0:<22} {1:<8} {2:>9}  {3}".format("SERVICE", "RESULT", "DURATION", "REQUEST / NOTE"))
+    total = 0
+    for service in services:
+        res = results[service_check_command(service)]
+        if res["status"] == "COMPLETED":
+            label = "PASS"
+        elif res["status"] == "SKIPPED":
+            label = "SKIP"
+        else:
+            label = "FAIL"
+        duration = "-"
+        if res.get("start") is not None and res.get("end") and res["end"] > res["start"] >= 0:
+            seconds = (res["end"] - res["start"]) / 1000.0
+            total += seconds
+            duration = "{0:.0f}s".format(seconds)
+        note = res.get("note") or res.get("request_id") or ""
+        amb.echo("{0:<22} {1:<8} {2:>9}  {3}".format(service, label, duration, note))
+    amb.echo("Wall time: {0:.0f}s (sum of individual checks: {1:.0f}s)".format(wall_seconds, total))
+
+
+async def run_service_checks(amb, args):
+    stack_name, stack_version = await get_cluster_stack(amb)
+    if args.services:
+        services = [s.strip().upper() for s in args.services.split(",") if s.strip()]
     else:
-        print response.content
+        services = await discover_service_check_services(amb, stack_name, stack_version)
+    excluded = {s.strip().upper() for s in (args.exclude or "").split(",") if s.strip()}
+    services = [s for s in services if s not in excluded]
+    if not services:
+        amb.echo("No services to check")
+        return 1
 
+    checks = {service_check_command(s): s for s in services}
+    rco_path = args.role_command_order or os.path.join(
+        DEFAULT_STACKS_DIR, stack_name, stack_version, "role_command_order.json")
+    deps = load_service_check_deps(amb, rco_path, checks)
+    for command in sorted(checks):
+        after = ", ".join(sorted(checks[d] for d in deps[command]))
+        amb.echo("  {0:<22} {1}".format(checks[command], ("after " + after) if after else "(no dependencies)"))
+    if args.dry_run:
+        return 0
 
-def main():
-    parser = argparse.ArgumentParser(description='Wrapper for script.py')
-    parser.add_argument('function', choices=['stop-rolling-restart', 'func2', 'func3'], help='Specify the function to run')
-    args = parser.parse_args()
+    results = {}
+    pending = set(checks)
+    running = {}  # request_id -> command
+    started = time.time()
+    while pending or running:
+        for command in sorted(pending):
+            if len(running) >= args.max_parallel:
+                break
+            if [d for d in deps[command] if d in pending or d in running.values()]:
+                continue
+            pending.discard(command)
+            failed = sorted(checks[d] for d in deps[command] if d in results and results[d]["status"] != "COMPLETED")
+            if failed:
+                results[command] = {"status": "SKIPPED", "note": "dependency failed: " + ", ".join(failed)}
+                continue
+            request_id = await submit_service_check(amb, checks[command], command)
+            if request_id is None:
+                results[command] = {"status": "FAILED", "note": "submit failed"}
+                continue
+            amb.echo("submitted {0} (request {1})".format(checks[command], request_id))
+            running[request_id] = command
 
-    if hostname == "nil":
-        print "ambari.cfg does not exist"
-        return
+        if not running:
+            if pending:
+                # Nothing in flight yet nothing submittable: a dependency cycle. Break it at one check.
+                command = min(pending)
+                amb.echo("WARN: dependency cycle around {0}; running it without ordering".format(checks[command]))
+                deps[command] = {d for d in deps[command] if d not in pending}
+            continue
+        await asyncio.sleep(args.poll_interval)
+        for request_id, info in (await poll_requests(amb, running.keys())).items():
+            status = info.get("request_status")
+            if request_id in running and status in TERMINAL_REQUEST_STATUSES:
+                command = running.pop(request_id)
+                results[command] = {"status": status, "request_id": request_id,
+                                    "start": info.get("start_time"), "end": info.get("end_time")}
+                amb.echo("{0} finished: {1}".format(checks[command], status))
 
-    #check ambari-config
-    if hostname == "ambari.server.hostname":
-        print "edit ambari.cfg first with proper details"
-        return
+    print_service_check_table(amb, sorted(services), results, time.time() - started)
+    return 0 if all(r["status"] == "COMPLETED" for r in results.values()) else 1
+
+
+# ---------------------------------------------------------------------------
+# Inventory: paged, parallel /hosts + /host_components -> cached JSON (+ SQLite)
+# ---------------------------------------------------------------------------
+
+HOST_FIELDS = ("Hosts/host_name,Hosts/ip,Hosts/rack_info,Hosts/cpu_count,Hosts/total_mem,"
+               "Hosts/os_type,Hosts/host_state,Hosts/maintenance_state")
+HOST_COMPONENT_FIELDS = "HostRoles/host_name,HostRoles/service_name,HostRoles/component_name,HostRoles/state"
 
-    # Call the appropriate function based on the input
-    if args.function == 'stop-rolling-restart':
-        stop_rolling_restart()
 
-    # NOTE: if more functions are added use below statements and change accordingly in choices above
+async def fetch_collections(amb, collections, page_size, workers):
+    """Fetch every item of several paged collections.
 
-    # elif args.function == 'func2':
-    #     func2()
+    collections maps a name to (collection_url, fields). The first page of each collection is
+    fetched concurrently; its itemTotal gives the remaining offsets, which are then fetched in
+    one more concurrent round, at most `workers` requests at a time. Returns {name: [items]}.
+    """
+    limit = asyncio.Semaphore(workers)
 
-    # elif args.function == 'func3':
-    #     func3()
+    def page_url(name, start):
+        collection_url, fields = collections[name]
+        sep = "&" if "?" in collection_url else "?"
+        return "{0}{1}fields={2}&page_size={3}&from={4}".format(collection_url, sep, fields, page_size, start)
 
+    async def fetch(name, start):
+        async with limit:
+            return await amb.aget(page_url(name, start))
+
+    names = sorted(collections)
+    firsts = await asyncio.gather(*(fetch(name, 0) for name in names))
+    items = {}
+    todo = []
+    for name, first in zip(names, firsts):
+        items[name] = list(first.get("items", []))
+        total = first.get("itemTotal")
+        if total is not None:
+            todo.extend((name, start) for start in range(page_size, int(total), page_size))
+            continue
+        # No itemTotal in this Ambari version: walk the pages until a short one.
+        page = items[name]
+        while len(page) == page_size:
+            page = (await fetch(name, len(items[name]))).get("items", [])
+            items[name].extend(page)
+    pages = await asyncio.gather(*(fetch(name, start) for name, start in todo))
+    for (name, _), page in zip(todo, pages):
+        items[name].extend(page.get("items", []))
+    return items
+
+
+async def build_inventory(amb, page_size, workers):
+    items = await fetch_collections(amb, {
+        "hosts": (amb.cluster_url + "/hosts", HOST_FIELDS),
+        "host_components": (amb.cluster_url + "/host_components", HOST_COMPONENT_FIELDS),
+    }, page_size, workers)
+
+    hosts = {}
+    for item in items["hosts"]:
+        h = item["Hosts"]
+        hosts[h["host_name"]] = {
+            "ip": h.get("ip"),
+            "rack": h.get("rack_info"),
+            "cpu_count": h.get("cpu_count"),
+            "total_mem": h.get("total_mem"),
+            "os_type": h.get("os_type"),
+            "state": h.get("host_state"),
+            "maintenance": h.get("maintenance_state"),
+            "components": {},
+        }
+    components = {}
+    for item in items["host_components"]:
+        hr = item["HostRoles"]
+        entry = components.setdefault(hr["component_name"], {"service": hr["service_name"], "hosts": []})
+        entry["hosts"].append(hr["host_name"])
+        if hr["host_name"] in hosts:
+            hosts[hr["host_name"]]["components"][hr["component_name"]] = hr.get("state")
+    for entry in components.values():
+        entry["hosts"].sort()
+
+    return {
+        "cluster": amb.cluster_name,
+        "ambari": amb.base_url,
+        "generated_at": int(time.time()),
+        "hosts": hosts,
+        "components": components,
+    }
+
+
+def write_inventory_json(inventory, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(inventory, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, path)
+
+
+def write_inventory_sqlite(inventory, path):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS hosts")
+            conn.execute("DROP TABLE IF EXISTS host_components")
+            conn.execute("DROP TABLE IF EXISTS meta")
+            conn.execute("CREATE TABLE hosts (host_name TEXT PRIMARY KEY, ip TEXT, rack TEXT, cpu_count INTEGER, "
+                         "total_mem INTEGER, os_type TEXT, state TEXT, maintenance TEXT)")
+            conn.execute("CREATE TABLE host_components (host_name TEXT, service_name TEXT, component_name TEXT, state TEXT)")
+            conn.execute("CREATE INDEX host_components_component ON host_components (component_name)")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("cluster", inventory["cluster"]), ("ambari", inventory["ambari"]),
+                ("generated_at", str(inventory["generated_at"]))])
+            conn.executemany("INSERT INTO hosts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+                (name, h["ip"], h["rack"], h["cpu_count"], h["total_mem"], h["os_type"], h["state"], h["maintenance"])
+                for name, h in sorted(inventory["hosts"].items())])
+            conn.executemany("INSERT INTO host_components VALUES (?, ?, ?, ?)", [
+                (host, entry["service"], component, inventory["hosts"].get(host, {}).get("components", {}).get(component))
+                for component, entry in sorted(inventory["components"].items()) for host in entry["hosts"]])
+    finally:
+        conn.close()
+
+
+def load_cached_inventory(amb, path, ttl):
+    """Return the inventory at path if it is for this Ambari server and cluster and younger than ttl seconds, else None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            inventory = json.load(f)
+    except ValueError:
+        return None
+    if not isinstance(inventory, dict) or inventory.get("ambari") != amb.base_url or inventory.get("cluster") != amb.cluster_name:
+        return None
+    if time.time() - inventory.get("generated_at", 0) > ttl:
+        return None
+    return inventory
+
+
+def per_cluster_path(path, amb, default):
+    """--output/--sqlite for one cluster: the default name, or the given one with {cluster} expanded to
+    <section name>-<cluster_name>, so two Ambari servers managing a cluster of the same name never share a file."""
+    return (path or default).replace("{cluster}", "{0}-{1}".format(amb.name, amb.cluster_name))
+
+
+async def run_inventory(amb, args):
+    path = per_cluster_path(args.output, amb, "inventory-{cluster}.json")
+    inventory = None if args.refresh else load_cached_inventory(amb, path, args.ttl)
+    if inventory is None:
+        started = time.time()
+        inventory = await build_inventory(amb, args.page_size, args.workers)
+        write_inventory_json(inventory, path)
+        source = "fetched in {0:.1f}s".format(time.time() - started)
     else:
-        print("Invalid function name.")
+        source = "cached, {0}s old".format(int(time.time() - inventory["generated_at"]))
+    if args.sqlite:
+        write_inventory_sqlite(inventory, per_cluster_path(args.sqlite, amb, None))
+
+    if args.component:
+        entry = inventory["components"].get(args.component.upper())
+        if not entry:
+            amb.echo("Unknown component {0}; known components: {1}".format(
+                args.component.upper(), ", ".join(sorted(inventory["components"])) or "none"))
+            return 1
+        for host in entry["hosts"]:
+            amb.echo(host)
+        return 0
+    amb.echo("inventory {0}: {1} hosts, {2} components ({3})".format(
+        path, len(inventory["hosts"]), len(inventory["components"]), source))
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Config history: incremental service_config_versions mirror + time-range diff
+# ---------------------------------------------------------------------------
+
+SERVICE_CONFIG_VERSION_FIELDS = ("service_name,service_config_version,group_id,group_name,createtime,user,"
+                                 "service_config_version_note,configurations")
+
+
+def open_history_store(path):
+    """Open (creating if needed) the SQLite history store. Rows are only ever inserted, never updated."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS versions (
+            service_name TEXT, version INTEGER, group_id INTEGER, group_name TEXT,
+            createtime INTEGER, user TEXT, note TEXT, PRIMARY KEY (service_name, version));
+        CREATE INDEX IF NOT EXISTS versions_createtime ON versions (createtime);
+        CREATE TABLE IF NOT EXISTS version_configs (
+            service_name TEXT, version INTEGER, type TEXT, tag TEXT, PRIMARY KEY (service_name, version, type));
+        CREATE TABLE IF NOT EXISTS configs (type TEXT, tag TEXT, properties TEXT, PRIMARY KEY (type, tag));
+    """)
+    return conn
+
+
+async def sync_config_history(amb, conn, page_size, workers):
+    """Mirror every service config version created since the newest one already stored; return how many were new."""
+    last = conn.execute("SELECT MAX(createtime) FROM versions").fetchone()[0] or 0
+    # >= so versions sharing the boundary millisecond are not lost; duplicates are ignored on insert.
+    collection = "{0}/configurations/service_config_versions?createtime>={1}".format(amb.cluster_url, last)
+    items = (await fetch_collections(amb, {"versions": (collection, SERVICE_CONFIG_VERSION_FIELDS)},
+                                     page_size, workers))["versions"]
+    new = 0
+    with conn:
+        for item in items:
+            key = (item["service_name"], item["service_config_version"])
+            cur = conn.execute("INSERT OR IGNORE INTO versions VALUES (?, ?, ?, ?, ?, ?, ?)", key + (
+                item.get("group_id", -1), item.get("group_name") or "Default", item["createtime"],
+                item.get("user"), item.get("service_config_version_note")))
+            if not cur.rowcount:
+                continue
+            new += 1
+            for config in item.get("configurations", []):
+                conn.execute("INSERT OR IGNORE INTO version_configs VALUES (?, ?, ?, ?)", key + (config["type"], config["tag"]))
+                conn.execute("INSERT OR IGNORE INTO configs VALUES (?, ?, ?)",
+                             (config["type"], config["tag"], json.dumps(config.get("properties", {}), sort_keys=True)))
+    return new
+
+
+def parse_when(value):
+    """'YYYY-MM-DD[ HH:MM[:SS]]' (local time) or epoch seconds -> epoch milliseconds."""
+    if value.isdigit():
+        return int(value) * 1000
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return int(time.mktime(time.strptime(value, fmt)) * 1000)
+        except ValueError:
+            pass
+    raise AmbariError("Cannot parse time '{0}' (use YYYY-MM-DD[ HH:MM[:SS]] or epoch seconds)".format(value))
+
+
+def format_ms(ms):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ms / 1000.0))
+
+
+def config_state_at(conn, ts, service):
+    """{(service, group): (version, {type: tag})} for the newest version of each service/group at or before ts."""
+    query = ("SELECT v.service_name, v.group_name, v.version FROM versions v WHERE v.createtime <= ? AND v.version = ("
+             "SELECT MAX(w.version) FROM versions w WHERE w.service_name = v.service_name "
+             "AND w.group_name = v.group_name AND w.createtime <= ?)")
+    params = [ts, ts]
+    if service:
+        query += " AND v.service_name = ?"
+        params.append(service)
+    state = {}
+    for service_name, group_name, version in conn.execute(query, params):
+        tags = dict(conn.execute("SELECT type, tag FROM version_configs WHERE service_name = ? AND version = ?",
+                                 (service_name, version)).fetchall())
+        state[(service_name, group_name)] = (version, tags)
+    return state
+
+
+def print_property_changes(amb, conn, old_tags, new_tags):
+    cache = {}
+
+    def props(config_type, tag):
+        if tag is None:
+            return {}
+        if (config_type, tag) not in cache:
+            row = conn.execute("SELECT properties FROM configs WHERE type = ? AND tag = ?", (config_type, tag)).fetchone()
+            cache[(config_type, tag)] = json.loads(row[0]) if row else {}
+        return cache[(config_type, tag)]
+
+    def short(value):
+        return "<{0} lines>".format(len(value.splitlines())) if "\n" in value else value
+
+    for config_type in sorted(set(old_tags) | set(new_tags)):
+        if old_tags.get(config_type) == new_tags.get(config_type):
+            continue
+        old, new = props(config_type, old_tags.get(config_type)), props(config_type, new_tags.get(config_type))
+        for name in sorted(set(old) | set(new)):
+            if old.get(name) == new.get(name):
+                continue
+            key = "{0}/{1}".format(config_type, name)
+            if name not in old:
+                amb.echo("  + {0} = {1}".format(key, short(new[name])))
+            elif name not in new:
+                amb.echo("  - {0} (was {1})".format(key, short(old[name])))
+            elif "\n" in old[name] or "\n" in new[name]:
+                amb.echo("  ~ {0}:".format(key))
+                for line in difflib.unified_diff(old[name].splitlines(), new[name].splitlines(), lineterm="", n=1):
+                    if not line.startswith(("---", "+++")):
+                        amb.echo("      " + line)
+            else:
+                amb.echo("  ~ {0}: {1} -> {2}".format(key, old[name], new[name]))
+
+
+async def run_config_history(amb, args):
+    path = per_cluster_path(args.output, amb, "config-history-{cluster}.db")
+    conn = open_history_store(path)
+    try:
+        if not args.offline:
+            started = time.time()
+            new = await sync_config_history(amb, conn, args.page_size, args.workers)
+            total = conn.execute("SELECT COUNT(*) FROM versions").fetchone()[0]
+            amb.echo("config history {0}: {1} new versions, {2} stored ({3:.1f}s)".format(
+                path, new, total, time.time() - started))
+        if not args.since:
+            return 0
+
+        since = parse_when(args.since)
+        until = parse_when(args.until) if args.until else int(time.time() * 1000)
+        service = args.services.strip().upper() if args.services else None
+        old_state = config_state_at(conn, since, service)
+        new_state = config_state_at(conn, until, service)
+        amb.echo("Changes between {0} and {1}:".format(format_ms(since), format_ms(until)))
+        for key in sorted(set(old_state) | set(new_state)):
+            old_version, old_tags = old_state.get(key, (None, {}))
+            new_version, new_tags = new_state.get(key, (None, {}))
+            if old_version == new_version:
+                continue
+            amb.echo("{0} [{1}] v{2} -> v{3}".format(key[0], key[1], old_version or "-", new_version))
+            for version, createtime, user, note in conn.execute(
+                    "SELECT version, createtime, user, note FROM versions WHERE service_name = ? AND group_name = ? "
+                    "AND createtime > ? AND createtime <= ? ORDER BY version", (key[0], key[1], since, until)):
+                amb.echo("  v{0} {1} {2}: {3}".format(version, format_ms(createtime), user, note or ""))
+            print_property_changes(amb, conn, old_tags, new_tags)
+        return 0
+    finally:
+        conn.close()
+
+
+# NOTE: to add a function, write `async def func(amb, args)` returning an exit code and register it here.
+FUNCTIONS = {
+    'stop-rolling-restart': stop_rolling_restart,
+    'batch': run_batch,
+    'service-checks': run_service_checks,
+    'inventory': run_inventory,
+    'config-history': run_config_history,
+}
+
+
+async def run_on_clusters(clusters, args):
+    """Run the selected function on every cluster concurrently; the worst exit code wins."""
+    func = FUNCTIONS[args.function]
+    limit = asyncio.Semaphore(args.max_clusters)
+    if len(clusters) > 1:
+        for amb in clusters:
+            amb.prefix = "[{0}] ".format(amb.name)
+
+    async def run_one(amb):
+        async with limit:
+            try:
+                return await func(amb, args) or 0
+            except (AmbariError, requests.RequestException) as exc:
+                amb.echo("ERROR: {0}".format(exc))
+                return 1
+
+    return max(await asyncio.gather(*(run_one(amb) for amb in clusters)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Wrapper for the Ambari REST API')
+    parser.add_argument('function', choices=sorted(FUNCTIONS), help='Specify the function to run')
+    parser.add_argument('--config', help='config file (default: ambari.cfg in the current directory, else next to this script)')
+    parser.add_argument('--cluster', help='comma-separated [ambari:<name>] sections to act on, or "all" (default: [ambari])')
+    parser.add_argument('--session-file', default=os.environ.get('AMBARI_SESSION_FILE'),
+                        help='share Ambari session cookies with other runs/tools through this file (default: $AMBARI_SESSION_FILE)')
+    parser.add_argument('--max-clusters', type=int, default=16, help='clusters handled at once (default 16)')
+    parser.add_argument('--plan', help='batch: YAML/JSON plan of service/component actions')
+    parser.add_argument('--dry-run', action='store_true', help='batch: print the request_schedule payload; service-checks: print the check order')
+    parser.add_argument('--no-wait', action='store_true', help='batch: submit and exit without streaming results')
+    parser.add_argument('--poll-interval', type=float, default=5, help='batch/service-checks: seconds between status polls (default 5)')
+    parser.add_argument('--services', help='service-checks: comma-separated services (default: every installed service with a check); '
+                                           'config-history: limit the diff to one service')
+    parser.add_argument('--exclude', help='service-checks: comma-separated services to leave out')
+    parser.add_argument('--max-parallel', type=int, default=8, help='service-checks: checks in flight at once (default 8)')
+    parser.add_argument('--output', help='inventory: JSON file (default inventory-{cluster}.json); '
+                                         'config-history: SQLite store (default config-history-{cluster}.db); '
+                                         '{cluster} is expanded to <section name>-<cluster_name>')
+    parser.add_argument('--sqlite', help='inventory: also write a SQLite copy to this file ({cluster} is expanded)')
+    parser.add_argument('--ttl', type=int, default=3600, help='inventory: reuse the JSON file if younger than this many seconds (default 3600)')
+    parser.add_argument('--refresh', action='store_true', help='inventory: ignore the cached file')
+    parser.add_argument('--component', help='inventory: print the hosts running this component, one per line')
+    parser.add_argument('--since', help='config-history: show what changed after this time (YYYY-MM-DD[ HH:MM[:SS]] or epoch seconds)')
+    parser.add_argument('--until', help='config-history: ... up to this time (default now)')
+    parser.add_argument('--offline', action='store_true', help='config-history: answer from the local store without syncing')
+    parser.add_argument('--page-size', type=int, default=500, help='inventory/config-history: items per API page (default 500)')
+    parser.add_argument('--workers', type=int, default=4, help='inventory/config-history: parallel page fetches per cluster (default 4)')
+    parser.add_argument('--role-command-order', help='service-checks: role_command_order.json (default: the stack file under ' + DEFAULT_STACKS_DIR + ')')
+    args = parser.parse_args(argv)
+
+    try:
+        clusters = select_clusters(load_clusters(find_config_file(args.config)), args.cluster)
+    except (AmbariError, configparser.Error) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    if args.session_file:
+        for amb in clusters:
+            amb.use_session_file(args.session_file)
+
+    #check ambari-config
+    unedited = [amb.name for amb in clusters if amb.hostname == PLACEHOLDER_HOSTNAME]
+    if unedited:
+        print("edit ambari.cfg first with proper details ({0})".format(", ".join(unedited)), file=sys.stderr)
+        return 1
+
+    return asyncio.run(run_on_clusters(clusters, args))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
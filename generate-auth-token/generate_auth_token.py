@@ -1,6 +1,55 @@
+"""Print HTTP Basic auth tokens for the credentials in application.cfg.
+
+application.cfg holds one section per profile, each with username and password. [credentials]
+is the default profile:
+
+    [credentials]
+    username = admin
+    password = admin
+
+    [prod-ldap]
+    username = svc_ops
+    password = ...
+
+Usage:
+    python3 generate_auth_token.py                      # default profile
+    python3 generate_auth_token.py --profile prod-ldap [--header]
+    python3 generate_auth_token.py --all --format json  # {"credentials": "...", "prod-ldap": "..."}
+    python3 generate_auth_token.py --all --format env   # export AUTH_TOKEN_CREDENTIALS='...' ...
+    python3 generate_auth_token.py --all --cache ~/.cache/auth_tokens.env
+
+--cache writes the env exports to a file readable only by the owner and rewrites it only when
+application.cfg is newer, so shell tools can `source` it instead of starting Python per call:
+
+    . ~/.cache/auth_tokens.env
+    curl -H "Authorization: Basic ${AUTH_TOKEN_PROD_LDAP}" ...
+
+The cache is a secret file: a Basic token is only base64 of username:password, so the file holds
+every profile's password in the clear, like application.cfg itself. It is refused (neither read
+nor written) in a directory that other users can read or write, such as /tmp.
+
+--session URL logs in to Ambari once and prints the AMBARISESSIONID cookie of one profile instead,
+so requests can skip Basic auth (with LDAP, each Basic-auth request is a directory bind). With
+--session-file (default $AMBARI_SESSION_FILE, the file ambari-api.py and cluster_compare.py also
+read and update) the cookie is kept there; a saved cookie is checked and only replaced when Ambari
+no longer accepts it. Without one, every call logs in again:
+
+    curl -b "$(python3 generate_auth_token.py --session https://ambari:8443)" https://ambari:8443/api/v1/clusters
+"""
+import argparse
 import base64
 import configparser
+import json
 import os
+import re
+import ssl
+import sys
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_PROFILE = "credentials"
+SESSION_COOKIE = "AMBARISESSIONID"
 
 
 def generate_basic_auth_token(username, password):
@@ -10,12 +59,162 @@ def generate_basic_auth_token(username, password):
     return basic_auth_token
 
 
-config = configparser.ConfigParser()
-config_path = os.path.join(os.path.dirname(__file__), 'application.cfg')
-config.read(config_path)
+def load_profiles(config_path):
+    """{profile: (username, password)} for every section that has both keys."""
+    config = configparser.ConfigParser()
+    if not config.read(config_path):
+        raise FileNotFoundError(f"cannot read {config_path}")
+    return {
+        section: (config.get(section, "username"), config.get(section, "password"))
+        for section in config.sections()
+        if config.has_option(section, "username") and config.has_option(section, "password")
+    }
+
+
+def env_name(profile):
+    return "AUTH_TOKEN_" + re.sub(r"[^A-Z0-9]", "_", profile.upper())
+
+
+def format_tokens(tokens, fmt):
+    if fmt == "json":
+        return json.dumps(tokens, indent=2) + "\n"
+    return "".join(f"export {env_name(profile)}='{token}'\n" for profile, token in tokens.items())
+
+
+def write_cache(path, text):
+    """Write text to path with mode 0600, atomically."""
+    tmp = f"{path}.tmp.{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def shared_directory(path):
+    """True if other users can read or write the directory that holds path."""
+    try:
+        return bool(os.stat(os.path.dirname(os.path.abspath(path))).st_mode & 0o006)
+    except OSError:
+        return False
+
+
+def cache_is_fresh(cache_path, config_path):
+    try:
+        return os.path.getmtime(cache_path) >= os.path.getmtime(config_path)
+    except OSError:
+        return False
+
+
+def ambari_get(url, headers, insecure):
+    """HTTP status and Set-Cookie headers of a GET; HTTP errors are returned, not raised."""
+    req = urllib.request.Request(url, headers=dict(headers, **{"X-Requested-By": "ambari"}))
+    ctx = None
+    if insecure:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    try:
+        with urllib.request.urlopen(req, context=ctx, timeout=60) as resp:
+            return resp.status, resp.headers.get_all("Set-Cookie") or []
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers.get_all("Set-Cookie") or []
+
+
+def load_sessions(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def ambari_session(base_url, username, password, session_file, renew=False, insecure=False):
+    """AMBARISESSIONID for username on base_url: the saved one while Ambari accepts it, else a new login."""
+    key = f"{base_url}|{username}"
+    probe = f"{base_url}/api/v1/clusters"
+    sessions = load_sessions(session_file) if session_file else {}
+    cookie = (sessions.get(key) or {}).get("cookie")
+    if cookie and not renew:
+        status, _ = ambari_get(probe, {"Cookie": f"{SESSION_COOKIE}={cookie}"}, insecure)
+        if status == 200:
+            return cookie
+
+    status, set_cookies = ambari_get(probe, {"Authorization": "Basic " + generate_basic_auth_token(username, password)},
+                                     insecure)
+    if status != 200:
+        raise RuntimeError(f"login to {base_url} as {username} failed: HTTP {status}")
+    for header in set_cookies:
+        name, _, value = header.split(";", 1)[0].partition("=")
+        if name.strip() == SESSION_COOKIE:
+            cookie = value.strip()
+            break
+    else:
+        raise RuntimeError(f"{base_url} did not return a {SESSION_COOKIE} cookie")
+    if session_file:
+        sessions[key] = {"cookie": cookie, "saved_at": int(time.time())}
+        write_cache(session_file, json.dumps(sessions, indent=1, sort_keys=True))
+    return cookie
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print HTTP Basic auth tokens from application.cfg.")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "application.cfg"),
+                        help="credentials file (default: application.cfg next to this script)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help=f"section to use (default {DEFAULT_PROFILE})")
+    parser.add_argument("--header", action="store_true", help="print 'Authorization: Basic <token>'")
+    parser.add_argument("--all", action="store_true", help="print a token for every profile")
+    parser.add_argument("--format", choices=["json", "env"], default="env", help="--all output format (default env)")
+    parser.add_argument("--cache", help="--all: keep the env exports in this secret file (0600, not in a directory other "
+                                        "users can read), regenerated when the config changes")
+    parser.add_argument("--session", metavar="URL", help="print an Ambari session cookie for URL (e.g. https://ambari:8443)")
+    parser.add_argument("--session-file", default=os.environ.get("AMBARI_SESSION_FILE"),
+                        help="--session: cookie store shared with ambari-api.py and cluster_compare.py "
+                             "(default $AMBARI_SESSION_FILE; without one the cookie is not kept)")
+    parser.add_argument("--renew", action="store_true", help="--session: log in again even if the saved cookie still works")
+    parser.add_argument("--insecure", action="store_true", help="--session: skip TLS certificate verification")
+    args = parser.parse_args(argv)
+    if args.session and args.all:
+        parser.error("--session prints the cookie of one --profile; it cannot be combined with --all")
+    if args.all and args.cache and shared_directory(args.cache):
+        print(f"Error: refusing to keep tokens (passwords in base64) in {args.cache}: "
+              "other users can read or write its directory", file=sys.stderr)
+        return 1
+
+    if args.all and args.cache and args.format == "env" and cache_is_fresh(args.cache, args.config):
+        with open(args.cache, encoding="utf-8") as f:
+            sys.stdout.write(f.read())
+        return 0
+
+    try:
+        profiles = load_profiles(args.config)
+    except (OSError, configparser.Error) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    if not args.all:
+        if args.profile not in profiles:
+            print(f"Error: no profile [{args.profile}] with username and password in {args.config}", file=sys.stderr)
+            return 1
+        if args.session:
+            try:
+                cookie = ambari_session(args.session.rstrip("/"), *profiles[args.profile], args.session_file,
+                                        args.renew, args.insecure)
+            except (OSError, RuntimeError) as exc:
+                print(f"Error: {exc}", file=sys.stderr)
+                return 1
+            print(f"Cookie: {SESSION_COOKIE}={cookie}" if args.header else f"{SESSION_COOKIE}={cookie}")
+            return 0
+        auth_token = generate_basic_auth_token(*profiles[args.profile])
+        print(f"Authorization: Basic {auth_token}" if args.header else f"Basic Auth Token: {auth_token}")
+        return 0
+
+    tokens = {profile: generate_basic_auth_token(*creds) for profile, creds in profiles.items()}
+    if args.cache:
+        write_cache(args.cache, format_tokens(tokens, "env"))
+    sys.stdout.write(format_tokens(tokens, args.format))
+    return 0
 
-username = config.get("credentials", "username")
-password = config.get("credentials", "password")
 
-auth_token = generate_basic_auth_token(username, password)
-print("Basic Auth Token:", auth_token)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3.11
+"""
+Index the odp-upgrade-to-* bundles by content, report what really changes between versions, and
+build a deduplicated copy in which identical files are hardlinks to one stored object.
+
+  bundle_index.py report [--json] [BUNDLE_DIR ...]
+  bundle_index.py build OUT_DIR [BUNDLE_DIR ...]
+
+Without BUNDLE_DIRs, every odp-upgrade-to-3_3_6_*_1 directory next to this tool's directory is
+used. Bundles are ordered by the version in their name (3_3_6_0_1 < 3_3_6_1_1 < ...). Every file
+is hashed exactly once (SHA-256, thread pool); the index maps each digest to the (bundle, path)
+pairs that carry it and each path to its digest per bundle.
+
+report prints one pass over that index: how many files and bytes are unique, then for every path
+whose content is not the same in all bundles, the version steps where it was added, changed or
+removed. Paths identical everywhere are only counted.
+
+build writes OUT_DIR/objects/<aa>/<digest> once per distinct content and OUT_DIR/<bundle>/...
+as hardlinks to it, keeping the file mode. `tar -c` / `rsync -H` of OUT_DIR then ships each
+content once. OUT_DIR must be on one filesystem and must not exist yet.
+
+Exit codes:
+  0  Success.
+  1  Usage error, unreadable bundle file, or OUT_DIR exists / cannot be hardlinked.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATTERN = "odp-upgrade-to-3_3_6_*_1"
+
+
+def eprint(*args: object) -> None:
+    print(*args, file=sys.stderr)
+
+
+def version_key(bundle: str) -> tuple:
+    """odp-upgrade-to-3_3_6_4_1 -> (3, 3, 6, 4, 1); names without a version sort last, by name."""
+    numbers = re.findall(r"\d+", os.path.basename(bundle.rstrip("/")))
+    return (0, tuple(int(n) for n in numbers)) if numbers else (1, bundle)
+
+
+def sha256_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def build_index(bundles: list[str]) -> dict:
+    """{"bundles": [name, ...], "paths": {relpath: {name: digest}}, "blobs": {digest: {"size", "source", "refs"}}}."""
+    files = []  # (bundle name, relpath, absolute path)
+    for bundle in bundles:
+        name = os.path.basename(bundle.rstrip("/"))
+        for root, dirs, names in os.walk(bundle):
+            dirs.sort()
+            for fname in sorted(names):
+                path = os.path.join(root, fname)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    files.append((name, os.path.relpath(path, bundle), path))
+
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4)) as pool:
+        digests = list(pool.map(lambda item: sha256_file(item[2]), files))
+
+    index: dict = {"bundles": [os.path.basename(b.rstrip("/")) for b in bundles], "paths": {}, "blobs": {}}
+    for (name, rel, path), digest in zip(files, digests):
+        index["paths"].setdefault(rel, {})[name] = digest
+        blob = index["blobs"].setdefault(digest, {"size": os.path.getsize(path), "source": path, "refs": []})
+        blob["refs"].append([name, rel])
+    return index
+
+
+def path_changes(index: dict, rel: str) -> list[str]:
+    """Version steps at which rel was added, changed or removed; [] if it is the same in every bundle."""
+    versions = index["paths"][rel]
+    steps = []
+    previous_name, previous = None, None
+    for i, name in enumerate(index["bundles"]):
+        digest = versions.get(name)
+        if i and digest != previous:
+            if previous is None:
+                steps.append(f"added in {name}")
+            elif digest is None:
+                steps.append(f"removed in {name}")
+            else:
+                steps.append(f"changed {previous_name} -> {name}")
+        previous_name, previous = name, digest
+    return steps
+
+
+def report(index: dict, as_json: bool) -> None:
+    total_files = sum(len(b["refs"]) for b in index["blobs"].values())
+    total_bytes = sum(b["size"] * len(b["refs"]) for b in index["blobs"].values())
+    unique_bytes = sum(b["size"] for b in index["blobs"].values())
+    changes = {rel: steps for rel in sorted(index["paths"]) if (steps := path_changes(index, rel))}
+
+    if as_json:
+        print(json.dumps({
+            "bundles": index["bundles"],
+            "files": total_files,
+            "unique_files": len(index["blobs"]),
+            "bytes": total_bytes,
+            "unique_bytes": unique_bytes,
+            "changes": changes,
+            "paths": index["paths"],
+        }, indent=2, sort_keys=True))
+        return
+
+    print(f"bundles: {', '.join(index['bundles'])}")
+    print(f"files:   {total_files} ({total_bytes} bytes), {len(index['blobs'])} distinct ({unique_bytes} bytes)")
+    print(f"paths:   {len(index['paths'])}, identical in every bundle: {len(index['paths']) - len(changes)}")
+    for rel, steps in changes.items():
+        print(f"{rel}")
+        for step in steps:
+            print(f"    {step}")
+
+
+def build(index: dict, out_dir: str) -> None:
+    """Write each distinct blob once under out_dir/objects and hardlink every bundle path to it."""
+    os.makedirs(out_dir)
+    for digest, blob in index["blobs"].items():
+        obj = os.path.join(out_dir, "objects", digest[:2], digest)
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        shutil.copyfile(blob["source"], obj)
+        os.chmod(obj, stat.S_IMODE(os.stat(blob["source"]).st_mode))
+        for name, rel in blob["refs"]:
+            dest = os.path.join(out_dir, name, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.link(obj, dest)
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Index, compare and deduplicate ODP upgrade bundles.")
+    sub = p.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("report", help="list the files whose content differs between bundle versions")
+    rp.add_argument("--json", action="store_true", help="machine-readable report including the full path index")
+    rp.add_argument("bundles", nargs="*", help=f"bundle directories (default: {DEFAULT_PATTERN} in the repo)")
+    bp = sub.add_parser("build", help="write a hardlink-deduplicated copy of the bundles")
+    bp.add_argument("out_dir")
+    bp.add_argument("bundles", nargs="*", help=f"bundle directories (default: {DEFAULT_PATTERN} in the repo)")
+    args = p.parse_args(argv)
+
+    bundles = args.bundles or glob.glob(os.path.join(REPO_ROOT, DEFAULT_PATTERN))
+    missing = [b for b in bundles if not os.path.isdir(b)]
+    if missing or not bundles:
+        eprint(f"Not a bundle directory: {', '.join(missing)}" if missing else "No bundle directories found.")
+        return EXIT_ERROR
+    names = [os.path.basename(b.rstrip("/")) for b in bundles]
+    if len(set(names)) != len(names):
+        eprint(f"Bundle directory names must be distinct: {', '.join(names)}")
+        return EXIT_ERROR
+
+    try:
+        index = build_index(sorted(bundles, key=version_key))
+    except OSError as exc:
+        eprint(f"Cannot read bundle file: {exc}")
+        return EXIT_ERROR
+
+    if args.command == "report":
+        report(index, args.json)
+        return EXIT_OK
+
+    if os.path.exists(args.out_dir):
+        eprint(f"{args.out_dir} already exists")
+        return EXIT_ERROR
+    try:
+        build(index, args.out_dir)
+    except OSError as exc:
+        eprint(f"Cannot build {args.out_dir}: {exc}")
+        return EXIT_ERROR
+    print(f"{args.out_dir}: {len(index['blobs'])} objects, "
+          f"{sum(len(b['refs']) for b in index['blobs'].values())} hardlinked files in {len(index['bundles'])} bundles")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
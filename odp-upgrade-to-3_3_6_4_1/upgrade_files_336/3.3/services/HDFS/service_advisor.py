@@ -18,7 +18,10 @@ limitations under the License.
 """
 
 import imp
+import math
 import os
+import re
+import sys
 import traceback
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -32,6 +35,88 @@ except Exception as e:
   traceback.print_exc()
   print("Failed to load parent")
 
+# Shared by all ODP 3.3 advisors of one stack-advisor call; loaded once, never reloaded.
+COMMON_FILE = os.path.join(SCRIPT_DIR, '../advisor_common.py')
+try:
+  advisor_common = sys.modules.get('odp33_advisor_common')
+  if advisor_common is None:
+    with open(COMMON_FILE, 'rb') as fp:
+      advisor_common = imp.load_module('odp33_advisor_common', fp, COMMON_FILE, ('.py', 'rb', imp.PY_SOURCE))
+except Exception as e:
+  traceback.print_exc()
+  print("Failed to load advisor_common")
+
+# Topology-scaled HDFS settings, see ODP33HDFSRecommender.recommendHDFSTopologyConfigurations.
+NN_HANDLER_COUNT_MIN = 10
+NN_HANDLER_COUNT_STACK_DEFAULT = 100
+NN_HANDLER_COUNT_MAX = 200
+NN_HEAP_MB_PER_MILLION_OBJECTS = 1024
+NN_HEAP_MIN_MB = 1024
+NN_HEAP_MAX_FRACTION_OF_HOST = 0.75
+BLOCK_REPORT_SPREAD_MIN_DATANODES = 100
+BLOCK_REPORT_MAX_INITIAL_DELAY_SECS = 600
+INCREMENTAL_BLOCK_REPORT_INTERVAL_MSEC = 100
+SIZE_SUFFIXES = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+def namenode_handler_count(datanodes):
+  """
+  dfs.namenode.handler.count: 20 * ln(number of DataNodes), within [NN_HANDLER_COUNT_STACK_DEFAULT,
+  NN_HANDLER_COUNT_MAX]; the stack's hdfs-site default is kept as a floor so small clusters are not tuned down.
+  """
+  count = int(round(20 * math.log(datanodes))) if datanodes > 1 else 0
+  return min(max(count, NN_HANDLER_COUNT_STACK_DEFAULT), NN_HANDLER_COUNT_MAX)
+
+def namenode_service_handler_count(handler_count):
+  """
+  dfs.namenode.service.handler.count: half of the client handlers; DataNode heartbeats and block reports only.
+  """
+  return max(handler_count // 2, NN_HANDLER_COUNT_MIN)
+
+def datanode_transfer_threads(datanode_cores, hbase_installed):
+  """
+  dfs.datanode.max.transfer.threads: 16384 with HBase (many open readers per region server) or 16+ cores, 8192 with
+  8+ cores, else the Hadoop default 4096.
+  """
+  if hbase_installed or datanode_cores >= 16:
+    return 16384
+  elif datanode_cores >= 8:
+    return 8192
+  return 4096
+
+def block_report_settings(datanodes):
+  """
+  (dfs.blockreport.initialDelay seconds, dfs.blockreport.incremental.intervalMsec): from
+  BLOCK_REPORT_SPREAD_MIN_DATANODES DataNodes on, full block reports after a NameNode restart are spread over one
+  second per 10 DataNodes (at most BLOCK_REPORT_MAX_INITIAL_DELAY_SECS) and incremental block reports are batched.
+  """
+  if datanodes < BLOCK_REPORT_SPREAD_MIN_DATANODES:
+    return 0, 0
+  return min(datanodes // 10, BLOCK_REPORT_MAX_INITIAL_DELAY_SECS), INCREMENTAL_BLOCK_REPORT_INTERVAL_MSEC
+
+def expected_namespace_objects(raw_capacity_bytes, replication, block_size_bytes):
+  """
+  Files + blocks the NameNode holds when the DataNodes are full, assuming one full block per file.
+  """
+  blocks = raw_capacity_bytes / float(max(replication, 1) * block_size_bytes)
+  return 2 * blocks
+
+def namenode_heap_mb(objects, namenode_ram_mb):
+  """
+  namenode_heapsize (MB): NN_HEAP_MB_PER_MILLION_OBJECTS per million namespace objects, rounded up to a GB, at least
+  NN_HEAP_MIN_MB and at most NN_HEAP_MAX_FRACTION_OF_HOST of the NameNode host's memory (if known).
+  """
+  heap = max(int(math.ceil(objects / 1000000.0 * NN_HEAP_MB_PER_MILLION_OBJECTS / 1024)) * 1024, NN_HEAP_MIN_MB)
+  if namenode_ram_mb:
+    heap = min(heap, max(int(namenode_ram_mb * NN_HEAP_MAX_FRACTION_OF_HOST) // 1024 * 1024, NN_HEAP_MIN_MB))
+  return heap
+
+def to_bytes(value, default):
+  """
+  "134217728", "128m", "1g" -> bytes; default if value is missing or malformed.
+  """
+  match = re.match(r"^\s*(\d+)\s*([kmgt]?)b?\s*$", str(value or "").lower())
+  return int(match.group(1)) * SIZE_SUFFIXES[match.group(2)] if match else default
+
 class ODP33HDFSServiceAdvisor(service_advisor.HDFSServiceAdvisor):
 
   def __init__(self, *args, **kwargs):
@@ -151,3 +236,44 @@ class ODP33HDFSRecommender(service_advisor.ServiceAdvisor):
       putHdfsSiteProperty('dfs.permissions.ContentSummary.subAccess', 'true')
     else:
       putHdfsSiteProperty('dfs.permissions.ContentSummary.subAccess', 'false')
+
+    self.recommendHDFSTopologyConfigurations(configurations, services, hosts)
+
+  def recommendHDFSTopologyConfigurations(self, configurations, services, hosts):
+    """
+    NameNode / DataNode RPC, transfer and block report settings and the NameNode heap, scaled from the number,
+    cores, memory and disks of the NameNode and DataNode hosts.
+    """
+    host_index = advisor_common.host_index(services, hosts)
+    datanodes = host_index.hosts_with_component("HDFS", "DATANODE")
+    if not datanodes:
+      return
+    namenodes = host_index.hosts_with_component("HDFS", "NAMENODE")
+    config = advisor_common.config_context(services, configurations)
+    servicesList = [service["StackServices"]["service_name"] for service in services["services"]]
+
+    putHdfsSiteProperty = self.putProperty(configurations, "hdfs-site", services)
+    putHdfsEnvProperty = self.putProperty(configurations, "hadoop-env", services)
+
+    handler_count = namenode_handler_count(len(datanodes))
+    putHdfsSiteProperty("dfs.namenode.handler.count", handler_count)
+    putHdfsSiteProperty("dfs.namenode.service.handler.count", namenode_service_handler_count(handler_count))
+
+    datanode_cores = min(int(host["Hosts"].get("cpu_count") or 0) for host in datanodes)
+    putHdfsSiteProperty("dfs.datanode.max.transfer.threads", datanode_transfer_threads(datanode_cores, "HBASE" in servicesList))
+
+    initial_delay, incremental_interval = block_report_settings(len(datanodes))
+    putHdfsSiteProperty("dfs.blockreport.initialDelay", initial_delay)
+    putHdfsSiteProperty("dfs.blockreport.incremental.intervalMsec", incremental_interval)
+
+    try:
+      replication = int(config.input_value("hdfs-site", "dfs.replication", 3))
+    except ValueError:
+      replication = 3
+    block_size = to_bytes(config.input_value("hdfs-site", "dfs.blocksize"), 128 * 1024 * 1024)
+    raw_capacity = sum(advisor_common.disk_size_kb(host) for host in datanodes) * 1024
+    namenode_ram_mb = min(int(host["Hosts"].get("total_mem") or 0) for host in namenodes) // 1024 if namenodes else 0
+    heap = namenode_heap_mb(expected_namespace_objects(raw_capacity, replication, block_size), namenode_ram_mb)
+    putHdfsEnvProperty("namenode_heapsize", heap)
+    putHdfsEnvProperty("namenode_opt_newsize", max(heap // 8, 128))
+    putHdfsEnvProperty("namenode_opt_maxnewsize", max(heap // 8, 128))
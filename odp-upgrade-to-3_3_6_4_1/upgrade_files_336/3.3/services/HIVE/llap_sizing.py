@@ -0,0 +1,266 @@
+#!/usr/bin/env ambari-python-wrap
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# LLAP / Hive queue sizing rules of the ODP 3.3 HIVE service advisor, as plain functions of the cluster shape (no
+# services / hosts dicts), so they can also be evaluated offline for many candidate shapes:
+#
+#   llap_sizing.py --nodes 3,5,10-100:10 --nm-memory 16384,65536 --min-allocation 1024 \
+#                  --container 2048,4096 --queue-percent 20-60:10 --sessions 1,4,8 [--format csv|json] [--feasible]
+#
+# Every list is comma separated; "a-b:s" is the inclusive range a, a+s, ... b. --tez-am defaults to the size the
+# advisor picks for the shape's total capacity. One row per combination; a summary goes to stderr.
+
+from __future__ import division, print_function
+
+import itertools
+import json
+import math
+import sys
+import time
+
+MIN_CAPACITY_FOR_SERVICE_CHECKS_MB = 512
+DEFAULT_QUEUE_PERCENT_FLOOR = 20.0
+
+FIELDS = ["nodes", "nm_memory_mb", "min_allocation_mb", "hive_tez_container_mb", "tez_am_container_mb", "queue_percent",
+          "sessions", "total_capacity_mb", "queue_capacity_mb", "min_queue_percent", "queue_too_small",
+          "sessions_overcommitted", "service_check_capacity_short", "ok"]
+
+
+def normalize_up(value, increment):
+  """
+  value rounded up to a multiple of increment (YARN container normalization).
+  """
+  return math.ceil(value / increment) * increment
+
+
+def tez_am_container_size(total_cluster_capacity):
+  """
+  tez.am.resource.memory.mb the advisor recommends for a cluster of total_cluster_capacity MB.
+  """
+  if total_cluster_capacity <= 4096:
+    return 512.0
+  elif total_cluster_capacity <= 98304:
+    return 1024.0
+  return 4096.0
+
+
+def min_llap_queue_percent(total_cluster_capacity, min_allocation_mb, hive_tez_container_mb, tez_am_container_mb):
+  """
+  Smallest capacity (in % of the cluster, rounded up) of the LLAP queue that runs the LLAP and the Hive2 app: 20% of
+  the cluster, or one Tez container plus one Tez AM (both normalized to the YARN minimum allocation) if that is more.
+  """
+  floor = DEFAULT_QUEUE_PERCENT_FLOOR / 100 * total_cluster_capacity
+  needed = normalize_up(hive_tez_container_mb, min_allocation_mb) + normalize_up(tez_am_container_mb, min_allocation_mb)
+  return int(math.ceil(max(floor, needed) * 100 / total_cluster_capacity))
+
+
+def sessions_overcommitted(queue_capacity, sessions, tez_am_container_mb, min_allocation_mb):
+  """
+  True if the Tez AMs of hive.server2.tez.sessions.per.default.queue sessions take half of the queue or more.
+  """
+  remaining = queue_capacity - normalize_up(tez_am_container_mb, min_allocation_mb) * sessions
+  return remaining <= queue_capacity / 2
+
+
+def capacity_left_for_service_checks(total_cluster_capacity, queue_percent):
+  """
+  MB of the cluster outside an Ambari managed "llap" queue of queue_percent %.
+  """
+  return total_cluster_capacity - queue_percent / 100 * total_cluster_capacity
+
+
+def tez_container_size(nm_memory_mb, nm_vcores, min_allocation_mb, max_allocation_mb):
+  """
+  hive.tez.container.size that gives every NodeManager vcore one Tez task: the NodeManager memory per vcore, rounded
+  down to a multiple of the YARN minimum allocation and kept between that minimum and max_allocation_mb.
+  """
+  per_vcore = math.floor(nm_memory_mb / max(nm_vcores, 1) / min_allocation_mb) * min_allocation_mb
+  return int(min(max(per_vcore, min_allocation_mb), max(max_allocation_mb, min_allocation_mb)))
+
+
+def tez_task_heap_bytes(container_mb):
+  """
+  Java heap of a Tez task in a container_mb container (Xmx is 80% of the container), in bytes.
+  """
+  return int(container_mb * 0.8 * 1024 * 1024)
+
+
+def map_join_size(container_mb):
+  """
+  hive.auto.convert.join.noconditionaltask.size for container_mb Tez containers: a third of the task heap.
+  """
+  return int(round(tez_task_heap_bytes(container_mb) / 3))
+
+
+def sessions_per_queue(queue_capacity, am_fraction, tez_am_container_mb, min_allocation_mb, instances=1,
+                       max_sessions=None):
+  """
+  hive.server2.tez.sessions.per.default.queue for a queue of queue_capacity MB shared by instances HiveServer2s: as
+  many Tez AMs as the queue's AM share holds, short of the AMs taking half of the queue (see sessions_overcommitted),
+  at most max_sessions and at least 1.
+  """
+  am_total = normalize_up(tez_am_container_mb, min_allocation_mb) * max(instances, 1)
+  sessions = min(int(queue_capacity * min(float(am_fraction), 1.0) // am_total),
+                 int(math.ceil(queue_capacity / 2 / am_total)) - 1)
+  if max_sessions is not None:
+    sessions = min(sessions, max_sessions)
+  return max(1, sessions)
+
+
+# (concurrent queries up to, smallest HiveServer2 heap MB), after the HiveServer2 sizing guidance of the Hive docs.
+HS2_HEAP_BY_CONCURRENCY = [(1, 2048), (10, 4096), (20, 6144), (40, 12288)]
+
+
+def hs2_heap_size(concurrent_queries, host_memory_mb):
+  """
+  hive.heapsize of a HiveServer2 running concurrent_queries queries at once: 3/8 of host_memory_mb, raised to the
+  HS2_HEAP_BY_CONCURRENCY size for that many queries (its last size beyond) on smaller hosts, never more than
+  host_memory_mb nor less than 512 MB.
+  """
+  floor = HS2_HEAP_BY_CONCURRENCY[-1][1]
+  for limit, size in HS2_HEAP_BY_CONCURRENCY:
+    if concurrent_queries <= limit:
+      floor = size
+      break
+  return int(max(512, min(max(floor, host_memory_mb * 3 / 8), host_memory_mb)))
+
+
+def evaluate(nodes, nm_memory_mb, min_allocation_mb, hive_tez_container_mb, queue_percent, sessions,
+             tez_am_container_mb=None):
+  """
+  Sizing checks of the HIVE validator for one cluster shape, as a dict with the FIELDS keys.
+  """
+  return next(sweep([nodes], [nm_memory_mb], [min_allocation_mb], [hive_tez_container_mb], [queue_percent], [sessions],
+                    [tez_am_container_mb]))
+
+
+def sweep(node_counts, nm_memory_mbs, min_allocation_mbs, hive_tez_container_mbs, queue_percents, session_counts,
+          tez_am_container_mbs=(None,)):
+  """
+  evaluate() for every combination of the given values, as a generator. Terms that only depend on some of the axes
+  (total capacity, normalized container sizes, minimum queue percentage) are computed once per distinct input
+  instead of once per row.
+  """
+  queue_percents = [float(p) for p in queue_percents]
+  for nodes, nm_memory_mb in itertools.product(node_counts, nm_memory_mbs):
+    total = float(nodes * nm_memory_mb)
+    if total <= 0:
+      raise ValueError("total cluster capacity must be > 0 (nodes={0}, nm_memory_mb={1})".format(nodes, nm_memory_mb))
+    queue_capacities = [p / 100 * total for p in queue_percents]
+    service_check_short = [capacity_left_for_service_checks(total, p) < MIN_CAPACITY_FOR_SERVICE_CHECKS_MB
+                           for p in queue_percents]
+    tez_ams = [tez_am_container_size(total) if am is None else float(am) for am in tez_am_container_mbs]
+    for min_allocation_mb, hive_tez_container_mb, tez_am in itertools.product(min_allocation_mbs, hive_tez_container_mbs,
+                                                                             tez_ams):
+      min_percent = min_llap_queue_percent(total, min_allocation_mb, hive_tez_container_mb, tez_am)
+      normalized_am = normalize_up(tez_am, min_allocation_mb)
+      for i, queue_percent in enumerate(queue_percents):
+        queue_capacity = queue_capacities[i]
+        too_small = queue_percent < min_percent
+        for sessions in session_counts:
+          overcommitted = queue_capacity - normalized_am * sessions <= queue_capacity / 2
+          yield {
+            "nodes": nodes,
+            "nm_memory_mb": nm_memory_mb,
+            "min_allocation_mb": min_allocation_mb,
+            "hive_tez_container_mb": hive_tez_container_mb,
+            "tez_am_container_mb": tez_am,
+            "queue_percent": queue_percent,
+            "sessions": sessions,
+            "total_capacity_mb": total,
+            "queue_capacity_mb": queue_capacity,
+            "min_queue_percent": min_percent,
+            "queue_too_small": too_small,
+            "sessions_overcommitted": overcommitted,
+            "service_check_capacity_short": service_check_short[i],
+            "ok": not (too_small or overcommitted or service_check_short[i]),
+          }
+
+
+def parse_values(text, convert=int):
+  """
+  "1,2,10-30:10" -> [1, 2, 10, 20, 30]
+  """
+  values = []
+  for part in text.split(","):
+    part = part.strip()
+    if not part:
+      continue
+    if "-" in part[1:]:
+      bounds, sep, step = part.partition(":")
+      start, end = bounds.split("-", 1)
+      start, end, step = convert(start), convert(end), convert(step or 1)
+      if step <= 0:
+        raise ValueError("range step must be > 0: " + part)
+      while start <= end:
+        values.append(start)
+        start += step
+    else:
+      values.append(convert(part))
+  if not values:
+    raise ValueError("empty value list: " + repr(text))
+  return values
+
+
+def main(argv):
+  import argparse
+  parser = argparse.ArgumentParser(description="Evaluate the HIVE advisor's LLAP queue sizing rules for many cluster shapes.")
+  parser.add_argument("--nodes", required=True, help="NodeManager counts")
+  parser.add_argument("--nm-memory", required=True, help="yarn.nodemanager.resource.memory-mb values")
+  parser.add_argument("--min-allocation", default="1024", help="yarn.scheduler.minimum-allocation-mb values (default 1024)")
+  parser.add_argument("--container", required=True, help="hive.tez.container.size values")
+  parser.add_argument("--queue-percent", required=True, help="LLAP queue capacities, in %% of the cluster")
+  parser.add_argument("--sessions", default="1", help="hive.server2.tez.sessions.per.default.queue values (default 1)")
+  parser.add_argument("--tez-am", help="tez.am.resource.memory.mb values (default: the advisor's choice per shape)")
+  parser.add_argument("--format", choices=["csv", "json"], default="csv", help="csv (default) or one JSON object per line")
+  parser.add_argument("--feasible", action="store_true", help="print only shapes that pass every check")
+  args = parser.parse_args(argv)
+
+  try:
+    axes = [parse_values(args.nodes), parse_values(args.nm_memory), parse_values(args.min_allocation),
+            parse_values(args.container), parse_values(args.queue_percent, float), parse_values(args.sessions),
+            parse_values(args.tez_am) if args.tez_am else [None]]
+  except ValueError as e:
+    print("Invalid value list: {0}".format(e), file=sys.stderr)
+    return 1
+  if min(axes[0]) <= 0 or min(axes[1]) <= 0 or min(axes[2]) <= 0:
+    print("--nodes, --nm-memory and --min-allocation values must be > 0", file=sys.stderr)
+    return 1
+
+  started = time.time()
+  rows = feasible = 0
+  if args.format == "csv":
+    print(",".join(FIELDS))
+  for result in sweep(*axes):
+    rows += 1
+    if result["ok"]:
+      feasible += 1
+    elif args.feasible:
+      continue
+    if args.format == "csv":
+      print(",".join(str(result[field]) for field in FIELDS))
+    else:
+      print(json.dumps(result, sort_keys=True))
+  print("{0} shapes evaluated in {1:.2f}s, {2} pass every check".format(rows, time.time() - started, feasible),
+        file=sys.stderr)
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
@@ -25,6 +25,7 @@ import os
 import traceback
 import re
 import socket
+import sys
 import fnmatch
 
 
@@ -42,6 +43,28 @@ except Exception as e:
   traceback.print_exc()
   print("Failed to load parent")
 
+# Shared by all ODP 3.3 advisors of one stack-advisor call; loaded once, never reloaded.
+COMMON_FILE = os.path.join(SCRIPT_DIR, "../advisor_common.py")
+try:
+  advisor_common = sys.modules.get("odp33_advisor_common")
+  if advisor_common is None:
+    with open(COMMON_FILE, "rb") as fp:
+      advisor_common = imp.load_module("odp33_advisor_common", fp, COMMON_FILE, (".py", "rb", imp.PY_SOURCE))
+except Exception as e:
+  traceback.print_exc()
+  print("Failed to load advisor_common")
+
+# LLAP / Hive queue sizing rules, also usable standalone (see llap_sizing.py).
+SIZING_FILE = os.path.join(SCRIPT_DIR, "llap_sizing.py")
+try:
+  llap_sizing = sys.modules.get("odp33_llap_sizing")
+  if llap_sizing is None:
+    with open(SIZING_FILE, "rb") as fp:
+      llap_sizing = imp.load_module("odp33_llap_sizing", fp, SIZING_FILE, (".py", "rb", imp.PY_SOURCE))
+except Exception as e:
+  traceback.print_exc()
+  print("Failed to load llap_sizing")
+
 class HiveServiceAdvisor(service_advisor.ServiceAdvisor):
 
   def __init__(self, *args, **kwargs):
@@ -142,7 +165,8 @@ class HiveServiceAdvisor(service_advisor.ServiceAdvisor):
     validator = HiveValidator()
     # Calls the methods of the validator using arguments,
     # method(siteProperties, siteRecommendations, configurations, services, hosts)
-    return validator.validateListOfConfigUsingMethod(configurations, recommendedDefaults, services, hosts, validator.validators)
+    return validator.validateListOfConfigUsingMethod(configurations, recommendedDefaults, services, hosts,
+                                                     validator.affected_validators(services))
 
   @staticmethod
   def isKerberosEnabled(services, configurations):
@@ -170,7 +194,110 @@ class HiveServiceAdvisor(service_advisor.ServiceAdvisor):
 
 
 
-class HiveRecommender(service_advisor.ServiceAdvisor):
+class HiveYarnSizing(object):
+  """
+  YARN and Tez sizing lookups shared by HiveRecommender and HiveValidator.
+  """
+
+  def get_yarn_nm_mem_in_mb(self, services, configurations):
+    """
+    Gets YARN NodeManager memory in MB (yarn.nodemanager.resource.memory-mb).
+    Reads from:
+      - configurations (if changed as part of current Stack Advisor invocation (output)), and services["changed-configurations"]
+        is empty, else
+      - services['configurations'] (input).
+
+    services["changed-configurations"] would be empty is Stack Advisor call if made from Blueprints (1st invocation). Subsequent
+    Stack Advisor calls will have it non-empty. We do this because in subsequent invocations, even if Stack Advsior calculates this
+    value (configurations), it is finally not recommended, making 'input' value to survive.
+    """
+    yarn_nm_mem_in_mb = advisor_common.config_context(services, configurations).effective_value("yarn-site", "yarn.nodemanager.resource.memory-mb")
+    if yarn_nm_mem_in_mb is not None:
+      yarn_nm_mem_in_mb = float(yarn_nm_mem_in_mb)
+
+    if yarn_nm_mem_in_mb is None or yarn_nm_mem_in_mb <= 0.0:
+      self.logger.warning("'yarn.nodemanager.resource.memory-mb' current value : {0}. Expected value : > 0".format(yarn_nm_mem_in_mb))
+
+    return yarn_nm_mem_in_mb
+
+  #TODO  Convert this to a helper. It can apply to any property. Check config, or check if in the list of changed configurations and read the latest value
+  def get_yarn_min_container_size(self, services, configurations):
+    """
+    Gets YARN's minimum container size (yarn.scheduler.minimum-allocation-mb).
+    Reads from:
+      - configurations (if changed as part of current Stack Advisor invocation (output)), and services["changed-configurations"]
+        is empty, else
+      - services['configurations'] (input).
+
+    services["changed-configurations"] would be empty if Stack Advisor call is made from Blueprints (1st invocation). Subsequent
+    Stack Advisor calls will have it non-empty. We do this because in subsequent invocations, even if Stack Advisor calculates this
+    value (configurations), it is finally not recommended, making 'input' value to survive.
+
+    :type services dict
+    :type configurations dict
+    :rtype str
+    """
+    yarn_min_allocation_property = "yarn.scheduler.minimum-allocation-mb"
+    yarn_min_container_size = advisor_common.config_context(services, configurations).effective_value("yarn-site", yarn_min_allocation_property)
+    self.logger.info("DBG: 'yarn.scheduler.minimum-allocation-mb' read as : {0}".format(yarn_min_container_size))
+
+    if not yarn_min_container_size:
+      self.logger.error("{0} was not found in the configuration".format(yarn_min_allocation_property))
+
+    return yarn_min_container_size
+
+  def get_hive_tez_container_size(self, services):
+    """
+    Gets HIVE Tez container size (hive.tez.container.size).
+    """
+    hive_container_size = None
+    hsi_site = self.getServicesSiteProperties(services, self.HIVE_INTERACTIVE_SITE)
+    if hsi_site and "hive.tez.container.size" in hsi_site:
+      hive_container_size = hsi_site["hive.tez.container.size"]
+
+    if not hive_container_size:
+      # This can happen (1). If config is missing in hive-interactive-site or (2). its an
+      # upgrade scenario from Ambari 2.4 to Ambari 2.5 with ODP 2.5 installed. Read it
+      # from hive-site.
+      #
+      # If Ambari 2.5 after upgrade from 2.4 is managing ODP 2.6 here, this config would have
+      # already been added in hive-interactive-site as part of ODP upgrade from 2.5 to 2.6,
+      # and we wont end up in this block to look up in hive-site.
+      hive_site = self.getServicesSiteProperties(services, "hive-site")
+      if hive_site and "hive.tez.container.size" in hive_site:
+        hive_container_size = hive_site["hive.tez.container.size"]
+    return hive_container_size
+
+  def calculate_tez_am_container_size(self, services, total_cluster_capacity, is_cluster_create_opr=False, enable_hive_interactive_1st_invocation=False):
+    """
+    Calculates Tez App Master container size (tez.am.resource.memory.mb) for tez_hive2/tez-site on initialization if values read is 0.
+    Else returns the read value.
+    """
+    tez_am_resource_memory_mb = self.get_tez_am_resource_memory_mb(services)
+    calculated_tez_am_resource_memory_mb = None
+    if is_cluster_create_opr or enable_hive_interactive_1st_invocation:
+      calculated_tez_am_resource_memory_mb = llap_sizing.tez_am_container_size(total_cluster_capacity)
+      self.logger.info("DBG: Calculated and returning 'tez_am_resource_memory_mb' as : {0}".format(calculated_tez_am_resource_memory_mb))
+      return float(calculated_tez_am_resource_memory_mb)
+    else:
+      self.logger.info("DBG: Returning 'tez_am_resource_memory_mb' as : {0}".format(tez_am_resource_memory_mb))
+      return float(tez_am_resource_memory_mb)
+
+  def get_tez_am_resource_memory_mb(self, services):
+    """
+    Gets Tez's AM resource memory (tez.am.resource.memory.mb) from services' tez-interactive-site, None without one.
+    """
+    tez_interactive_site = self.getServicesSiteProperties(services, "tez-interactive-site")
+    return tez_interactive_site.get("tez.am.resource.memory.mb") if tez_interactive_site else None
+
+  def _normalizeUp(self, val1, val2):
+    """
+    Normalize up 'val2' with respect to 'val1'.
+    """
+    return llap_sizing.normalize_up(val1, val2)
+
+
+class HiveRecommender(HiveYarnSizing, service_advisor.ServiceAdvisor):
   """
   Hive Recommender suggests properties when adding the service for the first time or modifying configs via the UI.
   """
@@ -182,8 +309,9 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
 
 
   def recommendHiveConfigurationsFromODP30(self, configurations, clusterData, services, hosts):
-    hiveSiteProperties = self.getSiteProperties(services["configurations"], "hive-site")
-    hiveEnvProperties = self.getSiteProperties(services["configurations"], "hive-env")
+    config = advisor_common.config_context(services, configurations)
+    hiveSiteProperties = config.input_site("hive-site")
+    hiveEnvProperties = config.input_site("hive-env")
     
     putHiveEnvProperty = self.putProperty(configurations, "hive-env", services)
     putHiveSiteProperty = self.putProperty(configurations, "hive-site", services)
@@ -201,9 +329,10 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
     putHiveInteractiveSitePropertyAttribute = self.putPropertyAttribute(configurations, "hive-interactive-site")
     putHiveAtlasHookPropertyAttribute = self.putPropertyAttribute(configurations,"hive-atlas-application.properties")
 
-    hive_server_hosts = self.getHostsWithComponent("HIVE", "HIVE_SERVER", services, hosts)
-    hive_server_interactive_hosts = self.getHostsWithComponent("HIVE", "HIVE_SERVER_INTERACTIVE", services, hosts)
-    hive_client_hosts = self.getHostsWithComponent("HIVE", "HIVE_CLIENT", services, hosts)
+    host_index = advisor_common.host_index(services, hosts)
+    hive_server_hosts = host_index.hosts_with_component("HIVE", "HIVE_SERVER")
+    hive_server_interactive_hosts = host_index.hosts_with_component("HIVE", "HIVE_SERVER_INTERACTIVE")
+    hive_client_hosts = host_index.hosts_with_component("HIVE", "HIVE_CLIENT")
 
     servicesList = [service["StackServices"]["service_name"] for service in services["services"]]
     
@@ -220,13 +349,11 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
       druid_metadata_uri = ""
       druid_metadata_user = ""
       druid_metadata_type = ""
-      if 'druid-common' in services['configurations']:
-        druid_metadata_uri = services['configurations']['druid-common']['properties']['druid.metadata.storage.connector.connectURI']
-        druid_metadata_type = services['configurations']['druid-common']['properties']['druid.metadata.storage.type']
-        if 'druid.metadata.storage.connector.user' in services['configurations']['druid-common']['properties']:
-          druid_metadata_user = services['configurations']['druid-common']['properties']['druid.metadata.storage.connector.user']
-        else:
-          druid_metadata_user = ""
+      druid_common = config.input_site('druid-common')
+      if druid_common is not None:
+        druid_metadata_uri = druid_common['druid.metadata.storage.connector.connectURI']
+        druid_metadata_type = druid_common['druid.metadata.storage.type']
+        druid_metadata_user = druid_common.get('druid.metadata.storage.connector.user', "")
 
       putHiveInteractiveSiteProperty('hive.druid.broker.address.default', druid_broker_host_port)
       putHiveInteractiveSiteProperty('hive.druid.coordinator.address.default', druid_coordinator_host_port)
@@ -241,7 +368,7 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
     if hiveEnvProperties and hiveSiteProperties and self.checkSiteProperties(hiveSiteProperties, "javax.jdo.option.ConnectionDriverName") and self.checkSiteProperties(hiveEnvProperties, "hive_database"):
       putHiveProperty("javax.jdo.option.ConnectionDriverName", self.getDBDriver(hiveEnvProperties["hive_database"]))
     if hiveSiteProperties and hiveEnvProperties and self.checkSiteProperties(hiveSiteProperties, "ambari.hive.db.schema.name", "javax.jdo.option.ConnectionURL") and self.checkSiteProperties(hiveEnvProperties, "hive_database"):
-      hiveServerHost = self.getHostWithComponent("HIVE", "HIVE_SERVER", services, hosts)
+      hiveServerHost = host_index.host_with_component("HIVE", "HIVE_SERVER")
       hiveDBConnectionURL = hiveSiteProperties["javax.jdo.option.ConnectionURL"]
       protocol = self.getProtocol(hiveEnvProperties["hive_database"])
       oldSchemaName = self.getOldValue(services, "hive-site", "ambari.hive.db.schema.name")
@@ -260,7 +387,7 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
       cpu_count = max(cpu_count, hostData["Hosts"]["cpu_count"])
     putHiveSiteProperty("hive.compactor.worker.threads", str(round(max(cpu_count / 8, 1))))
 
-    hiveMetastoreHost = self.getHostWithComponent("HIVE", "HIVE_METASTORE", services, hosts)
+    hiveMetastoreHost = host_index.host_with_component("HIVE", "HIVE_METASTORE")
     if hiveMetastoreHost is not None and len(hiveMetastoreHost) > 0:
       putHiveSiteProperty("hive.metastore.uris", "thrift://" + hiveMetastoreHost["Hosts"]["host_name"] + ":9083")
       putHiveInteractiveSiteProperty("hive.metastore.uris", "thrift://" + hiveMetastoreHost["Hosts"]["host_name"] + ":9083")
@@ -287,50 +414,16 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
       self.calculateYarnAllocationSizes(configurations, services, hosts)
 
 
-    containerSize = clusterData["mapMemory"] if clusterData["mapMemory"] > 2048 else int(clusterData["reduceMemory"])
-    containerSize = min(clusterData["containers"] * clusterData["ramPerContainer"], containerSize)
-    container_size_bytes = int(containerSize)*1024*1024
-
-    yarnMaxAllocationSize = min(30 * int(configurations["yarn-site"]["properties"]["yarn.scheduler.minimum-allocation-mb"]), int(configurations["yarn-site"]["properties"]["yarn.scheduler.maximum-allocation-mb"]))
-    #duplicate tez task resource calc logic, direct dependency doesn't look good here (in case of Hive without Tez)
-    tez_container_size = min(containerSize, yarnMaxAllocationSize)
-    putHiveSitePropertyAttribute("hive.tez.container.size", "minimum", int(configurations["yarn-site"]["properties"]["yarn.scheduler.minimum-allocation-mb"]))
-    putHiveSitePropertyAttribute("hive.tez.container.size", "maximum", int(configurations["yarn-site"]["properties"]["yarn.scheduler.maximum-allocation-mb"]))
-    if "yarn-site" in configurations:
-      if "yarn.scheduler.minimum-allocation-mb" in configurations["yarn-site"]["properties"]:
-        putHiveSitePropertyAttribute("hive.tez.container.size", "minimum", int(configurations["yarn-site"]["properties"]["yarn.scheduler.minimum-allocation-mb"]))
-        tez_container_size = max(tez_container_size, int(configurations["yarn-site"]["properties"]["yarn.scheduler.minimum-allocation-mb"]))
-      if "yarn.scheduler.maximum-allocation-mb" in configurations["yarn-site"]["properties"]:
-        putHiveSitePropertyAttribute("hive.tez.container.size", "maximum", int(configurations["yarn-site"]["properties"]["yarn.scheduler.maximum-allocation-mb"]))
-        tez_container_size = min(tez_container_size, int(configurations["yarn-site"]["properties"]["yarn.scheduler.maximum-allocation-mb"]))
-
-    putHiveSiteProperty("hive.tez.container.size", tez_container_size)
-    tez_container_size_bytes = int(int(tez_container_size)*0.8*1024*1024) # Xmx == 80% of container
-
-    # Memory
-    putHiveSiteProperty("hive.auto.convert.join.noconditionaltask.size", int(round(tez_container_size_bytes/3)))
-    putHiveSitePropertyAttribute("hive.auto.convert.join.noconditionaltask.size", "maximum", tez_container_size_bytes)
-
     # CBO
-    if "hive-site" in services["configurations"] and "hive.cbo.enable" in services["configurations"]["hive-site"]["properties"]:
-      hive_cbo_enable = services["configurations"]["hive-site"]["properties"]["hive.cbo.enable"]
+    hive_cbo_enable = config.input_value("hive-site", "hive.cbo.enable")
+    if hive_cbo_enable is not None:
       putHiveSiteProperty("hive.stats.fetch.partition.stats", hive_cbo_enable)
       putHiveSiteProperty("hive.stats.fetch.column.stats", hive_cbo_enable)
 
     # Interactive Query
-    yarn_queues = "default"
-    capacitySchedulerProperties = {}
-    if "capacity-scheduler" in services["configurations"]:
-      if "capacity-scheduler" in services["configurations"]["capacity-scheduler"]["properties"]:
-        properties = str(services["configurations"]["capacity-scheduler"]["properties"]["capacity-scheduler"]).split("\n")
-        for property in properties:
-          key,sep,value = property.partition("=")
-          capacitySchedulerProperties[key] = value
-      if "yarn.scheduler.capacity.root.queues" in capacitySchedulerProperties:
-        yarn_queues = str(capacitySchedulerProperties["yarn.scheduler.capacity.root.queues"])
-      elif "yarn.scheduler.capacity.root.queues" in services["configurations"]["capacity-scheduler"]["properties"]:
-        yarn_queues =  services["configurations"]["capacity-scheduler"]["properties"]["yarn.scheduler.capacity.root.queues"]
-    
+    capacitySchedulerProperties, received_as_key_value_pair = config.input_capacity_scheduler()
+    yarn_queues = str(capacitySchedulerProperties.get("yarn.scheduler.capacity.root.queues", "default"))
+
     toProcessQueues = yarn_queues.split(",")
     leafQueueNames = set() # Remove duplicates
     while len(toProcessQueues) > 0:
@@ -350,24 +443,24 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
     putHiveSitePropertyAttribute("hive.server2.tez.default.queues", "entries", leafQueues)
     putHiveSiteProperty("hive.server2.tez.default.queues", ",".join([leafQueue["value"] for leafQueue in leafQueues]))
 
+    # Tez containers, Tez sessions and HiveServer2 heap, sized from the NodeManagers and the default queues above
+    self.recommendHivePerformanceConfigurations(configurations, clusterData, services, hosts)
+
     #HSI HA
     is_hsi_ha = len(hive_server_interactive_hosts) > 1
     putHiveInteractiveSitePropertyAttribute("hive.server2.active.passive.ha.registry.namespace", "visible", str(is_hsi_ha).lower())
 
     # Security
-    if ("configurations" not in services) or ("hive-env" not in services["configurations"]) or \
-              ("properties" not in services["configurations"]["hive-env"]) or \
-              ("hive_security_authorization" not in services["configurations"]["hive-env"]["properties"]) or \
-              str(services["configurations"]["hive-env"]["properties"]["hive_security_authorization"]).lower() == "none":
+    input_hive_security_authorization = config.input_value("hive-env", "hive_security_authorization")
+    if input_hive_security_authorization is None or str(input_hive_security_authorization).lower() == "none":
       putHiveEnvProperty("hive_security_authorization", "None")
     else:
-      putHiveEnvProperty("hive_security_authorization", services["configurations"]["hive-env"]["properties"]["hive_security_authorization"])
+      putHiveEnvProperty("hive_security_authorization", input_hive_security_authorization)
 
     # Recommend Ranger Hive authorization as per Ranger Hive plugin property
-    if "ranger-env" in services["configurations"] and "hive-env" in services["configurations"] and \
-        "ranger-hive-plugin-enabled" in services["configurations"]["ranger-env"]["properties"]:
-      rangerEnvHivePluginProperty = services["configurations"]["ranger-env"]["properties"]["ranger-hive-plugin-enabled"]
-      rangerEnvHiveAuthProperty = services["configurations"]["hive-env"]["properties"]["hive_security_authorization"]
+    rangerEnvHivePluginProperty = config.input_value("ranger-env", "ranger-hive-plugin-enabled")
+    if rangerEnvHivePluginProperty is not None and hiveEnvProperties is not None:
+      rangerEnvHiveAuthProperty = hiveEnvProperties["hive_security_authorization"]
       if (rangerEnvHivePluginProperty.lower() == "yes"):
         putHiveEnvProperty("hive_security_authorization", "Ranger")
       elif (rangerEnvHiveAuthProperty.lower() == "ranger"):
@@ -417,8 +510,8 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
 
     #Hive authentication
     hive_server2_auth = None
-    if "hive-site" in services["configurations"] and "hive.server2.authentication" in services["configurations"]["hive-site"]["properties"]:
-      hive_server2_auth = str(services["configurations"]["hive-site"]["properties"]["hive.server2.authentication"]).lower()
+    if hiveSiteProperties is not None and "hive.server2.authentication" in hiveSiteProperties:
+      hive_server2_auth = str(hiveSiteProperties["hive.server2.authentication"]).lower()
     elif "hive.server2.authentication" in configurations["hive-site"]["properties"]:
       hive_server2_auth = str(configurations["hive-site"]["properties"]["hive.server2.authentication"]).lower()
 
@@ -427,55 +520,51 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
       putHiveSitePropertyAttribute("hive.server2.authentication.ldap.url", "delete", "false")
     else:
       if ("hive.server2.authentication.ldap.url" in configurations["hive-site"]["properties"]) or \
-              ("hive-site" not in services["configurations"]) or \
-              ("hive-site" in services["configurations"] and "hive.server2.authentication.ldap.url" in services["configurations"]["hive-site"]["properties"]):
+              (hiveSiteProperties is None) or \
+              (hiveSiteProperties is not None and "hive.server2.authentication.ldap.url" in hiveSiteProperties):
         putHiveSitePropertyAttribute("hive.server2.authentication.ldap.url", "delete", "true")
 
     if hive_server2_auth == "kerberos":
-      if "hive-site" in services["configurations"] and "hive.server2.authentication.kerberos.keytab" not in services["configurations"]["hive-site"]["properties"]:
+      if hiveSiteProperties is not None and "hive.server2.authentication.kerberos.keytab" not in hiveSiteProperties:
         putHiveSiteProperty("hive.server2.authentication.kerberos.keytab", "")
-      if "hive-site" in services["configurations"] and "hive.server2.authentication.kerberos.principal" not in services["configurations"]["hive-site"]["properties"]:
+      if hiveSiteProperties is not None and "hive.server2.authentication.kerberos.principal" not in hiveSiteProperties:
         putHiveSiteProperty("hive.server2.authentication.kerberos.principal", "")
     elif "KERBEROS" not in servicesList: # Since "hive_server2_auth" cannot be relied on within the default, empty recommendations request
       if ("hive.server2.authentication.kerberos.keytab" in configurations["hive-site"]["properties"]) or \
-              ("hive-site" not in services["configurations"]) or \
-              ("hive-site" in services["configurations"] and "hive.server2.authentication.kerberos.keytab" in services["configurations"]["hive-site"]["properties"]):
+              (hiveSiteProperties is None) or \
+              (hiveSiteProperties is not None and "hive.server2.authentication.kerberos.keytab" in hiveSiteProperties):
         putHiveSitePropertyAttribute("hive.server2.authentication.kerberos.keytab", "delete", "true")
       if ("hive.server2.authentication.kerberos.principal" in configurations["hive-site"]["properties"]) or \
-              ("hive-site" not in services["configurations"]) or \
-              ("hive-site" in services["configurations"] and "hive.server2.authentication.kerberos.principal" in services["configurations"]["hive-site"]["properties"]):
+              (hiveSiteProperties is None) or \
+              (hiveSiteProperties is not None and "hive.server2.authentication.kerberos.principal" in hiveSiteProperties):
         putHiveSitePropertyAttribute("hive.server2.authentication.kerberos.principal", "delete", "true")
 
     if hive_server2_auth == "pam":
       putHiveSiteProperty("hive.server2.authentication.pam.services", "")
     else:
       if ("hive.server2.authentication.pam.services" in configurations["hive-site"]["properties"]) or \
-              ("hive-site" not in services["configurations"]) or \
-              ("hive-site" in services["configurations"] and "hive.server2.authentication.pam.services" in services["configurations"]["hive-site"]["properties"]):
+              (hiveSiteProperties is None) or \
+              (hiveSiteProperties is not None and "hive.server2.authentication.pam.services" in hiveSiteProperties):
         putHiveSitePropertyAttribute("hive.server2.authentication.pam.services", "delete", "true")
 
     if hive_server2_auth == "custom":
       putHiveSiteProperty("hive.server2.custom.authentication.class", "")
     else:
       if ("hive.server2.authentication" in configurations["hive-site"]["properties"]) or \
-              ("hive-site" not in services["configurations"]) or \
-              ("hive-site" in services["configurations"] and "hive.server2.custom.authentication.class" in services["configurations"]["hive-site"]["properties"]):
+              (hiveSiteProperties is None) or \
+              (hiveSiteProperties is not None and "hive.server2.custom.authentication.class" in hiveSiteProperties):
         putHiveSitePropertyAttribute("hive.server2.custom.authentication.class", "delete", "true")
 
-    # HiveServer, Client, Metastore heapsize
-    hs_heapsize_multiplier = 3.0/8
+    # Metastore heapsize (HiveServer2's is in recommendHivePerformanceConfigurations)
     hm_heapsize_multiplier = 1.0/8
     # HiveServer2 and HiveMetastore located on the same host
     if hive_server_hosts is not None and len(hive_server_hosts):
       hs_host_ram = hive_server_hosts[0]["Hosts"]["total_mem"]/1024
       putHiveEnvProperty("hive.metastore.heapsize", max(512, int(hs_host_ram*hm_heapsize_multiplier)))
-      putHiveEnvProperty("hive.heapsize", max(512, int(hs_host_ram*hs_heapsize_multiplier)))
       putHiveEnvPropertyAttribute("hive.metastore.heapsize", "maximum", max(1024, hs_host_ram))
-      putHiveEnvPropertyAttribute("hive.heapsize", "maximum", max(1024, hs_host_ram))
 
     # if hive using sqla db, then we should add DataNucleus property
-    sqla_db_used = "hive-env" in services["configurations"] and "hive_database" in services["configurations"]["hive-env"]["properties"] and \
-                   services["configurations"]["hive-env"]["properties"]["hive_database"] == "Existing SQL Anywhere Database"
+    sqla_db_used = config.input_value("hive-env", "hive_database") == "Existing SQL Anywhere Database"
     if sqla_db_used:
       putHiveSiteProperty("datanucleus.rdbms.datastoreAdapterClassName","org.datanucleus.store.rdbms.adapter.SQLAnywhereAdapter")
     else:
@@ -491,20 +580,14 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
     
     is_atlas_present_in_cluster = "ATLAS" in servicesList
 
-    enable_external_atlas_for_hive = False
-    if "hive-atlas-application.properties" in services["configurations"] and "enable.external.atlas.for.hive" in services["configurations"]["hive-atlas-application.properties"]["properties"]:
-      enable_external_atlas_for_hive = services["configurations"]["hive-atlas-application.properties"]["properties"]["enable.external.atlas.for.hive"].lower() == "true"
+    enable_external_atlas_for_hive = str(config.input_value("hive-atlas-application.properties", "enable.external.atlas.for.hive")).lower() == "true"
 
     if is_atlas_present_in_cluster or enable_external_atlas_for_hive:
       putHiveEnvProperty("hive.atlas.hook", "true")
     else:
       putHiveEnvProperty("hive.atlas.hook", "false")
 
-    enable_atlas_hook = False
-    if "hive-env" in configurations and "hive.atlas.hook" in configurations["hive-env"]["properties"]:
-      enable_atlas_hook = configurations["hive-env"]["properties"]["hive.atlas.hook"] == "true"
-    elif "hive-env" in services["configurations"] and "hive.atlas.hook" in services["configurations"]["hive-env"]["properties"]:
-      enable_atlas_hook = services["configurations"]["hive-env"]["properties"]["hive.atlas.hook"] == "true"
+    enable_atlas_hook = config.latest_value("hive-env", "hive.atlas.hook") == "true"
 
     atlas_hook_class = "org.apache.atlas.hive.hook.HiveHook"
     if enable_atlas_hook:
@@ -521,32 +604,28 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
     putHiveSiteProperty("hive.exec.post.hooks", hooks_value)
 
     # This is no longer used in ODP 2.5, but still needed in ODP 2.3 and 2.4
-    atlas_server_host_info = self.getHostWithComponent("ATLAS", "ATLAS_SERVER", services, hosts)
+    atlas_server_host_info = host_index.host_with_component("ATLAS", "ATLAS_SERVER")
     if is_atlas_present_in_cluster and atlas_server_host_info:
       atlas_rest_host = atlas_server_host_info["Hosts"]["host_name"]
       scheme = "http"
       metadata_port = "21000"
       atlas_server_default_https_port = "21443"
       tls_enabled = "false"
-      if "application-properties" in services["configurations"]:
-        if "atlas.enableTLS" in services["configurations"]["application-properties"]["properties"]:
-          tls_enabled = services["configurations"]["application-properties"]["properties"]["atlas.enableTLS"]
-        if "atlas.server.http.port" in services["configurations"]["application-properties"]["properties"]:
-          metadata_port = services["configurations"]["application-properties"]["properties"]["atlas.server.http.port"]
+      atlas_application_properties = config.input_site("application-properties")
+      if atlas_application_properties is not None:
+        tls_enabled = atlas_application_properties.get("atlas.enableTLS", tls_enabled)
+        metadata_port = atlas_application_properties.get("atlas.server.http.port", metadata_port)
         if tls_enabled.lower() == "true":
           scheme = "https"
-          if "atlas.server.https.port" in services["configurations"]["application-properties"]["properties"]:
-            metadata_port =  services["configurations"]["application-properties"]["properties"]["atlas.server.https.port"]
-          else:
-            metadata_port = atlas_server_default_https_port
+          metadata_port = atlas_application_properties.get("atlas.server.https.port", atlas_server_default_https_port)
       putHiveSiteProperty("atlas.rest.address", "{0}://{1}:{2}".format(scheme, atlas_rest_host, metadata_port))
     else:
       putHiveSitePropertyAttribute("atlas.cluster.name", "delete", "true")
       putHiveSitePropertyAttribute("atlas.rest.address", "delete", "true")
 
     # For "Hive Server Interactive", if the component exists.
-    hsi_hosts = self.getHostsForComponent(services, "HIVE", "HIVE_SERVER_INTERACTIVE")
-    hsi_properties = self.getServicesSiteProperties(services, self.HIVE_INTERACTIVE_SITE)
+    hsi_hosts = host_index.host_names("HIVE", "HIVE_SERVER_INTERACTIVE")
+    hsi_properties = config.input_site(self.HIVE_INTERACTIVE_SITE)
 
     if len(hsi_hosts) > 0:
       putHiveInteractiveEnvProperty("enable_hive_interactive", "true")
@@ -555,11 +634,7 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
       if hsi_properties and "hive.llap.daemon.queue.name" in hsi_properties:
           self.setLlapDaemonQueuePropAttributes(services, configurations)
 
-          hsi_conf_properties = self.getSiteProperties(configurations, self.HIVE_INTERACTIVE_SITE)
-
-          hive_tez_default_queue = hsi_properties["hive.llap.daemon.queue.name"]
-          if hsi_conf_properties and "hive.llap.daemon.queue.name" in hsi_conf_properties:
-            hive_tez_default_queue = hsi_conf_properties["hive.llap.daemon.queue.name"]
+          hive_tez_default_queue = config.latest_value(self.HIVE_INTERACTIVE_SITE, "hive.llap.daemon.queue.name")
 
           if hive_tez_default_queue:
             putHiveInteractiveSiteProperty("hive.server2.tez.default.queues", hive_tez_default_queue)
@@ -574,32 +649,22 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
       if zookeeper_host_port:
         putHiveInteractiveSiteProperty("hive.llap.zk.sm.connectionString", zookeeper_host_port)
 
-    hive_user = "hive"
-    if "hive-env" in services["configurations"] and "hive_user" in services["configurations"]["hive-env"]["properties"]:
-      hive_user = services["configurations"]["hive-env"]["properties"]["hive_user"]
+    hive_user = config.input_value("hive-env", "hive_user", "hive")
 
     # Ranger user
-    ranger_hive_plugin_enabled = False
-    if "hive-env" in configurations and "hive_security_authorization" in configurations["hive-env"]["properties"]:
-      ranger_hive_plugin_enabled = (configurations["hive-env"]["properties"]["hive_security_authorization"].lower() == "ranger")
-    elif "hive-env" in services["configurations"] and "hive_security_authorization" in services["configurations"]["hive-env"]["properties"]:
-      ranger_hive_plugin_enabled = (services["configurations"]["hive-env"]["properties"]["hive_security_authorization"].lower() == "ranger")
+    ranger_hive_plugin_enabled = str(config.latest_value("hive-env", "hive_security_authorization")).lower() == "ranger"
 
-    if ranger_hive_plugin_enabled and "ranger-hive-plugin-properties" in services["configurations"] and "REPOSITORY_CONFIG_USERNAME" in services["configurations"]["ranger-hive-plugin-properties"]["properties"]:
+    if ranger_hive_plugin_enabled and config.input_value("ranger-hive-plugin-properties", "REPOSITORY_CONFIG_USERNAME") is not None:
       self.logger.info("Setting Hive Repo user for Ranger.")
       putRangerHivePluginProperty("REPOSITORY_CONFIG_USERNAME", hive_user)
     else:
       self.logger.info("Not setting Hive Repo user for Ranger.")
 
     # Atlas Kerberos settings
-    if "hive-atlas-application.properties" in services["configurations"]:
+    if config.input_site("hive-atlas-application.properties") is not None:
       security_enabled = HiveServiceAdvisor.isKerberosEnabled(services, configurations)
       
-      enable_atlas_hook = False
-      if "hive-env" in configurations and "hive.atlas.hook" in configurations["hive-env"]["properties"]:
-        enable_atlas_hook = configurations["hive-env"]["properties"]["hive.atlas.hook"].lower() == "true"
-      elif "hive-env" in services["configurations"] and "hive.atlas.hook" in services["configurations"]["hive-env"]["properties"]:
-        enable_atlas_hook = services["configurations"]["hive-env"]["properties"]["hive.atlas.hook"].lower() == "true"
+      enable_atlas_hook = str(config.latest_value("hive-env", "hive.atlas.hook")).lower() == "true"
       
       if security_enabled and enable_atlas_hook:
         putHiveAtlasHookProperty("atlas.jaas.ticketBased-KafkaClient.loginModuleControlFlag", "required")
@@ -614,8 +679,86 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
     beeline_jdbc_url_default = "llap" if (hive_server_interactive_hosts and not hive_server_hosts) else "container"
     putHiveEnvProperty("beeline_jdbc_url_default", beeline_jdbc_url_default)
 
+  def recommendHivePerformanceConfigurations(self, configurations, clusterData, services, hosts):
+    """
+    Sizes HiveServer2's Tez work from the NodeManagers and the queues of hive.server2.tez.default.queues:
+    hive.tez.container.size (one container per NodeManager vcore) and the map join threshold, tez-site's
+    tez.am.resource.memory.mb (first invocation only), hive.server2.tez.sessions.per.default.queue (the Tez AMs that fit in the smallest
+    default queue) and the HiveServer2 heap (for the queries those sessions run at once).
+    """
+    config = advisor_common.config_context(services, configurations)
+    host_index = advisor_common.host_index(services, hosts)
+    servicesList = [service["StackServices"]["service_name"] for service in services["services"]]
+
+    putHiveEnvProperty = self.putProperty(configurations, "hive-env", services)
+    putHiveSiteProperty = self.putProperty(configurations, "hive-site", services)
+    putHiveEnvPropertyAttribute = self.putPropertyAttribute(configurations, "hive-env")
+    putHiveSitePropertyAttribute = self.putPropertyAttribute(configurations, "hive-site")
+
+    node_manager_hosts = host_index.hosts_with_component("YARN", "NODEMANAGER")
+    hive_server_hosts = host_index.hosts_with_component("HIVE", "HIVE_SERVER")
+    yarn_nm_mem_in_mb = self.get_yarn_nm_mem_in_mb(services, configurations) if node_manager_hosts else None
+    yarn_min_container_size = int(self.get_yarn_min_container_size(services, configurations))
+    yarn_max_container_size = int(config.effective_value("yarn-site", "yarn.scheduler.maximum-allocation-mb"))
+    yarn_nm_vcores = config.effective_value("yarn-site", "yarn.nodemanager.resource.cpu-vcores")
+    if not yarn_nm_vcores and node_manager_hosts:
+      yarn_nm_vcores = min(host["Hosts"]["cpu_count"] for host in node_manager_hosts)
+
+    # Tez containers: never more than 30 minimum allocations
+    max_tez_container_size = min(30 * yarn_min_container_size, yarn_max_container_size)
+    if yarn_nm_mem_in_mb and yarn_nm_vcores:
+      tez_container_size = llap_sizing.tez_container_size(yarn_nm_mem_in_mb, int(yarn_nm_vcores), yarn_min_container_size,
+                                                          max_tez_container_size)
+    else:
+      # No NodeManager layout yet, size from the cluster summary
+      containerSize = clusterData["mapMemory"] if clusterData["mapMemory"] > 2048 else int(clusterData["reduceMemory"])
+      containerSize = min(clusterData["containers"] * clusterData["ramPerContainer"], containerSize)
+      tez_container_size = int(max(min(containerSize, max_tez_container_size), yarn_min_container_size))
+    putHiveSiteProperty("hive.tez.container.size", tez_container_size)
+    putHiveSitePropertyAttribute("hive.tez.container.size", "minimum", yarn_min_container_size)
+    putHiveSitePropertyAttribute("hive.tez.container.size", "maximum", yarn_max_container_size)
+    putHiveSiteProperty("hive.auto.convert.join.noconditionaltask.size", llap_sizing.map_join_size(tez_container_size))
+    putHiveSitePropertyAttribute("hive.auto.convert.join.noconditionaltask.size", "maximum",
+                                 llap_sizing.tez_task_heap_bytes(tez_container_size))
+
+    default_queues = [queue for queue in str(config.latest_value("hive-site", "hive.server2.tez.default.queues", "default")).split(",") if queue]
+    if "TEZ" in servicesList and yarn_nm_mem_in_mb:
+      total_cluster_cap = len(node_manager_hosts) * yarn_nm_mem_in_mb
+      tez_am_container_size = self._normalizeUp(self.calculate_tez_am_container_size(services, total_cluster_cap, is_cluster_create_opr=True),
+                                                yarn_min_container_size)
+      if not config.changed_configurations:
+        # tez-site is shared by every Tez client, so its AM size is only recommended on the first invocation
+        putTezSiteProperty = self.putProperty(configurations, "tez-site", services)
+        putTezSiteProperty("tez.am.resource.memory.mb", int(tez_am_container_size))
+      tez_am_container_size = float(config.latest_value("tez-site", "tez.am.resource.memory.mb", tez_am_container_size))
+
+      # Tez sessions: the AMs every HiveServer2 keeps open in each default queue
+      if hive_server_hosts:
+        queue_tree = config.queue_tree(config.latest_capacity_scheduler())
+        default_am_fraction = float(queue_tree.properties.get("yarn.scheduler.capacity.maximum-am-resource-percent", 0.1))
+        max_sessions = min(host["Hosts"]["cpu_count"] for host in hive_server_hosts)
+        sessions = None
+        for queue in default_queues:
+          queue_cap = queue_tree.absolute_capacity(queue, total_cluster_cap)
+          if not queue_cap:
+            self.logger.warning("Couldn't retrieve '{0}' queue's capacity, not sizing Tez sessions for it.".format(queue))
+            continue
+          queue_sessions = llap_sizing.sessions_per_queue(queue_cap, queue_tree.am_fraction(queue, default_am_fraction),
+                                                          tez_am_container_size, yarn_min_container_size,
+                                                          len(hive_server_hosts), max_sessions)
+          sessions = queue_sessions if sessions is None else min(sessions, queue_sessions)
+        if sessions is not None:
+          putHiveSiteProperty("hive.server2.tez.sessions.per.default.queue", sessions)
+
+    # HiveServer2 heap: 3/8 of the host, at least what one query per Tez session needs
+    if hive_server_hosts:
+      hs_host_ram = hive_server_hosts[0]["Hosts"]["total_mem"]/1024
+      sessions = int(config.latest_value("hive-site", "hive.server2.tez.sessions.per.default.queue", 1))
+      putHiveEnvProperty("hive.heapsize", llap_sizing.hs2_heap_size(sessions * max(len(default_queues), 1), hs_host_ram))
+      putHiveEnvPropertyAttribute("hive.heapsize", "maximum", max(1024, hs_host_ram))
+
   def druid_host(self, component_name, config_type, services, hosts, default_host=None):
-    hosts = self.getHostsWithComponent('DRUID', component_name, services, hosts)
+    hosts = advisor_common.host_index(services, hosts).hosts_with_component('DRUID', component_name)
     if hosts and config_type in services['configurations']:
       host = hosts[0]['Hosts']['host_name']
       port = services['configurations'][config_type]['properties']['druid.port']
@@ -632,46 +775,10 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
     #TODO Determine if this is doing the right thing if some queue is setup with capacity=0, or is STOPPED. Maybe don't list it.
     putHiveInteractiveSitePropertyAttribute = self.putPropertyAttribute(configurations, self.HIVE_INTERACTIVE_SITE)
 
-    capacity_scheduler_properties = dict()
-
-    # Read "capacity-scheduler" from configurations if we modified and added recommendation to it, as part of current
-    # StackAdvisor invocation.
-    if "capacity-scheduler" in configurations:
-        cap_sched_props_as_dict = configurations["capacity-scheduler"]["properties"]
-        if "capacity-scheduler" in cap_sched_props_as_dict:
-          cap_sched_props_as_str = configurations["capacity-scheduler"]["properties"]["capacity-scheduler"]
-          if cap_sched_props_as_str:
-            cap_sched_props_as_str = str(cap_sched_props_as_str).split("\n")
-            if len(cap_sched_props_as_str) > 0 and cap_sched_props_as_str[0] != "null":
-              # Got "capacity-scheduler" configs as one "\n" separated string
-              for property in cap_sched_props_as_str:
-                key, sep, value = property.partition("=")
-                capacity_scheduler_properties[key] = value
-              self.logger.info("'capacity-scheduler' configs is set as a single '\\n' separated string in current invocation. "
-                          "count(configurations['capacity-scheduler']['properties']['capacity-scheduler']) = "
-                          "{0}".format(len(capacity_scheduler_properties)))
-            else:
-              self.logger.info("Read configurations['capacity-scheduler']['properties']['capacity-scheduler'] is : {0}".format(cap_sched_props_as_str))
-          else:
-            self.logger.info("configurations['capacity-scheduler']['properties']['capacity-scheduler'] : {0}.".format(cap_sched_props_as_str))
-
-        # if "capacity_scheduler_properties" is empty, implies we may have "capacity-scheduler" configs as dictionary
-        # in configurations, if "capacity-scheduler" changed in current invocation.
-        if not capacity_scheduler_properties:
-          if isinstance(cap_sched_props_as_dict, dict) and len(cap_sched_props_as_dict) > 1:
-            capacity_scheduler_properties = cap_sched_props_as_dict
-            self.logger.info("'capacity-scheduler' changed in current Stack Advisor invocation. Retrieved the configs as dictionary from configurations.")
-          else:
-            self.logger.info("Read configurations['capacity-scheduler']['properties'] is : {0}".format(cap_sched_props_as_dict))
-    else:
-      self.logger.info("'capacity-scheduler' not modified in the current Stack Advisor invocation.")
-
-
-    # if "capacity_scheduler_properties" is still empty, implies "capacity_scheduler" wasn't change in current
-    # SA invocation. Thus, read it from input : "services".
-    if not capacity_scheduler_properties:
-      capacity_scheduler_properties, received_as_key_value_pair = self.getCapacitySchedulerProperties(services)
-      self.logger.info("'capacity-scheduler' not changed in current Stack Advisor invocation. Retrieved the configs from services.")
+    # "capacity-scheduler" as recommended in the current Stack Advisor invocation (as one "\n" separated string or as
+    # a dictionary) if it was changed, else as read from input : "services". Parsed once per invocation.
+    capacity_scheduler_properties = advisor_common.config_context(services, configurations).latest_capacity_scheduler()
+    self.logger.info("Retrieved 'capacity-scheduler' configs, count = {0}.".format(len(capacity_scheduler_properties)))
 
     # Get set of current YARN leaf queues.
     leafQueueNames = self.getAllYarnLeafQueues(capacity_scheduler_properties)
@@ -685,7 +792,7 @@ class HiveRecommender(service_advisor.ServiceAdvisor):
                    "'hive.server2.tez.default.queues' property attributes.")
 
 
-class HiveValidator(service_advisor.ServiceAdvisor):
+class HiveValidator(HiveYarnSizing, service_advisor.ServiceAdvisor):
   """
   Hive Validator checks the correctness of properties whenever the service is first added or the user attempts to
   change configs via the UI.
@@ -703,6 +810,28 @@ class HiveValidator(service_advisor.ServiceAdvisor):
                        ("hive-interactive-env", self.validateHiveInteractiveEnvConfigurationsFromODP30),
                        ("hive-interactive-site", self.validateHiveInteractiveSiteConfigurationsFromODP30)]
 
+    # Config types each validator reads, its own included. The hive-site validator also compares against the
+    # recommended hive.tez.container.size, which is sized from yarn-site.
+    self.validator_reads = {
+      "hive-site": frozenset(["hive-site", "hive-env", "yarn-site"]),
+      "hive-env": frozenset(["hive-env", "hive-site", "hiveserver2-site", "ranger-env"]),
+      "hiveserver2-site": frozenset(["hiveserver2-site", "hive-env", "ranger-hive-plugin-properties"]),
+      "hive-interactive-env": frozenset(["hive-interactive-env", "yarn-site"]),
+      "hive-interactive-site": frozenset(["hive-interactive-site", "hive-site", "capacity-scheduler", "yarn-site",
+                                          "tez-interactive-site"]),
+    }
+
+  def affected_validators(self, services):
+    """
+    The validators to run for this call: all of them on the first invocation (empty services["changed-configurations"]),
+    later only those that read one of the changed config types.
+    """
+    changed_types = set(changed.get("type") for changed in services.get("changed-configurations") or [])
+    if not changed_types:
+      return self.validators
+    return [(config_type, method) for (config_type, method) in self.validators
+            if self.validator_reads[config_type] & changed_types]
+
 
   def validateHiveConfigurationsFromODP30(self, properties, recommendedDefaults, configurations, services, hosts):
     validationItems = [ {"config-name": "hive.tez.container.size", "item": self.validatorLessThenDefaultValue(properties, recommendedDefaults, "hive.tez.container.size")},
@@ -758,9 +887,10 @@ class HiveValidator(service_advisor.ServiceAdvisor):
     hive_site = self.getSiteProperties(configurations, "hive-site")
     hiveserver2_site = self.getSiteProperties(configurations, "hiveserver2-site")
     
-    hive_server_hosts = self.getHostsWithComponent("HIVE", "HIVE_SERVER", services, hosts)
-    hive_server_interactive_hosts = self.getHostsWithComponent("HIVE", "HIVE_SERVER_INTERACTIVE", services, hosts)
-    hive_client_hosts = self.getHostsWithComponent("HIVE", "HIVE_CLIENT", services, hosts)
+    host_index = advisor_common.host_index(services, hosts)
+    hive_server_hosts = host_index.hosts_with_component("HIVE", "HIVE_SERVER")
+    hive_server_interactive_hosts = host_index.hosts_with_component("HIVE", "HIVE_SERVER_INTERACTIVE")
+    hive_client_hosts = host_index.hosts_with_component("HIVE", "HIVE_CLIENT")
     
     servicesList = [service["StackServices"]["service_name"] for service in services["services"]]
     if "hive_security_authorization" in hive_env and \
@@ -876,7 +1006,7 @@ class HiveValidator(service_advisor.ServiceAdvisor):
     hive_site_env_properties = self.getSiteProperties(configurations, "hive-interactive-env")
     yarn_site_properties = self.getSiteProperties(configurations, "yarn-site")
     validationItems = []
-    hsi_hosts = self.getHostsForComponent(services, "HIVE", "HIVE_SERVER_INTERACTIVE")
+    hsi_hosts = advisor_common.host_index(services, hosts).host_names("HIVE", "HIVE_SERVER_INTERACTIVE")
 
     # Check for expecting "enable_hive_interactive" is ON given that there is HSI on at least one host present.
     if len(hsi_hosts) > 0:
@@ -920,31 +1050,33 @@ class HiveValidator(service_advisor.ServiceAdvisor):
         5. if 'llap' queue is selected, in order to run Service Checks, 'remaining available capacity' in cluster is atleast 512 MB.
     """
     validationItems = []
-    hsi_hosts = self.getHostsForComponent(services, "HIVE", "HIVE_SERVER_INTERACTIVE")
+    hsi_hosts = advisor_common.host_index(services, hosts).host_names("HIVE", "HIVE_SERVER_INTERACTIVE")
     llap_queue_name = None
     llap_queue_cap_perc = None
-    MIN_ASSUMED_CAP_REQUIRED_FOR_SERVICE_CHECKS = 512
+    MIN_ASSUMED_CAP_REQUIRED_FOR_SERVICE_CHECKS = llap_sizing.MIN_CAPACITY_FOR_SERVICE_CHECKS_MB
     llap_queue_cap = None
-    hsi_site = self.getServicesSiteProperties(services, self.HIVE_INTERACTIVE_SITE)
+    config = advisor_common.config_context(services, configurations)
+    hsi_site = config.input_site(self.HIVE_INTERACTIVE_SITE)
 
     if len(hsi_hosts) == 0:
       return []
 
     # Get total cluster capacity
-    node_manager_host_list = self.getHostsForComponent(services, "YARN", "NODEMANAGER")
+    node_manager_host_list = advisor_common.host_index(services, hosts).host_names("YARN", "NODEMANAGER")
     node_manager_cnt = len(node_manager_host_list)
     yarn_nm_mem_in_mb = self.get_yarn_nm_mem_in_mb(services, configurations)
     total_cluster_cap = node_manager_cnt * yarn_nm_mem_in_mb
-    capacity_scheduler_properties, received_as_key_value_pair = self.getCapacitySchedulerProperties(services)
+    capacity_scheduler_properties, received_as_key_value_pair = config.input_capacity_scheduler()
 
     if not capacity_scheduler_properties:
       self.logger.warning("Couldn't retrieve 'capacity-scheduler' properties while doing validation checks for Hive Server Interactive.")
       return []
+    queue_tree = config.queue_tree(capacity_scheduler_properties)
 
     if hsi_site:
       if "hive.llap.daemon.queue.name" in hsi_site and hsi_site["hive.llap.daemon.queue.name"]:
         llap_queue_name = hsi_site["hive.llap.daemon.queue.name"]
-        llap_queue_cap = self.__getSelectedQueueTotalCap(capacity_scheduler_properties, llap_queue_name, total_cluster_cap)
+        llap_queue_cap = self.__getSelectedQueueTotalCap(queue_tree, llap_queue_name, total_cluster_cap)
 
         if llap_queue_cap:
           llap_queue_cap_perc = float(llap_queue_cap * 100 / total_cluster_cap)
@@ -961,7 +1093,7 @@ class HiveValidator(service_advisor.ServiceAdvisor):
            "Hive Server Interactive.".format(llap_queue_name))
 
         # Validate that current selected queue in 'hive.llap.daemon.queue.name' state is not STOPPED.
-        llap_selected_queue_state = self.__getQueueStateFromCapacityScheduler(capacity_scheduler_properties, llap_queue_name)
+        llap_selected_queue_state = self.__getQueueStateFromCapacityScheduler(queue_tree, llap_queue_name)
         if llap_selected_queue_state:
           if llap_selected_queue_state == "STOPPED":
             errMsg2 = "Selected queue '{0}' current state is : '{1}'. It is required to be in 'RUNNING' state for LLAP to run"\
@@ -986,9 +1118,7 @@ class HiveValidator(service_advisor.ServiceAdvisor):
           num_tez_sessions = int(num_tez_sessions)
           yarn_min_container_size = int(self.get_yarn_min_container_size(services, configurations))
           tez_am_container_size = self.calculate_tez_am_container_size(services, int(total_cluster_cap))
-          normalized_tez_am_container_size = self._normalizeUp(tez_am_container_size, yarn_min_container_size)
-          llap_selected_queue_cap_remaining = llap_queue_cap - (normalized_tez_am_container_size * num_tez_sessions)
-          if llap_selected_queue_cap_remaining <= llap_queue_cap/2:
+          if llap_sizing.sessions_overcommitted(llap_queue_cap, num_tez_sessions, tez_am_container_size, yarn_min_container_size):
             errMsg3 = " Reducing the 'Maximum Total Concurrent Queries' (value: {0}) is advisable as it is consuming more than 50% of " \
                       "'{1}' queue for LLAP.".format(num_tez_sessions, llap_queue_name)
             validationItems.append({"config-name": "hive.server2.tez.sessions.per.default.queue","item": self.getWarnItem(errMsg3)})
@@ -1001,7 +1131,7 @@ class HiveValidator(service_advisor.ServiceAdvisor):
     # in order to run Service Checks.
     if llap_queue_name and llap_queue_cap_perc and llap_queue_name == self.AMBARI_MANAGED_LLAP_QUEUE_NAME:
       curr_selected_queue_for_llap_cap = float(llap_queue_cap_perc) / 100 * total_cluster_cap
-      available_cap_in_cluster = total_cluster_cap - curr_selected_queue_for_llap_cap
+      available_cap_in_cluster = llap_sizing.capacity_left_for_service_checks(total_cluster_cap, float(llap_queue_cap_perc))
       if available_cap_in_cluster < MIN_ASSUMED_CAP_REQUIRED_FOR_SERVICE_CHECKS:
         errMsg4 = "Capacity used by '{0}' queue is '{1}'. Service checks may not run as remaining available capacity " \
                    "({2}) in cluster is less than 512 MB.".format(self.AMBARI_MANAGED_LLAP_QUEUE_NAME, curr_selected_queue_for_llap_cap, available_cap_in_cluster)
@@ -1010,230 +1140,50 @@ class HiveValidator(service_advisor.ServiceAdvisor):
     validationProblems = self.toConfigurationValidationProblems(validationItems, "hive-interactive-site")
     return validationProblems
 
-  def get_yarn_nm_mem_in_mb(self, services, configurations):
-    """
-    Gets YARN NodeManager memory in MB (yarn.nodemanager.resource.memory-mb).
-    Reads from:
-      - configurations (if changed as part of current Stack Advisor invocation (output)), and services["changed-configurations"]
-        is empty, else
-      - services['configurations'] (input).
-
-    services["changed-configurations"] would be empty is Stack Advisor call if made from Blueprints (1st invocation). Subsequent
-    Stack Advisor calls will have it non-empty. We do this because in subsequent invocations, even if Stack Advsior calculates this
-    value (configurations), it is finally not recommended, making 'input' value to survive.
-    """
-    yarn_nm_mem_in_mb = None
-
-    yarn_site = self.getServicesSiteProperties(services, "yarn-site")
-    yarn_site_properties = self.getSiteProperties(configurations, "yarn-site")
-
-    # Check if services["changed-configurations"] is empty and "yarn.nodemanager.resource.memory-mb" is modified in current ST invocation.
-    if not ("changed-configurations" in services and services["changed-configurations"]) and yarn_site_properties and "yarn.nodemanager.resource.memory-mb" in yarn_site_properties:
-      yarn_nm_mem_in_mb = float(yarn_site_properties["yarn.nodemanager.resource.memory-mb"])
-    elif yarn_site and "yarn.nodemanager.resource.memory-mb" in yarn_site:
-      # Check if "yarn.nodemanager.resource.memory-mb" is input in services array.
-      yarn_nm_mem_in_mb = float(yarn_site["yarn.nodemanager.resource.memory-mb"])
-
-    if yarn_nm_mem_in_mb <= 0.0:
-      self.logger.warning("'yarn.nodemanager.resource.memory-mb' current value : {0}. Expected value : > 0".format(yarn_nm_mem_in_mb))
-
-    return yarn_nm_mem_in_mb
-
-  def __getQueueCapacityKeyFromCapacityScheduler(self, capacity_scheduler_properties, llap_daemon_selected_queue_name):
+  def __getQueueCapacityKeyFromCapacityScheduler(self, queue_tree, llap_daemon_selected_queue_name):
     """
     Retrieves the passed in queue's 'capacity' related key from Capacity Scheduler.
     """
-    # Identify the key which contains the capacity for "llap_daemon_selected_queue_name".
-    cap_sched_keys = capacity_scheduler_properties.keys()
-    llap_selected_queue_cap_key =  None
-    current_selected_queue_for_llap_cap = None
-    for key in cap_sched_keys:
-      # Expected capacity prop key is of form : "yarn.scheduler.capacity.<one or more queues in path separated by ".'>.[llap_daemon_selected_queue_name].capacity'
-      if key.endswith(llap_daemon_selected_queue_name+".capacity") and key.startswith("yarn.scheduler.capacity.root"):
-        self.logger.info("DBG: Selected queue name as: " + key)
-        llap_selected_queue_cap_key = key
-        break;
+    llap_selected_queue_cap_key = queue_tree.capacity_key(llap_daemon_selected_queue_name)
+    if llap_selected_queue_cap_key:
+      self.logger.info("DBG: Selected queue name as: " + llap_selected_queue_cap_key)
     return llap_selected_queue_cap_key
 
-  def __getQueueStateFromCapacityScheduler(self, capacity_scheduler_properties, llap_daemon_selected_queue_name):
+  def __getQueueStateFromCapacityScheduler(self, queue_tree, llap_daemon_selected_queue_name):
     """
     Retrieves the passed in queue's 'state' from Capacity Scheduler.
     """
-    # Identify the key which contains the state for "llap_daemon_selected_queue_name".
-    cap_sched_keys = capacity_scheduler_properties.keys()
-    llap_selected_queue_state_key =  None
-    llap_selected_queue_state = None
-    for key in cap_sched_keys:
-      if key.endswith(llap_daemon_selected_queue_name+".state"):
-        llap_selected_queue_state_key = key
-        break;
-    llap_selected_queue_state = capacity_scheduler_properties.get(llap_selected_queue_state_key)
-    return llap_selected_queue_state
-
-  def __getQueueAmFractionFromCapacityScheduler(self, capacity_scheduler_properties, llap_daemon_selected_queue_name):
+    return queue_tree.state(llap_daemon_selected_queue_name)
+
+  def __getQueueAmFractionFromCapacityScheduler(self, queue_tree, llap_daemon_selected_queue_name):
     """
     Retrieves the passed in queue's 'AM fraction' from Capacity Scheduler. Returns default value of 0.1 if AM Percent
     pertaining to passed-in queue is not present.
     """
-    # Identify the key which contains the AM fraction for "llap_daemon_selected_queue_name".
-    cap_sched_keys = capacity_scheduler_properties.keys()
-    llap_selected_queue_am_percent_key = None
-    for key in cap_sched_keys:
-      if key.endswith("."+llap_daemon_selected_queue_name+".maximum-am-resource-percent"):
-        llap_selected_queue_am_percent_key = key
-        self.logger.info("AM percent key got for '{0}' queue is : '{1}'".format(llap_daemon_selected_queue_name, llap_selected_queue_am_percent_key))
-        break;
-    if llap_selected_queue_am_percent_key is None:
-      self.logger.info("Returning default AM percent value : '0.1' for queue : {0}".format(llap_daemon_selected_queue_name))
-      return 0.1 # Default value to use if we couldn't retrieve queue's corresponding AM Percent key.
-    else:
-      llap_selected_queue_am_percent = capacity_scheduler_properties.get(llap_selected_queue_am_percent_key)
-      self.logger.info("Returning read value for key '{0}' as : '{1}' for queue : '{2}'".format(llap_selected_queue_am_percent_key,
-                                                                                     llap_selected_queue_am_percent,
-                                                                                     llap_daemon_selected_queue_name))
-      return llap_selected_queue_am_percent
+    llap_selected_queue_am_percent = queue_tree.am_fraction(llap_daemon_selected_queue_name)
+    self.logger.info("Returning AM percent value : '{0}' for queue : {1}".format(llap_selected_queue_am_percent,
+                                                                               llap_daemon_selected_queue_name))
+    return llap_selected_queue_am_percent
 
-  def __getSelectedQueueTotalCap(self, capacity_scheduler_properties, llap_daemon_selected_queue_name, total_cluster_capacity):
+  def __getSelectedQueueTotalCap(self, queue_tree, llap_daemon_selected_queue_name, total_cluster_capacity):
     """
     Calculates the total available capacity for the passed-in YARN queue of any level based on the percentages.
+    Returns None if the queue, or the capacity of a queue on its path, is not in Capacity Scheduler.
     """
     self.logger.info("Entered __getSelectedQueueTotalCap fn() with llap_daemon_selected_queue_name= '{0}'.".format(llap_daemon_selected_queue_name))
-    available_capacity = total_cluster_capacity
-    queue_cap_key = self.__getQueueCapacityKeyFromCapacityScheduler(capacity_scheduler_properties, llap_daemon_selected_queue_name)
-    if queue_cap_key:
-      queue_cap_key = queue_cap_key.strip()
-      if len(queue_cap_key) >= 34:  # len("yarn.scheduler.capacity.<single letter queue name>.capacity") = 34
-        # Expected capacity prop key is of form : "yarn.scheduler.capacity.<one or more queues (path)>.capacity"
-        queue_path = queue_cap_key[24:]  # Strip from beginning "yarn.scheduler.capacity."
-        queue_path = queue_path[0:-9]  # Strip from end ".capacity"
-        queues_list = queue_path.split(".")
-        self.logger.info("Queue list : {0}".format(queues_list))
-        if queues_list:
-          for queue in queues_list:
-            queue_cap_key = self.__getQueueCapacityKeyFromCapacityScheduler(capacity_scheduler_properties, queue)
-            queue_cap_perc = float(capacity_scheduler_properties.get(queue_cap_key))
-            available_capacity = queue_cap_perc / 100 * available_capacity
-            self.logger.info("Total capacity available for queue {0} is : {1}".format(queue, available_capacity))
-
-    # returns the capacity calculated for passed-in queue in "llap_daemon_selected_queue_name".
+    available_capacity = queue_tree.absolute_capacity(llap_daemon_selected_queue_name, total_cluster_capacity)
+    self.logger.info("Total capacity available for queue {0} is : {1}".format(llap_daemon_selected_queue_name, available_capacity))
     return available_capacity
 
   def min_queue_perc_reqd_for_llap_and_hive_app(self, services, hosts, configurations):
     """
     Calculate minimum queue capacity required in order to get LLAP and HIVE2 app into running state.
     """
-    # Get queue size if sized at 20%
-    node_manager_hosts = self.getHostsForComponent(services, "YARN", "NODEMANAGER")
+    node_manager_hosts = advisor_common.host_index(services, hosts).host_names("YARN", "NODEMANAGER")
     yarn_rm_mem_in_mb = self.get_yarn_nm_mem_in_mb(services, configurations)
     total_cluster_cap = len(node_manager_hosts) * yarn_rm_mem_in_mb
-    total_queue_size_at_20_perc = 20.0 / 100 * total_cluster_cap
 
-    # Calculate based on minimum size required by containers.
     yarn_min_container_size = int(self.get_yarn_min_container_size(services, configurations))
     hive_tez_container_size = int(self.get_hive_tez_container_size(services))
     tez_am_container_size = self.calculate_tez_am_container_size(services, int(total_cluster_cap))
-    normalized_val = self._normalizeUp(hive_tez_container_size, yarn_min_container_size) \
-                     + self._normalizeUp(tez_am_container_size, yarn_min_container_size)
-
-    min_required = max(total_queue_size_at_20_perc, normalized_val)
-    min_required_perc = min_required * 100 / total_cluster_cap
-
-    return int(math.ceil(min_required_perc))
-
-
-  #TODO  Convert this to a helper. It can apply to any property. Check config, or check if in the list of changed configurations and read the latest value
-  def get_yarn_min_container_size(self, services, configurations):
-    """
-    Gets YARN's minimum container size (yarn.scheduler.minimum-allocation-mb).
-    Reads from:
-      - configurations (if changed as part of current Stack Advisor invocation (output)), and services["changed-configurations"]
-        is empty, else
-      - services['configurations'] (input).
-
-    services["changed-configurations"] would be empty if Stack Advisor call is made from Blueprints (1st invocation). Subsequent
-    Stack Advisor calls will have it non-empty. We do this because in subsequent invocations, even if Stack Advisor calculates this
-    value (configurations), it is finally not recommended, making 'input' value to survive.
-
-    :type services dict
-    :type configurations dict
-    :rtype str
-    """
-    yarn_min_container_size = None
-    yarn_min_allocation_property = "yarn.scheduler.minimum-allocation-mb"
-    yarn_site = self.getSiteProperties(configurations, "yarn-site")
-    yarn_site_properties = self.getServicesSiteProperties(services, "yarn-site")
-
-    # Check if services["changed-configurations"] is empty and "yarn.scheduler.minimum-allocation-mb" is modified in current ST invocation.
-    if not services["changed-configurations"] and yarn_site and yarn_min_allocation_property in yarn_site:
-      yarn_min_container_size = yarn_site[yarn_min_allocation_property]
-      self.logger.info("DBG: 'yarn.scheduler.minimum-allocation-mb' read from output as : {0}".format(yarn_min_container_size))
-
-    # Check if "yarn.scheduler.minimum-allocation-mb" is input in services array.
-    elif yarn_site_properties and yarn_min_allocation_property in yarn_site_properties:
-      yarn_min_container_size = yarn_site_properties[yarn_min_allocation_property]
-      self.logger.info("DBG: 'yarn.scheduler.minimum-allocation-mb' read from services as : {0}".format(yarn_min_container_size))
-
-    if not yarn_min_container_size:
-      self.logger.error("{0} was not found in the configuration".format(yarn_min_allocation_property))
-
-    return yarn_min_container_size
-
-  def get_hive_tez_container_size(self, services):
-    """
-    Gets HIVE Tez container size (hive.tez.container.size).
-    """
-    hive_container_size = None
-    hsi_site = self.getServicesSiteProperties(services, self.HIVE_INTERACTIVE_SITE)
-    if hsi_site and "hive.tez.container.size" in hsi_site:
-      hive_container_size = hsi_site["hive.tez.container.size"]
-
-    if not hive_container_size:
-      # This can happen (1). If config is missing in hive-interactive-site or (2). its an
-      # upgrade scenario from Ambari 2.4 to Ambari 2.5 with ODP 2.5 installed. Read it
-      # from hive-site.
-      #
-      # If Ambari 2.5 after upgrade from 2.4 is managing ODP 2.6 here, this config would have
-      # already been added in hive-interactive-site as part of ODP upgrade from 2.5 to 2.6,
-      # and we wont end up in this block to look up in hive-site.
-      hive_site = self.getServicesSiteProperties(services, "hive-site")
-      if hive_site and "hive.tez.container.size" in hive_site:
-        hive_container_size = hive_site["hive.tez.container.size"]
-    return hive_container_size
-
-  def calculate_tez_am_container_size(self, services, total_cluster_capacity, is_cluster_create_opr=False, enable_hive_interactive_1st_invocation=False):
-    """
-    Calculates Tez App Master container size (tez.am.resource.memory.mb) for tez_hive2/tez-site on initialization if values read is 0.
-    Else returns the read value.
-    """
-    tez_am_resource_memory_mb = self.get_tez_am_resource_memory_mb(services)
-    calculated_tez_am_resource_memory_mb = None
-    if is_cluster_create_opr or enable_hive_interactive_1st_invocation:
-      if total_cluster_capacity <= 4096:
-        calculated_tez_am_resource_memory_mb = 512
-      elif total_cluster_capacity > 4096 and total_cluster_capacity <= 98304:
-        calculated_tez_am_resource_memory_mb = 1024
-      elif total_cluster_capacity > 98304:
-        calculated_tez_am_resource_memory_mb = 4096
-
-      self.logger.info("DBG: Calculated and returning 'tez_am_resource_memory_mb' as : {0}".format(calculated_tez_am_resource_memory_mb))
-      return float(calculated_tez_am_resource_memory_mb)
-    else:
-      self.logger.info("DBG: Returning 'tez_am_resource_memory_mb' as : {0}".format(tez_am_resource_memory_mb))
-      return float(tez_am_resource_memory_mb)
-
-  def get_tez_am_resource_memory_mb(self, services):
-    """
-    Gets Tez's AM resource memory (tez.am.resource.memory.mb) from services.
-    """
-    tez_am_resource_memory_mb = None
-    if "tez.am.resource.memory.mb" in services["configurations"]["tez-interactive-site"]["properties"]:
-      tez_am_resource_memory_mb = services["configurations"]["tez-interactive-site"]["properties"]["tez.am.resource.memory.mb"]
-
-    return tez_am_resource_memory_mb
-
-  def _normalizeUp(self, val1, val2):
-    """
-    Normalize up 'val2' with respect to 'val1'.
-    """
-    tmp = math.ceil(val1 / val2)
-    return tmp * val2
+    return llap_sizing.min_llap_queue_percent(total_cluster_cap, yarn_min_container_size, hive_tez_container_size, tez_am_container_size)
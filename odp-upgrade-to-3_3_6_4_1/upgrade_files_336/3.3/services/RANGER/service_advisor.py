@@ -19,6 +19,7 @@ limitations under the License.
 
 import imp
 import os
+import sys
 import traceback
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -32,6 +33,28 @@ except Exception as e:
   traceback.print_exc()
   print("Failed to load parent")
 
+# Shared by all ODP 3.3 advisors of one stack-advisor call; loaded once, never reloaded.
+COMMON_FILE = os.path.join(SCRIPT_DIR, '../advisor_common.py')
+try:
+  advisor_common = sys.modules.get('odp33_advisor_common')
+  if advisor_common is None:
+    with open(COMMON_FILE, 'rb') as fp:
+      advisor_common = imp.load_module('odp33_advisor_common', fp, COMMON_FILE, ('.py', 'rb', imp.PY_SOURCE))
+except Exception as e:
+  traceback.print_exc()
+  print("Failed to load advisor_common")
+
+# Services whose user Ranger Admin accepts as a proxy user:
+# (service, config type and property of the service user, component whose first host gives ranger.proxyuser.<user>.ip)
+PROXYUSER_SERVICES = [
+  ("KNOX", "knox-env", "knox_user", "KNOX_GATEWAY"),
+  ("HUE", "hue-env", "hue_user", "HUE_SERVER"),
+  ("SPARK3", "livy2-env", "livy_user", "LIVY2_SERVER"),
+  ("ZEPPELIN", "zeppelin-env", "zeppelin_user", "ZEPPELIN_MASTER"),
+]
+PROXYUSER_PROPERTY = "ranger.proxyuser.{0}.{1}"
+PROXYUSER_SUFFIXES = ("users", "hosts", "groups", "ip")
+
 class ODP33RANGERServiceAdvisor(service_advisor.RangerServiceAdvisor):
 
   def __init__(self, *args, **kwargs):
@@ -56,44 +79,74 @@ class ODP33RangerRecommender(service_advisor.ServiceAdvisor):
 
   def recommendRangerConfigurationsFromODP33(self, configurations, clusterData, services, hosts):
 
-    putRangerAdminProperty = self.putProperty(configurations, "ranger-admin-site", services)
-    putRangerAdminAttribute = self.putPropertyAttribute(configurations, "ranger-admin-site")
-    servicesList = [service["StackServices"]["service_name"] for service in services["services"]]
-
     if 'forced-configurations' not in services:
       services["forced-configurations"] = []
 
-    if "KNOX" in servicesList:
-      knox_host = self.getHostWithComponent("KNOX", "KNOX_GATEWAY", services, hosts)
-      knox_host_ip = None
-      if knox_host:
-        knox_host_ip = knox_host['Hosts']['ip']
+    self.recommendRangerProxyUsers(configurations, services, hosts)
+
+  def recommendRangerProxyUsers(self, configurations, services, hosts):
+    """
+    Brings the ranger.proxyuser.<user>.* properties of ranger-admin-site in line with PROXYUSER_SERVICES in one pass:
+    users, hosts and groups "*" and the ip of the service's first host for the current user of every installed
+    service, and deletion of the properties of a user that was just renamed. Only properties whose value would change
+    are put or deleted, and only those are added to forced-configurations.
+    """
+    servicesList = [service["StackServices"]["service_name"] for service in services["services"]]
+    host_index = advisor_common.host_index(services, hosts)
+    config = advisor_common.config_context(services, configurations)
+
+    desired = {}
+    renamed = set()
+    obsolete = set()
+    for service_name, user_config_type, user_property, component_name in PROXYUSER_SERVICES:
+      user = config.input_value(user_config_type, user_property)
+      if service_name not in servicesList or user is None:
+        continue
+      values = {"users": "*", "hosts": "*", "groups": "*"}
+      host = host_index.host_with_component(service_name, component_name)
+      if host:
+        values["ip"] = host['Hosts']['ip']
       else:
-        self.logger.warn("KNOX_GATEWAY not found on any hosts in the selected configuration group.")
-
-      if 'knox-env' in services['configurations'] and 'knox_user' in services['configurations']['knox-env']['properties']:
-        knox_user = services['configurations']['knox-env']['properties']['knox_user']
-        knox_old_user = self.getOldValue(services, "knox-env", "knox_user")
-
-        putRangerAdminProperty('ranger.proxyuser.{0}.users'.format(knox_user), '*')
-        putRangerAdminProperty('ranger.proxyuser.{0}.hosts'.format(knox_user), '*')
-        putRangerAdminProperty('ranger.proxyuser.{0}.groups'.format(knox_user), '*')
-        if knox_host_ip:
-          putRangerAdminProperty('ranger.proxyuser.{0}.ip'.format(knox_user), knox_host_ip)
-
-        if knox_old_user is not None and knox_user != knox_old_user:
-          putRangerAdminAttribute('ranger.proxyuser.{0}.users'.format(knox_old_user), 'delete', 'true')
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.users'.format(knox_old_user)})
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.users'.format(knox_user)})
-
-          putRangerAdminAttribute('ranger.proxyuser.{0}.hosts'.format(knox_old_user), 'delete', 'true')
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.hosts'.format(knox_old_user)})
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.hosts'.format(knox_user)})
-
-          putRangerAdminAttribute('ranger.proxyuser.{0}.groups'.format(knox_old_user), 'delete', 'true')
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.groups'.format(knox_old_user)})
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.groups'.format(knox_user)})
-
-          putRangerAdminAttribute('ranger.proxyuser.{0}.ip'.format(knox_old_user), 'delete', 'true')
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.ip'.format(knox_old_user)})
-          services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : 'ranger.proxyuser.{0}.ip'.format(knox_user)})
+        self.logger.warn("{0} not found on any hosts in the selected configuration group.".format(component_name))
+      for suffix, value in values.items():
+        desired[PROXYUSER_PROPERTY.format(user, suffix)] = value
+
+      old_user = self.getOldValue(services, user_config_type, user_property)
+      if old_user is not None and old_user != user:
+        renamed.update(PROXYUSER_PROPERTY.format(user, suffix) for suffix in PROXYUSER_SUFFIXES)
+        obsolete.update(PROXYUSER_PROPERTY.format(old_user, suffix) for suffix in PROXYUSER_SUFFIXES)
+
+    puts, deletes = proxyuser_changes(desired, obsolete, config, services)
+    if not puts and not deletes:
+      return
+
+    putRangerAdminProperty = self.putProperty(configurations, "ranger-admin-site", services)
+    putRangerAdminAttribute = self.putPropertyAttribute(configurations, "ranger-admin-site")
+    for name in puts:
+      putRangerAdminProperty(name, desired[name])
+    for name in deletes:
+      putRangerAdminAttribute(name, 'delete', 'true')
+
+    forced = set((entry.get('type'), entry.get('name')) for entry in services['forced-configurations'])
+    for name in deletes + [name for name in puts if name in renamed]:
+      if ('ranger-admin-site', name) not in forced:
+        forced.add(('ranger-admin-site', name))
+        services['forced-configurations'].append({'type' : 'ranger-admin-site', 'name' : name})
+
+
+def proxyuser_changes(desired, obsolete, config, services):
+  """
+  (sorted names to put, sorted names to delete) that turn the ranger-admin-site proxyuser properties into desired:
+  a put for every desired property whose value would change (putProperty keeps the user's value for a property in
+  changed-configurations), a delete for every obsolete property that exists and is not desired.
+  """
+  requested = set(changed.get("name") for changed in services.get("changed-configurations") or []
+                  if changed.get("type") == "ranger-admin-site")
+  puts = []
+  for name, value in desired.items():
+    current = config.latest_value("ranger-admin-site", name)
+    target = config.input_value("ranger-admin-site", name) if name in requested else None
+    if current != (target if target is not None else value):
+      puts.append(name)
+  deletes = [name for name in obsolete if name not in desired and config.latest_value("ranger-admin-site", name) is not None]
+  return sorted(puts), sorted(deletes)
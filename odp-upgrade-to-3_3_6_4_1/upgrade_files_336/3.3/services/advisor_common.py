@@ -0,0 +1,311 @@
+#!/usr/bin/env ambari-python-wrap
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Helpers shared by the ODP 3.3 service advisors. Each advisor loads this file under the module
+# name "odp33_advisor_common" unless it is already in sys.modules, so all advisors of one
+# stack-advisor call use the same copy.
+
+CAPACITY_PREFIX = "yarn.scheduler.capacity."
+MEMORY_FILE_SYSTEMS = ("tmpfs", "devtmpfs", "ramfs")
+
+
+class QueueTree(object):
+  """
+  Parsed YARN capacity-scheduler queue hierarchy.
+
+  Built once from the capacity-scheduler properties (key -> value), by following the
+  "yarn.scheduler.capacity.<path>.queues" lists from "root". Queues can then be looked up by full
+  path ("root.a.llap") or by leaf name ("llap") with exact matching, so "llap" never resolves to
+  "xllap", and capacity / state / AM fraction lookups cost O(depth) instead of a scan of every key.
+  """
+
+  def __init__(self, properties):
+    self.properties = properties or {}
+    self.children = {}
+    self.paths_by_name = {}
+    pending = ["root"]
+    while pending:
+      path = pending.pop(0)
+      self.paths_by_name.setdefault(path.split(".")[-1], []).append(path)
+      children = [q.strip() for q in str(self.properties.get(CAPACITY_PREFIX + path + ".queues", "")).split(",") if q.strip()]
+      self.children[path] = [path + "." + q for q in children]
+      pending.extend(self.children[path])
+
+  def find(self, queue):
+    """
+    Full path of a queue given as full path or leaf name; None if unknown. An ambiguous leaf name
+    resolves to the shallowest match.
+    """
+    if queue in self.children:
+      return queue
+    paths = self.paths_by_name.get(queue)
+    return paths[0] if paths else None
+
+  def leaf_paths(self):
+    return sorted(path for path, children in self.children.items() if not children)
+
+  def get(self, queue, setting, default=None):
+    path = self.find(queue)
+    if path is None:
+      return default
+    return self.properties.get(CAPACITY_PREFIX + path + "." + setting, default)
+
+  def capacity_key(self, queue):
+    """
+    "yarn.scheduler.capacity.<path>.capacity" of the queue, if that property is set.
+    """
+    path = self.find(queue)
+    key = CAPACITY_PREFIX + str(path) + ".capacity"
+    return key if path is not None and key in self.properties else None
+
+  def state(self, queue):
+    return self.get(queue, "state")
+
+  def am_fraction(self, queue, default=0.1):
+    return self.get(queue, "maximum-am-resource-percent", default)
+
+  def absolute_capacity(self, queue, total_capacity):
+    """
+    total_capacity scaled by the capacity percentage of every queue on the path to queue (root
+    counts as 100% unless set); None if the queue or one of the percentages is unknown.
+    """
+    path = self.find(queue)
+    if path is None:
+      return None
+    capacity = total_capacity
+    parts = path.split(".")
+    for depth in range(1, len(parts) + 1):
+      prefix = ".".join(parts[:depth])
+      percent = self.properties.get(CAPACITY_PREFIX + prefix + ".capacity", "100" if prefix == "root" else None)
+      if percent is None:
+        return None
+      capacity = float(percent) / 100 * capacity
+    return capacity
+
+
+def parse_capacity_scheduler(text):
+  """
+  capacity-scheduler given as one "\n" separated "key=value" string -> dict; {} for empty / "null".
+  """
+  properties = {}
+  lines = str(text).split("\n") if text else []
+  if lines and lines[0] != "null":
+    for line in lines:
+      key, sep, value = line.partition("=")
+      properties[key] = value
+  return properties
+
+
+class ConfigContext(object):
+  """
+  Memoized view of one stack-advisor call: "configurations" (output, recommended so far) and
+  services["configurations"] (input).
+
+  Input site dicts are looked up once (they are shared, not copied) and parsed forms
+  (capacity-scheduler, queue tree) are computed once per raw value. Output is still being written by the recommenders, so output values
+  are always read live and only parsed forms keyed by the raw value are cached.
+  """
+
+  def __init__(self, services, configurations):
+    self.services = services
+    self.configurations = configurations
+    self.changed_configurations = bool(services.get("changed-configurations"))
+    self._input_sites = {}
+    self._parsed = {}
+
+  def input_site(self, site):
+    """
+    services["configurations"][site]["properties"], or None (like getServicesSiteProperties).
+    """
+    properties = self._input_sites.get(site)
+    if properties is None:
+      config = self.services.get("configurations", {}).get(site)
+      properties = config.get("properties") if config else None
+      if properties is not None:
+        self._input_sites[site] = properties
+    return properties
+
+  def output_site(self, site):
+    """
+    configurations[site]["properties"], or None (like getSiteProperties).
+    """
+    config = self.configurations.get(site) if self.configurations else None
+    return config.get("properties") if config else None
+
+  def input_value(self, site, name, default=None):
+    properties = self.input_site(site)
+    return properties.get(name, default) if properties else default
+
+  def latest_value(self, site, name, default=None):
+    """
+    The value recommended in this call if there is one, else the input value.
+    """
+    properties = self.output_site(site)
+    if properties and name in properties:
+      return properties[name]
+    return self.input_value(site, name, default)
+
+  def effective_value(self, site, name, default=None):
+    """
+    The value that will be in effect after this call: the recommended (output) value only on the
+    first invocation (empty services["changed-configurations"], e.g. from Blueprints). Later
+    invocations keep the input value even if a recommendation was computed, so that wins.
+    """
+    if not self.changed_configurations:
+      properties = self.output_site(site)
+      if properties and name in properties:
+        return properties[name]
+    return self.input_value(site, name, default)
+
+  def _parse_once(self, key, raw, parse):
+    cached = self._parsed.get(key)
+    if cached is None or cached[0] is not raw:
+      cached = self._parsed[key] = (raw, parse(raw))
+    return cached[1]
+
+  def input_capacity_scheduler(self):
+    """
+    Input capacity-scheduler as a dict, and whether it was received as separate key/value pairs
+    (like getCapacitySchedulerProperties).
+    """
+    properties = self.input_site("capacity-scheduler") or {}
+    text = properties.get("capacity-scheduler")
+    if text:
+      parsed = self._parse_once("input-capacity-scheduler", text, parse_capacity_scheduler)
+      if parsed:
+        return parsed, False
+    return properties, True
+
+  def latest_capacity_scheduler(self):
+    """
+    capacity-scheduler as recommended in this call if it was (as one string or as separate keys),
+    else the input.
+    """
+    properties = self.output_site("capacity-scheduler")
+    if properties:
+      text = properties.get("capacity-scheduler")
+      if text:
+        parsed = self._parse_once("output-capacity-scheduler", text, parse_capacity_scheduler)
+        if parsed:
+          return parsed
+      if isinstance(properties, dict) and len(properties) > 1:
+        return properties
+    return self.input_capacity_scheduler()[0]
+
+  def queue_tree(self, capacity_scheduler_properties):
+    return self._parse_once("queue-tree", capacity_scheduler_properties, QueueTree)
+
+
+_contexts = []
+
+
+def config_context(services, configurations):
+  """
+  The ConfigContext of the current stack-advisor call (one per services/configurations pair).
+  """
+  for context in _contexts:
+    if context.services is services and context.configurations is configurations:
+      return context
+  context = ConfigContext(services, configurations)
+  _contexts[:] = [context]
+  return context
+
+
+class HostIndex(object):
+  """
+  Component layout and host records of one stack-advisor request, for lookups in constant time instead of the
+  ServiceAdvisor scans of services["services"] and hosts["items"] (getHostsWithComponent checks every host against
+  the component's host list). Lookups return what the ServiceAdvisor methods named in their docstrings return.
+  """
+
+  def __init__(self, services, hosts):
+    self.services = services
+    self.hosts = hosts
+    self.components = {}
+    for service in services.get("services", []):
+      service_name = service["StackServices"]["service_name"]
+      for component in service.get("components", []):
+        key = (service_name, component["StackServiceComponents"]["component_name"])
+        if key not in self.components:
+          self.components[key] = component["StackServiceComponents"].get("hostnames") or []
+    self.records = {}
+    self.positions = {}
+    for position, host in enumerate((hosts or {}).get("items", [])):
+      host_name = host["Hosts"]["host_name"]
+      if host_name not in self.records:
+        self.records[host_name] = host
+        self.positions[host_name] = position
+
+  def host_names(self, service_name, component_name):
+    """
+    Host names of the component, like getHostsForComponent(services, service_name, component_name).
+    """
+    return self.components.get((service_name, component_name), [])
+
+  def host_record(self, host_name):
+    """
+    The hosts["items"] entry of host_name, or None.
+    """
+    return self.records.get(host_name)
+
+  def hosts_with_component(self, service_name, component_name):
+    """
+    hosts["items"] entries carrying the component, in hosts["items"] order, like
+    getHostsWithComponent(service_name, component_name, services, hosts).
+    """
+    if self.hosts is None:
+      return []
+    names = set(name for name in self.host_names(service_name, component_name) if name in self.records)
+    return [self.records[name] for name in sorted(names, key=self.positions.get)]
+
+  def host_with_component(self, service_name, component_name):
+    """
+    First of hosts_with_component, or None, like getHostWithComponent.
+    """
+    component_hosts = self.hosts_with_component(service_name, component_name)
+    return component_hosts[0] if component_hosts else None
+
+
+def disk_size_kb(host):
+  """
+  Total size (KB) of the disk_info mounts of a hosts["items"] entry, without in-memory file systems.
+  """
+  total = 0
+  for disk in host["Hosts"].get("disk_info") or []:
+    if disk.get("type") not in MEMORY_FILE_SYSTEMS:
+      try:
+        total += int(disk.get("size") or 0)
+      except ValueError:
+        pass
+  return total
+
+
+_host_indexes = []
+
+
+def host_index(services, hosts):
+  """
+  The HostIndex of the current stack-advisor call (one per services/hosts pair), shared by all ODP 3.3 advisors.
+  """
+  for index in _host_indexes:
+    if index.services is services and index.hosts is hosts:
+      return index
+  index = HostIndex(services, hosts)
+  _host_indexes[:] = [index]
+  return index
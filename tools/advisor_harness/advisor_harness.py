@@ -0,0 +1,223 @@
+#!/usr/bin/env python3.11
+"""
+Run the ODP 3.3 HIVE / HDFS / RANGER service advisors outside Ambari, on a recorded stack-advisor request, and time
+them.
+
+  advisor_harness.py [FIXTURE_DIR] [--service HIVE --service ...] [--repeat N] [--hosts N] [--dump DIR]
+                     [--json]
+
+FIXTURE_DIR (default: fixtures/sample) holds the services.json and hosts.json of one stack-advisor call, as Ambari
+records them under /var/run/ambari-server/stack-recommendations/<n>/, and optionally a clusterData.json. Without
+one, the cluster summary is computed the way Ambari does it.
+
+The advisors run unmodified from the odp-upgrade-to-3_3_6_4_1 bundle's upgrade_files_336/3.3/services (or
+--services-dir). They are linked into a temporary stacks tree next to stand-ins for Ambari's base service_advisor.py
+and the ODP 3.0 HDFS / RANGER parents (stubs/), so every path an advisor derives from its own location resolves as
+on an Ambari server. Each run gets a fresh copy of the request, like every Ambari call:
+
+  load       import of the advisor module (once; Ambari starts a new process per call)
+  recommend  getServiceConfigurationRecommendations
+  validate   getServiceConfigurationsValidationItems, with the request's configurations and the recommendations
+             as recommended defaults
+
+--hosts N grows the cluster to N hosts by cloning worker hosts (DATANODE / NODEMANAGER carriers), to see how advisor
+latency scales with cluster size. --dump writes the last run's recommendations and validation items per service,
+for diffing the output of two checkouts.
+
+Needs Python <= 3.11: the advisors load their parents with the imp module.
+
+Exit codes:
+  0  Success.
+  1  Usage error, unreadable fixture, or an advisor raised.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURE = os.path.join(HERE, "fixtures", "sample")
+REPO_ROOT = os.path.dirname(os.path.dirname(HERE))
+DEFAULT_SERVICES_DIR = os.path.join(REPO_ROOT, "odp-upgrade-to-3_3_6_4_1", "upgrade_files_336", "3.3", "services")
+STUB_STACKS = os.path.join(HERE, "stubs", "stacks")
+DEFAULT_SERVICES = ["HIVE", "HDFS", "RANGER"]
+WORKER_COMPONENTS = {"DATANODE", "NODEMANAGER"}
+PHASES = ["load", "recommend", "validate"]
+
+
+def eprint(*args: object) -> None:
+    print(*args, file=sys.stderr)
+
+
+def load_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_stack_tree(services_dir: str, root: str) -> str:
+    """Copy the stubs to root/stacks and symlink every file of services_dir into root/stacks/ODP/3.3/services."""
+    stacks = os.path.join(root, "stacks")
+    shutil.copytree(STUB_STACKS, stacks)
+    target = os.path.join(stacks, "ODP", "3.3", "services")
+    for dirpath, dirnames, filenames in os.walk(services_dir):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+        rel = os.path.relpath(dirpath, services_dir)
+        os.makedirs(os.path.join(target, rel), exist_ok=True)
+        for name in filenames:
+            if not name.endswith(".pyc"):
+                os.symlink(os.path.join(dirpath, name), os.path.join(target, rel, name))
+    return target
+
+
+def load_advisor(tree: str, service: str) -> type:
+    """Import <tree>/<service>/service_advisor.py and return its ServiceAdvisor class."""
+    path = os.path.join(tree, service, "service_advisor.py")
+    name = f"{service.lower()}_service_advisor_impl"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    classes = [obj for obj in vars(module).values()
+               if isinstance(obj, type) and obj.__module__ == name and obj.__name__.endswith("ServiceAdvisor")]
+    if len(classes) != 1:
+        raise RuntimeError(f"{path}: expected one *ServiceAdvisor class, found {[c.__name__ for c in classes]}")
+    return classes[0]
+
+
+def scale_hosts(services: dict, hosts: dict, count: int) -> None:
+    """Clone worker hosts, with their worker and client components, until hosts has count items."""
+    worker_names = sorted({h for service in services["services"] for component in service["components"]
+                           if component["StackServiceComponents"]["component_name"] in WORKER_COMPONENTS
+                           for h in component["StackServiceComponents"]["hostnames"]})
+    if not worker_names:
+        raise ValueError("--hosts needs at least one DATANODE or NODEMANAGER host in the fixture")
+    by_name = {h["Hosts"]["host_name"]: h for h in hosts["items"]}
+    clones: dict[str, list[str]] = {name: [] for name in worker_names}
+    i = 0
+    while len(hosts["items"]) < count:
+        source = worker_names[i % len(worker_names)]
+        clone = copy.deepcopy(by_name[source])
+        clone["Hosts"]["host_name"] = clone["Hosts"]["public_host_name"] = f"clone{i + 1}-{source}"
+        clone["Hosts"]["ip"] = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        hosts["items"].append(clone)
+        clones[source].append(clone["Hosts"]["host_name"])
+        i += 1
+    for service in services["services"]:
+        for component in service["components"]:
+            info = component["StackServiceComponents"]
+            if info["component_name"] in WORKER_COMPONENTS or info["component_name"].endswith("_CLIENT"):
+                info["hostnames"] = info["hostnames"] + [c for h in info["hostnames"] for c in clones.get(h, [])]
+
+
+def cluster_summary(base: type, services: dict, hosts: dict) -> dict:
+    service_names = [s["StackServices"]["service_name"] for s in services["services"]]
+    components = [c["StackServiceComponents"]["component_name"] for s in services["services"] for c in s["components"]]
+    return base().getConfigurationClusterSummary(service_names, hosts, components, services)
+
+
+def run(advisor_cls: type, services: dict, hosts: dict, cluster_data: dict) -> tuple[dict, list, float, float]:
+    """One call of each entry point on a fresh copy of the request; (recommendations, items, rec secs, val secs)."""
+    services = copy.deepcopy(services)
+    advisor = advisor_cls()
+    recommendations: dict = {}
+    started = time.perf_counter()
+    advisor.getServiceConfigurationRecommendations(recommendations, copy.deepcopy(cluster_data), services, hosts)
+    recommended = time.perf_counter()
+    items = advisor.getServiceConfigurationsValidationItems(services["configurations"], recommendations, services, hosts)
+    validated = time.perf_counter()
+    return recommendations, items, recommended - started, validated - recommended
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Time the ODP 3.3 service advisors on a recorded stack-advisor request.")
+    p.add_argument("fixture", nargs="?", default=DEFAULT_FIXTURE, help="directory with services.json and hosts.json")
+    p.add_argument("--service", action="append", help=f"advisor to run (repeatable; default {', '.join(DEFAULT_SERVICES)})")
+    p.add_argument("--services-dir", default=DEFAULT_SERVICES_DIR, help="ODP 3.3 services directory with the advisors")
+    p.add_argument("--repeat", type=int, default=20, help="timed runs per advisor (default 20)")
+    p.add_argument("--hosts", type=int, help="grow the fixture to this many hosts by cloning worker hosts")
+    p.add_argument("--dump", help="write <SERVICE>.recommendations.json / .validations.json of the last run here")
+    p.add_argument("--json", action="store_true", help="print the timings as JSON")
+    p.add_argument("--verbose", action="store_true", help="show the advisors' log messages")
+    args = p.parse_args(argv)
+
+    if args.repeat < 1:
+        eprint("--repeat must be >= 1")
+        return EXIT_ERROR
+    try:
+        services = load_json(os.path.join(args.fixture, "services.json"))
+        hosts = load_json(os.path.join(args.fixture, "hosts.json"))
+        data_file = os.path.join(args.fixture, "clusterData.json")
+        cluster_data = load_json(data_file) if os.path.exists(data_file) else None
+        if args.hosts:
+            scale_hosts(services, hosts, args.hosts)
+    except (OSError, ValueError, KeyError) as exc:
+        eprint(f"Cannot read fixture {args.fixture}: {exc}")
+        return EXIT_ERROR
+    if not os.path.isdir(args.services_dir):
+        eprint(f"{args.services_dir}: not a directory")
+        return EXIT_ERROR
+    missing = [s for s in args.service or [] if not os.path.isfile(os.path.join(args.services_dir, s, "service_advisor.py"))]
+    if missing:
+        eprint(f"No service_advisor.py for {', '.join(missing)} in {args.services_dir}")
+        return EXIT_ERROR
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="advisor_harness.") as tmp:
+        tree = build_stack_tree(args.services_dir, tmp)
+        for service in args.service or DEFAULT_SERVICES:
+            timings: dict[str, list[float]] = {phase: [] for phase in PHASES}
+            try:
+                started = time.perf_counter()
+                advisor_cls = load_advisor(tree, service)
+                timings["load"].append(time.perf_counter() - started)
+                if cluster_data is None:
+                    cluster_data = cluster_summary(sys.modules["service_advisor"].ServiceAdvisor, services, hosts)
+                for _ in range(args.repeat):
+                    recommendations, items, rec_secs, val_secs = run(advisor_cls, services, hosts, cluster_data)
+                    timings["recommend"].append(rec_secs)
+                    timings["validate"].append(val_secs)
+            except Exception:
+                eprint(f"{service} advisor failed:")
+                traceback.print_exc()
+                return EXIT_ERROR
+            if args.dump:
+                os.makedirs(args.dump, exist_ok=True)
+                for suffix, data in (("recommendations", recommendations), ("validations", items)):
+                    with open(os.path.join(args.dump, f"{service}.{suffix}.json"), "w", encoding="utf-8") as f:
+                        json.dump(data, f, indent=1, sort_keys=True)
+                        f.write("\n")
+            for phase in PHASES:
+                values = [v * 1000 for v in timings[phase]]
+                results.append({"service": service, "phase": phase, "runs": len(values), "min_ms": min(values),
+                                "median_ms": statistics.median(values), "max_ms": max(values),
+                                "items": len(items) if phase == "validate" else None})
+
+    if args.json:
+        print(json.dumps({"fixture": os.path.abspath(args.fixture), "hosts": len(hosts["items"]), "results": results},
+                         indent=2))
+        return EXIT_OK
+    print(f"fixture: {args.fixture} ({len(hosts['items'])} hosts)")
+    print(f"{'service':<8} {'phase':<10} {'runs':>5} {'min ms':>10} {'median ms':>10} {'max ms':>10}")
+    for r in results:
+        extra = f"  {r['items']} validation items" if r["items"] is not None else ""
+        print(f"{r['service']:<8} {r['phase']:<10} {r['runs']:>5} {r['min_ms']:>10.3f} {r['median_ms']:>10.3f} "
+              f"{r['max_ms']:>10.3f}{extra}")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,349 @@
+#!/usr/bin/env ambari-python-wrap
+"""
+Licensed to the Apache Software Foundation (ASF) under one
+or more contributor license agreements.  See the NOTICE file
+distributed with this work for additional information
+regarding copyright ownership.  The ASF licenses this file
+to you under the Apache License, Version 2.0 (the
+"License"); you may not use this file except in compliance
+with the License.  You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Stand-in for Ambari's resources/stacks/service_advisor.py, used by advisor_harness.py only. It implements the part of
+# the ServiceAdvisor API that the ODP 3.3 HIVE / HDFS / RANGER advisors call, following Ambari's own implementation
+# (stack_advisor.DefaultStackAdvisor). Layout validation and the stack-wide recommendations are not modelled.
+
+import logging
+import math
+import re
+
+
+class ServiceAdvisor(object):
+
+  def __init__(self, *args, **kwargs):
+    self.logger = logging.getLogger("service_advisor")
+    self.mastersWithMultipleInstances = set()
+    self.cardinalitiesDict = {}
+    self.heap_size_properties = {}
+    self.notValuableComponents = set()
+    self.notPreferableOnServerComponents = set()
+    self.componentLayoutSchemes = {}
+
+  def initialize_logger(self, name="ServiceAdvisor", logging_level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(funcName)s: - %(message)s"):
+    self.logger = logging.getLogger(name)
+
+  def modifyMastersWithMultipleInstances(self):
+    pass
+
+  def modifyCardinalitiesDict(self):
+    pass
+
+  def modifyHeapSizeProperties(self):
+    pass
+
+  def modifyNotValuableComponents(self):
+    pass
+
+  def modifyComponentsNotPreferableOnServer(self):
+    pass
+
+  def modifyComponentLayoutSchemes(self):
+    pass
+
+  def getServiceComponentLayoutValidations(self, services, hosts):
+    return []
+
+  def getServiceComponentCardinalityValidations(self, services, hosts, service_name):
+    return []
+
+  def getServiceConfigurationRecommendations(self, configurations, clusterData, services, hosts):
+    pass
+
+  def getServiceConfigurationsValidationItems(self, configurations, recommendedDefaults, services, hosts):
+    return []
+
+  # Configurations
+
+  def getSiteProperties(self, configurations, siteName):
+    siteConfig = configurations.get(siteName)
+    if siteConfig is None:
+      return None
+    return siteConfig.get("properties")
+
+  def getServicesSiteProperties(self, services, siteName):
+    configurations = services.get("configurations")
+    if not configurations:
+      return None
+    siteConfig = configurations.get(siteName)
+    if siteConfig is None:
+      return None
+    return siteConfig.get("properties")
+
+  def checkSiteProperties(self, siteProperties, *propertyNames):
+    if not siteProperties:
+      return False
+    for name in propertyNames:
+      if not (name in siteProperties):
+        return False
+    return True
+
+  def getOldValue(self, services, configType, propertyName):
+    if services:
+      for changedConfig in services.get("changed-configurations", []):
+        if changedConfig["type"] == configType and changedConfig["name"] == propertyName and "old_value" in changedConfig:
+          return changedConfig["old_value"]
+    return None
+
+  def putProperty(self, config, configType, services=None):
+    userConfigs = {}
+    changedConfigs = []
+    if services:
+      userConfigs = services.get("configurations", {})
+      changedConfigs = services.get("changed-configurations", [])
+
+    if configType not in config:
+      config[configType] = {}
+    if "properties" not in config[configType]:
+      config[configType]["properties"] = {}
+
+    def appendProperty(key, value):
+      # A property the user just changed keeps the user's value.
+      isChanged = [c for c in changedConfigs if c["type"] == configType and c["name"] == key]
+      if isChanged and configType in userConfigs and key in userConfigs[configType]["properties"]:
+        config[configType]["properties"][key] = userConfigs[configType]["properties"][key]
+      else:
+        config[configType]["properties"][key] = str(value)
+    return appendProperty
+
+  def putPropertyAttribute(self, config, configType):
+    if configType not in config:
+      config[configType] = {}
+
+    def appendPropertyAttribute(key, attribute, attributeValue):
+      if "property_attributes" not in config[configType]:
+        config[configType]["property_attributes"] = {}
+      if key not in config[configType]["property_attributes"]:
+        config[configType]["property_attributes"][key] = {}
+      config[configType]["property_attributes"][key][attribute] = attributeValue if isinstance(attributeValue, list) else str(attributeValue)
+    return appendPropertyAttribute
+
+  def getCapacitySchedulerProperties(self, services):
+    capacity_scheduler_properties = dict()
+    received_as_key_value_pair = True
+    if "capacity-scheduler" in services["configurations"]:
+      if "capacity-scheduler" in services["configurations"]["capacity-scheduler"]["properties"]:
+        cap_sched_props_as_str = services["configurations"]["capacity-scheduler"]["properties"]["capacity-scheduler"]
+        if cap_sched_props_as_str:
+          cap_sched_props_as_str = str(cap_sched_props_as_str).split("\n")
+          if len(cap_sched_props_as_str) > 0 and cap_sched_props_as_str[0] != "null":
+            for property in cap_sched_props_as_str:
+              key, sep, value = property.partition("=")
+              capacity_scheduler_properties[key] = value
+            received_as_key_value_pair = False
+      if not capacity_scheduler_properties:
+        cap_sched_props_as_dict = services["configurations"]["capacity-scheduler"]["properties"]
+        if cap_sched_props_as_dict:
+          capacity_scheduler_properties = cap_sched_props_as_dict
+    return capacity_scheduler_properties, received_as_key_value_pair
+
+  def getAllYarnLeafQueues(self, capacitySchedulerProperties):
+    leafQueueNames = set()
+    yarn_queues = capacitySchedulerProperties.get("yarn.scheduler.capacity.root.queues") if capacitySchedulerProperties else None
+    if yarn_queues:
+      toProcessQueues = yarn_queues.split(",")
+      while len(toProcessQueues) > 0:
+        queue = toProcessQueues.pop()
+        queueKey = "yarn.scheduler.capacity.root." + queue + ".queues"
+        if queueKey in capacitySchedulerProperties:
+          for subQueue in capacitySchedulerProperties[queueKey].split(","):
+            toProcessQueues.append(queue + "." + subQueue)
+        else:
+          leafQueueNames.add(queue.split(".")[-1])
+    return leafQueueNames
+
+  # Hosts and components
+
+  def getHostsWithComponent(self, serviceName, componentName, services, hosts):
+    if services is not None and hosts is not None:
+      for service in services["services"]:
+        if service["StackServices"]["service_name"] != serviceName:
+          continue
+        components = [c for c in service["components"] if c["StackServiceComponents"]["component_name"] == componentName]
+        if len(components) > 0 and len(components[0]["StackServiceComponents"]["hostnames"]) > 0:
+          componentHostnames = components[0]["StackServiceComponents"]["hostnames"]
+          return [host for host in hosts["items"] if host["Hosts"]["host_name"] in componentHostnames]
+    return []
+
+  def getHostWithComponent(self, serviceName, componentName, services, hosts):
+    componentHosts = self.getHostsWithComponent(serviceName, componentName, services, hosts)
+    if len(componentHosts) > 0:
+      return componentHosts[0]
+    return None
+
+  def getHostsForComponent(self, services, serviceName, componentName):
+    for service in services["services"]:
+      if service["StackServices"]["service_name"] != serviceName:
+        continue
+      for component in service["components"]:
+        if component["StackServiceComponents"]["component_name"] == componentName:
+          return component["StackServiceComponents"]["hostnames"]
+    return []
+
+  def getZKHostPortString(self, services, include_port=True):
+    zookeeper_hosts = self.getHostsForComponent(services, "ZOOKEEPER", "ZOOKEEPER_SERVER")
+    if not zookeeper_hosts:
+      return ""
+    zookeeper_port = "2181"
+    zoo_cfg = self.getServicesSiteProperties(services, "zoo.cfg")
+    if zoo_cfg and "clientPort" in zoo_cfg:
+      zookeeper_port = zoo_cfg["clientPort"]
+    if not include_port:
+      return ",".join(zookeeper_hosts)
+    return ",".join(host + ":" + str(zookeeper_port) for host in zookeeper_hosts)
+
+  def getConfigurationClusterSummary(self, servicesList, hosts, components, services):
+    """
+    Ambari's per-host sizing summary (mapMemory, ramPerContainer, ...), computed from the first NodeManager host.
+    """
+    cluster = {"cpu": 0, "disk": 0, "ram": 0, "hBaseInstalled": "HBASE" in servicesList, "components": components}
+    if hosts and hosts["items"]:
+      nodeManagerHosts = self.getHostsWithComponent("YARN", "NODEMANAGER", services, hosts)
+      host = nodeManagerHosts[0]["Hosts"] if nodeManagerHosts else hosts["items"][0]["Hosts"]
+      cluster["cpu"] = host["cpu_count"]
+      cluster["disk"] = len(host.get("disk_info", []))
+      cluster["ram"] = int(host["total_mem"] / (1024 * 1024))
+
+    ramRecommendations = [{"os": 1, "hbase": 1}, {"os": 2, "hbase": 1}, {"os": 2, "hbase": 2}, {"os": 4, "hbase": 4},
+                          {"os": 6, "hbase": 8}, {"os": 8, "hbase": 8}, {"os": 8, "hbase": 8}, {"os": 12, "hbase": 16},
+                          {"os": 24, "hbase": 24}, {"os": 32, "hbase": 32}, {"os": 64, "hbase": 64}]
+    index = len([limit for limit in (4, 8, 16, 24, 48, 64, 72, 96, 128, 256) if cluster["ram"] > limit])
+    cluster["reservedRam"] = ramRecommendations[index]["os"]
+    cluster["hbaseRam"] = ramRecommendations[index]["hbase"]
+    cluster["minContainerSize"] = 256 if cluster["ram"] <= 4 else 512 if cluster["ram"] <= 8 else 1024 if cluster["ram"] <= 24 else 2048
+
+    totalAvailableRam = cluster["ram"] - cluster["reservedRam"]
+    if cluster["hBaseInstalled"]:
+      totalAvailableRam -= cluster["hbaseRam"]
+    cluster["totalAvailableRam"] = max(512, totalAvailableRam * 1024)
+    cluster["containers"] = int(round(max(3, min(2 * cluster["cpu"], min(math.ceil(1.8 * cluster["disk"]),
+                                                                          cluster["totalAvailableRam"] / cluster["minContainerSize"])))))
+    cluster["ramPerContainer"] = abs(cluster["totalAvailableRam"] / cluster["containers"])
+    if cluster["ramPerContainer"] > 1024:
+      cluster["ramPerContainer"] = int(cluster["ramPerContainer"] / 512) * 512
+    cluster["mapMemory"] = int(cluster["ramPerContainer"])
+    cluster["reduceMemory"] = cluster["ramPerContainer"]
+    cluster["amMemory"] = max(cluster["mapMemory"], cluster["reduceMemory"])
+    return cluster
+
+  def calculateYarnAllocationSizes(self, configurations, services, hosts):
+    servicesList = [service["StackServices"]["service_name"] for service in services["services"]]
+    clusterData = self.getConfigurationClusterSummary(servicesList, hosts, None, services)
+    nodeManagerHosts = self.getHostsWithComponent("YARN", "NODEMANAGER", services, hosts)
+    nodemanagerMinRam = min([host["Hosts"]["total_mem"] / 1024 for host in nodeManagerHosts] or [1048576])
+
+    putYarnProperty = self.putProperty(configurations, "yarn-site", services)
+    putYarnProperty("yarn.nodemanager.resource.memory-mb", int(round(min(clusterData["containers"] * clusterData["ramPerContainer"], nodemanagerMinRam))))
+    putYarnProperty("yarn.scheduler.minimum-allocation-mb", int(clusterData["ramPerContainer"]))
+    putYarnProperty("yarn.scheduler.maximum-allocation-mb", int(configurations["yarn-site"]["properties"]["yarn.nodemanager.resource.memory-mb"]))
+
+  # Databases
+
+  def getDBDriver(self, databaseType):
+    return {
+      "NEW MYSQL DATABASE": "com.mysql.jdbc.Driver",
+      "NEW DERBY DATABASE": "org.apache.derby.jdbc.EmbeddedDriver",
+      "EXISTING MYSQL DATABASE": "com.mysql.jdbc.Driver",
+      "EXISTING MYSQL / MARIADB DATABASE": "com.mysql.jdbc.Driver",
+      "EXISTING POSTGRESQL DATABASE": "org.postgresql.Driver",
+      "EXISTING ORACLE DATABASE": "oracle.jdbc.driver.OracleDriver",
+      "EXISTING SQL ANYWHERE DATABASE": "sap.jdbc4.sqlanywhere.IDriver"
+    }.get(databaseType.upper())
+
+  def getDBConnectionString(self, databaseType):
+    return {
+      "NEW MYSQL DATABASE": "jdbc:mysql://{0}/{1}",
+      "NEW DERBY DATABASE": "jdbc:derby:${{oozie.data.dir}}/${{oozie.db.schema.name}}-db;create=true",
+      "EXISTING MYSQL DATABASE": "jdbc:mysql://{0}/{1}",
+      "EXISTING MYSQL / MARIADB DATABASE": "jdbc:mysql://{0}/{1}",
+      "EXISTING POSTGRESQL DATABASE": "jdbc:postgresql://{0}:5432/{1}",
+      "EXISTING ORACLE DATABASE": "jdbc:oracle:thin:@//{0}:1521/{1}",
+      "EXISTING SQL ANYWHERE DATABASE": "jdbc:sqlanywhere:host={0};database={1}"
+    }.get(databaseType.upper())
+
+  def getProtocol(self, databaseType):
+    return {
+      "NEW MYSQL DATABASE": "jdbc:mysql",
+      "NEW DERBY DATABASE": "jdbc:derby",
+      "EXISTING MYSQL DATABASE": "jdbc:mysql",
+      "EXISTING MYSQL / MARIADB DATABASE": "jdbc:mysql",
+      "EXISTING POSTGRESQL DATABASE": "jdbc:postgresql",
+      "EXISTING ORACLE DATABASE": "jdbc:oracle",
+      "EXISTING SQL ANYWHERE DATABASE": "jdbc:sqlanywhere"
+    }.get(databaseType.upper())
+
+  def getDBTypeAlias(self, databaseType):
+    return {
+      "NEW MYSQL DATABASE": "mysql",
+      "NEW DERBY DATABASE": "derby",
+      "EXISTING MYSQL / MARIADB DATABASE": "mysql",
+      "EXISTING MYSQL DATABASE": "mysql",
+      "EXISTING POSTGRESQL DATABASE": "postgres",
+      "EXISTING ORACLE DATABASE": "oracle",
+      "EXISTING SQL ANYWHERE DATABASE": "sqla"
+    }.get(databaseType.upper())
+
+  # Validation
+
+  def getWarnItem(self, message):
+    return {"level": "WARN", "message": message}
+
+  def getErrorItem(self, message):
+    return {"level": "ERROR", "message": message}
+
+  def to_number(self, s):
+    try:
+      return int(re.sub(r"\D", "", s))
+    except ValueError:
+      return None
+
+  def validatorLessThenDefaultValue(self, properties, recommendedDefaults, propertyName):
+    if propertyName not in recommendedDefaults:
+      return None
+    if propertyName not in properties:
+      return self.getErrorItem("Value should be set")
+    value = self.to_number(properties[propertyName])
+    if value is None:
+      return self.getErrorItem("Value should be integer")
+    defaultValue = self.to_number(recommendedDefaults[propertyName])
+    if defaultValue is None:
+      return None
+    if value < defaultValue:
+      return self.getWarnItem("Value is less than the recommended default of {0}".format(defaultValue))
+    return None
+
+  def toConfigurationValidationProblems(self, validationProblems, siteName):
+    result = []
+    for validationProblem in validationProblems:
+      validationItem = validationProblem.get("item", None)
+      if validationItem is not None:
+        result.append({"type": "configuration", "level": validationItem["level"], "message": validationItem["message"],
+                       "config-type": siteName, "config-name": validationProblem["config-name"]})
+    return result
+
+  def validateListOfConfigUsingMethod(self, configurations, recommendedDefaults, services, hosts, validators):
+    items = []
+    for (configType, method) in validators:
+      if configType in recommendedDefaults:
+        siteProperties = self.getSiteProperties(configurations, configType)
+        if siteProperties is not None:
+          siteRecommendations = recommendedDefaults[configType]["properties"]
+          items.extend(method(siteProperties, siteRecommendations, configurations, services, hosts))
+    return items
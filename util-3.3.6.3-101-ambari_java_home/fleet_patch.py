@@ -0,0 +1,331 @@
+#!/usr/bin/env python3.11
+"""
+Run patch_ambari_java_home.sh on many Ambari servers and refresh the affected hosts.
+
+For every server in --servers (host or host:port per line, same format as
+lib/ambari_cluster_name.py --hosts-file):
+
+  1. copy this util to the server over ssh and run it with --dry-run;
+  2. unless --dry-run, or nothing would change: run it for real;
+  3. ask the Ambari API which hosts run the affected services (default KAFKA, DRUID) and
+     restart ambari-agent on them, --host-parallel at a time, so agents drop stale stack scripts;
+  4. with --restart-components: restart those services' components through the Ambari API
+     (one RESTART request per host batch) and wait for the requests to finish.
+
+Ambari's REST API has no call that restarts the agent daemon itself, so step 3 uses ssh to the
+hosts the API returned. Up to --cluster-parallel servers are handled at once. A consolidated
+report is printed at the end (--report FILE also writes it as JSON).
+
+Credentials: AMBARI_USER / AMBARI_PASSWORD (the password is passed to the remote script on
+stdin, never on a command line). ssh must work non-interactively (keys, BatchMode), and the
+remote user needs sudo for the patch script and `ambari-agent restart`.
+
+Exit codes:
+  0  Every server patched (or already compliant) and every refresh step succeeded.
+  1  Usage error, or at least one server / host failed (see report).
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import re
+import shlex
+import ssl
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "lib"))
+
+from ambari_cluster_name import LookupFailed, fetch_cluster_names, read_hosts_file  # noqa: E402
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+
+PATCH_SCRIPT = "patch_ambari_java_home.sh"
+TERMINAL_REQUEST_STATUSES = ("COMPLETED", "FAILED", "ABORTED", "TIMEDOUT", "SKIPPED_FAILED")
+# Components that only ship client configs; restarting them is not meaningful.
+CLIENT_SUFFIX = "_CLIENT"
+
+
+def eprint(*args: object) -> None:
+    print(*args, file=sys.stderr)
+
+
+def ssh_command(args: argparse.Namespace, host: str, remote: str) -> list[str]:
+    target = f"{args.ssh_user}@{host}" if args.ssh_user else host
+    return ["ssh", "-o", "BatchMode=yes", "-o", f"ConnectTimeout={args.ssh_timeout}", *args.ssh_option, target, remote]
+
+
+def run(cmd: list[str], stdin: bytes | None = None, timeout: float | None = None) -> tuple[int, str]:
+    """Run a command, returning (exit code, combined output); a timeout counts as exit code 124."""
+    try:
+        proc = subprocess.run(cmd, input=stdin, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+    except subprocess.TimeoutExpired as exc:
+        return 124, (exc.stdout or b"").decode("utf-8", errors="replace") + "\n[timed out]"
+    except OSError as exc:
+        return 127, str(exc)
+    return proc.returncode, proc.stdout.decode("utf-8", errors="replace")
+
+
+def push_util(args: argparse.Namespace, host: str) -> tuple[int, str]:
+    """Copy this util (without backups/) to --remote-dir on host via tar over ssh; (exit code, output) like run()."""
+    try:
+        proc = subprocess.run(["tar", "-C", SCRIPT_DIR, "--exclude=./backups", "--exclude=__pycache__", "-czf", "-", "."],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as exc:
+        return 127, f"tar: {exc}"
+    if proc.returncode != 0:
+        return proc.returncode, proc.stderr.decode("utf-8", errors="replace")
+    tar = proc.stdout
+    remote_dir = shlex.quote(args.remote_dir)
+    return run(ssh_command(args, host, f"mkdir -p {remote_dir} && tar -C {remote_dir} -xzf -"), tar, args.ssh_timeout * 6)
+
+
+def run_patch(args: argparse.Namespace, host: str, port: int, cluster: str, dry_run: bool) -> tuple[int, str]:
+    """Run the patch script on the server; AMBARI_PASSWORD goes over stdin."""
+    env = {
+        "AMBARI_USER": args.user,
+        "AMBARI_HOST": host,
+        "AMBARI_PORT": str(port),
+        "AMBARI_PROTOCOL": args.protocol,
+        "CLUSTER": cluster,
+    }
+    if args.python_bin:
+        env["PYTHON_BIN"] = args.python_bin
+    exports = " ".join(f"{k}={shlex.quote(v)}" for k, v in env.items())
+    flags = " --dry-run" if dry_run else ""
+    remote = (f"IFS= read -r AMBARI_PASSWORD && export AMBARI_PASSWORD {exports} && "
+              f"cd {shlex.quote(args.remote_dir)} && sudo -E ./{PATCH_SCRIPT}{flags}")
+    return run(ssh_command(args, host, remote), (args.password + "\n").encode(), args.patch_timeout)
+
+
+def summarize_patch_output(output: str) -> dict:
+    """Pick what would change / what changed out of the patch script log."""
+    return {
+        "stack_files": re.findall(r"(?:DRY-RUN: would replace|Installed) (\S+)", output),
+        "configs": re.findall(r"(?:DRY-RUN: would configs\.py set|Updated) ([\w.-]+?)\.?$", output, re.MULTILINE),
+        "missing": re.findall(r"DRY-RUN: target missing: (\S+)", output),
+    }
+
+
+def ambari_call(args: argparse.Namespace, host: str, port: int, method: str, path: str, body: object = None) -> dict:
+    url = f"{args.protocol}://{host}:{port}/api/v1{path}"
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    token = base64.b64encode(f"{args.user}:{args.password}".encode()).decode().replace("\n", "")
+    req.add_header("Authorization", f"Basic {token}")
+    req.add_header("X-Requested-By", "ambari")
+    ctx = None
+    if args.protocol == "https" and args.insecure:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    with urllib.request.urlopen(req, context=ctx, timeout=60) as resp:
+        text = resp.read().decode("utf-8", errors="replace")
+    return json.loads(text) if text.strip() else {}
+
+
+def affected_host_components(args: argparse.Namespace, host: str, port: int, cluster: str) -> dict[str, list[tuple[str, str]]]:
+    """{host_name: [(service, component), ...]} for the non-client components of --services."""
+    services = ",".join(args.services)
+    data = ambari_call(args, host, port, "GET", f"/clusters/{cluster}/host_components"
+                       f"?HostRoles/service_name.in({services})&fields=HostRoles/host_name,HostRoles/service_name,"
+                       "HostRoles/component_name")
+    hosts: dict[str, list[tuple[str, str]]] = {}
+    for item in data.get("items", []):
+        hr = item["HostRoles"]
+        if hr["component_name"].endswith(CLIENT_SUFFIX):
+            hosts.setdefault(hr["host_name"], [])
+            continue
+        hosts.setdefault(hr["host_name"], []).append((hr["service_name"], hr["component_name"]))
+    return hosts
+
+
+def restart_agents(args: argparse.Namespace, hosts: list[str]) -> dict[str, str]:
+    """`ambari-agent restart` on every host, --host-parallel at a time: {host: "ok" | error}."""
+    def one(host: str) -> str:
+        rc, out = run(ssh_command(args, host, "sudo ambari-agent restart"), timeout=args.ssh_timeout * 12)
+        return "ok" if rc == 0 else f"rc={rc}: {out.strip().splitlines()[-1] if out.strip() else ''}"
+
+    with ThreadPoolExecutor(max_workers=max(1, args.host_parallel)) as pool:
+        return dict(zip(hosts, pool.map(one, hosts)))
+
+
+def restart_components(args: argparse.Namespace, host: str, port: int, cluster: str,
+                       host_components: dict[str, list[tuple[str, str]]]) -> list[dict]:
+    """RESTART every affected component, --host-parallel hosts per request, one request at a time."""
+    by_component: dict[tuple[str, str], list[str]] = {}
+    for host_name, components in sorted(host_components.items()):
+        for service, component in components:
+            by_component.setdefault((service, component), []).append(host_name)
+
+    results = []
+    for (service, component), names in sorted(by_component.items()):
+        size = max(1, args.host_parallel)
+        chunks = [names[i:i + size] for i in range(0, len(names), size)]
+        for n, chunk in enumerate(chunks, 1):
+            body = {
+                "RequestInfo": {"context": f"Restart {component} after ambari_java_home patch ({n} of {len(chunks)})",
+                                "command": "RESTART"},
+                "Requests/resource_filters": [{"service_name": service, "component_name": component,
+                                               "hosts": ",".join(chunk)}],
+            }
+            entry = {"component": component, "hosts": chunk}
+            try:
+                request_id = ambari_call(args, host, port, "POST", f"/clusters/{cluster}/requests", body)["Requests"]["id"]
+                entry["request_id"] = request_id
+                entry["status"] = wait_for_request(args, host, port, cluster, request_id)
+            except (urllib.error.URLError, OSError, KeyError, ValueError) as exc:
+                entry["status"] = f"error: {exc}"
+            results.append(entry)
+            if entry["status"] != "COMPLETED":
+                return results  # do not take down the next batch while this one is unhealthy
+    return results
+
+
+def wait_for_request(args: argparse.Namespace, host: str, port: int, cluster: str, request_id: int) -> str:
+    deadline = time.time() + args.request_timeout
+    while True:
+        status = ambari_call(args, host, port, "GET", f"/clusters/{cluster}/requests/{request_id}"
+                             "?fields=Requests/request_status")["Requests"]["request_status"]
+        if status in TERMINAL_REQUEST_STATUSES:
+            return status
+        if time.time() > deadline:
+            return f"{status} (gave up after {args.request_timeout}s)"
+        time.sleep(args.poll_interval)
+
+
+def process_server(args: argparse.Namespace, host: str, port: int) -> dict:
+    """Every step for one Ambari server; never raises, failures end up in the returned report entry."""
+    report: dict = {"server": f"{host}:{port}", "ok": False}
+    try:
+        names = fetch_cluster_names(args.protocol, host, port, args.user, args.password, args.insecure, 30)
+    except LookupFailed as exc:
+        report["error"] = exc.lines[0]
+        return report
+    if len(names) != 1:
+        report["error"] = f"expected one cluster, found: {', '.join(names) or 'none'}"
+        return report
+    cluster = report["cluster"] = names[0]
+
+    rc, out = push_util(args, host)
+    if rc != 0:
+        report["error"] = f"copy to {args.remote_dir} failed (rc={rc}): {out.strip()[-300:]}"
+        return report
+
+    rc, out = run_patch(args, host, port, cluster, dry_run=True)
+    report["dry_run"] = summarize_patch_output(out)
+    if rc != 0:
+        report["error"] = f"dry run failed (rc={rc}): {out.strip()[-300:]}"
+        return report
+    if report["dry_run"]["missing"]:
+        # the real run dies on the first one ("Target missing on server")
+        report["error"] = f"stack targets missing on server: {', '.join(report['dry_run']['missing'])}"
+        return report
+    pending = report["dry_run"]["stack_files"] or report["dry_run"]["configs"]
+    if args.dry_run or not pending:
+        report["ok"] = True
+        report["result"] = "dry run" if args.dry_run else "compliant"
+        return report
+
+    rc, out = run_patch(args, host, port, cluster, dry_run=False)
+    report["applied"] = summarize_patch_output(out)
+    if rc != 0:
+        report["error"] = f"patch failed (rc={rc}): {out.strip()[-300:]}"
+        return report
+    report["result"] = "patched"
+
+    try:
+        host_components = affected_host_components(args, host, port, cluster)
+    except (urllib.error.URLError, OSError, KeyError, ValueError) as exc:
+        report["error"] = f"could not list {','.join(args.services)} hosts: {exc}"
+        return report
+
+    ok = True
+    if report["applied"]["stack_files"] and not args.no_agent_restart:
+        report["agents"] = restart_agents(args, sorted(host_components))
+        ok = ok and all(v == "ok" for v in report["agents"].values())
+    if args.restart_components and ok:
+        report["component_restarts"] = restart_components(args, host, port, cluster, host_components)
+        ok = all(r["status"] == "COMPLETED" for r in report["component_restarts"])
+    report["ok"] = ok
+    return report
+
+
+def print_report(reports: list[dict]) -> None:
+    print(f"{'SERVER':<32} {'CLUSTER':<16} {'RESULT':<10} {'STACK':>5} {'CONFIGS':>7} {'AGENTS':>9} {'RESTARTS':>9}  NOTE")
+    for r in reports:
+        changes = r.get("applied") or r.get("dry_run") or {}
+        agents = r.get("agents") or {}
+        restarts = r.get("component_restarts") or []
+        agents_col = f"{sum(v == 'ok' for v in agents.values())}/{len(agents)}" if agents else "-"
+        restarts_col = f"{sum(x['status'] == 'COMPLETED' for x in restarts)}/{len(restarts)}" if restarts else "-"
+        result = r.get("result", "FAILED") if r["ok"] else "FAILED"
+        note = r.get("error", "")
+        if not note and agents and agents_col.split("/")[0] != agents_col.split("/")[1]:
+            note = "agent restart failed: " + ", ".join(h for h, v in agents.items() if v != "ok")
+        if not note:
+            note = ", ".join(changes.get("configs", []))
+        print(f"{r['server']:<32} {r.get('cluster', '-'):<16} {result:<10} {len(changes.get('stack_files', [])):>5} "
+              f"{len(changes.get('configs', [])):>7} {agents_col:>9} {restarts_col:>9}  {note}")
+    failed = [r for r in reports if not r["ok"]]
+    print(f"{len(reports) - len(failed)} of {len(reports)} servers OK")
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Run patch_ambari_java_home.sh across many Ambari servers.")
+    p.add_argument("--servers", required=True, help="Ambari servers, host or host:port per line")
+    p.add_argument("--port", type=int, default=8080, help="API port for lines without one (default 8080)")
+    p.add_argument("--protocol", choices=["http", "https"], default="http")
+    p.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification (HTTPS).")
+    p.add_argument("--dry-run", action="store_true", help="only run the dry-run comparison on every server")
+    p.add_argument("--services", default="KAFKA,DRUID",
+                   help="services whose hosts need fresh stack scripts (default KAFKA,DRUID; Cruise Control is in KAFKA)")
+    p.add_argument("--no-agent-restart", action="store_true", help="skip `ambari-agent restart` on affected hosts")
+    p.add_argument("--restart-components", action="store_true",
+                   help="also restart the affected services' components through the Ambari API")
+    p.add_argument("--cluster-parallel", type=int, default=4, help="servers handled at once (default 4)")
+    p.add_argument("--host-parallel", type=int, default=8,
+                   help="per cluster: agents restarted at once, and hosts per component restart request (default 8)")
+    p.add_argument("--ssh-user", help="remote user (default: ssh config)")
+    p.add_argument("--ssh-option", action="append", default=[], help="extra ssh argument, e.g. -oStrictHostKeyChecking=no")
+    p.add_argument("--ssh-timeout", type=int, default=10, help="ssh connect timeout in seconds (default 10)")
+    p.add_argument("--remote-dir", default="/tmp/util-ambari_java_home", help="where the util is copied on each server")
+    p.add_argument("--python-bin", help="PYTHON_BIN for the remote patch script (default: its own default)")
+    p.add_argument("--patch-timeout", type=int, default=900, help="seconds per patch script run (default 900)")
+    p.add_argument("--request-timeout", type=int, default=1800, help="seconds to wait for each restart request (default 1800)")
+    p.add_argument("--poll-interval", type=float, default=10, help="seconds between request status polls (default 10)")
+    p.add_argument("--report", help="also write the report as JSON to this file")
+    args = p.parse_args(argv)
+
+    args.user = os.environ.get("AMBARI_USER")
+    args.password = os.environ.get("AMBARI_PASSWORD")
+    if not args.user or not args.password:
+        eprint("Set AMBARI_USER and AMBARI_PASSWORD.")
+        return EXIT_ERROR
+    args.services = [s.strip().upper() for s in args.services.split(",") if s.strip()]
+    try:
+        servers = read_hosts_file(args.servers, args.port)
+    except (OSError, ValueError) as exc:
+        eprint(f"Cannot read {args.servers}: {exc}")
+        return EXIT_ERROR
+
+    with ThreadPoolExecutor(max_workers=max(1, args.cluster_parallel)) as pool:
+        reports = list(pool.map(lambda server: process_server(args, *server), servers))
+
+    print_report(reports)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return EXIT_OK if all(r["ok"] for r in reports) else EXIT_ERROR
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3.11
+"""
+Find Ambari agents whose stack script cache is older than the server's stack scripts.
+
+  agent_cache_scan.py [options] --mirror DIR [--mirror DIR ...] [--tarball FILE ...]
+
+Agent caches come from a local mirror (DIR/<host>/..., e.g. rsync of each host's
+/var/lib/ambari-agent/cache into DIR/<host>) or a tarball whose top-level directories are host
+names (.tar, .tar.gz, ...; read as a stream, nothing is extracted). Any file below a `stacks/`
+directory is matched against <server-root>/stacks by its path from `stacks/` on, so the exact
+cache layout of the Ambari version does not matter.
+
+The server's stack scripts (--include, default *.py) are hashed once; agent files are looked
+up in that index by relative path and only hashed when their size matches. Mirror files are
+hashed by a thread pool and may use a --cache (see file_sha256.py). Files the agent has not
+cached at all are not stale: the agent fetches them when it first needs them.
+
+Output: "<host><TAB><relpath>" for every stale file (or --json), summary on stderr.
+
+Exit codes:
+  0  No stale files.
+  1  Usage error, or a mirror / tarball / server file could not be read.
+  2  At least one host caches a stale stack file.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import tarfile
+
+from file_sha256 import (CHUNK_SIZE, default_workers, eprint, expand_paths, hash_files, load_cache,
+                         save_cache)
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_STALE = 2
+
+
+def stack_relpath(path: str) -> str | None:
+    """Part of path from its first `stacks` directory on, or None if it is not under one."""
+    parts = path.replace(os.sep, "/").split("/")
+    try:
+        return "/".join(parts[parts.index("stacks"):])
+    except ValueError:
+        return None
+
+
+def server_index(root: str, includes: list[str], workers: int,
+                 cache: dict | None) -> tuple[dict[str, tuple[int, str]], list[str]]:
+    """{"stacks/...": (size, digest)} for every server stack file matching includes; (index, errors)."""
+    files, _ = expand_paths([os.path.join(root, "stacks")])
+    files = [f for f in files if any(fnmatch.fnmatch(os.path.basename(f), pat) for pat in includes)]
+    index: dict[str, tuple[int, str]] = {}
+    errors = []
+    for path, result in hash_files(files, workers, cache).items():
+        if isinstance(result, OSError):
+            errors.append(f"{path}: {result.strerror}")
+            continue
+        index[os.path.relpath(path, root).replace(os.sep, "/")] = (os.path.getsize(path), result)
+    return index, errors
+
+
+def scan_mirror(mirror: str, index: dict[str, tuple[int, str]], workers: int,
+                cache: dict | None) -> tuple[dict[str, list[str]], list[str]]:
+    """({host: [stale relpath, ...]}, errors) for DIR/<host>/... trees."""
+    candidates: dict[str, tuple[str, str]] = {}  # agent file path -> (host, relpath)
+    stale: dict[str, list[str]] = {}
+    for host in sorted(os.listdir(mirror)):
+        host_dir = os.path.join(mirror, host)
+        if not os.path.isdir(host_dir):
+            continue
+        stale.setdefault(host, [])
+        files, _ = expand_paths([host_dir])
+        for path in files:
+            rel = stack_relpath(os.path.relpath(path, host_dir))
+            if rel not in index:
+                continue
+            if os.path.getsize(path) != index[rel][0]:
+                stale[host].append(rel)
+            else:
+                candidates[path] = (host, rel)
+
+    errors = []
+    for path, result in hash_files(list(candidates), workers, cache).items():
+        host, rel = candidates[path]
+        if isinstance(result, OSError):
+            errors.append(f"{path}: {result.strerror}")
+        elif result != index[rel][1]:
+            stale[host].append(rel)
+    return stale, errors
+
+
+def scan_tarball(path: str, index: dict[str, tuple[int, str]]) -> dict[str, list[str]]:
+    """{host: [stale relpath, ...]} for a tarball of <host>/... trees, read in one sequential pass."""
+    stale: dict[str, list[str]] = {}
+    with tarfile.open(path, "r|*") as tar:
+        for member in tar:
+            parts = member.name.removeprefix("./").split("/", 1)
+            if parts[0] in ("", "."):
+                continue
+            host = parts[0]
+            stale.setdefault(host, [])
+            rel = stack_relpath(parts[1]) if len(parts) > 1 and member.isfile() else None
+            if rel not in index:
+                continue
+            if member.size != index[rel][0]:
+                stale[host].append(rel)
+                continue
+            digest = hashlib.sha256()
+            f = tar.extractfile(member)
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+            if digest.hexdigest() != index[rel][1]:
+                stale[host].append(rel)
+    return stale
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="List agent hosts whose cached stack scripts differ from the server's.")
+    p.add_argument("--server-root", default=os.environ.get("AMBARI_RESOURCES", "/var/lib/ambari-server/resources"),
+                   help="Ambari server resources dir (default $AMBARI_RESOURCES or /var/lib/ambari-server/resources)")
+    p.add_argument("--mirror", action="append", default=[], help="directory with one agent cache tree per host")
+    p.add_argument("--tarball", action="append", default=[], help="tarball with one agent cache tree per host")
+    p.add_argument("--include", action="append", help="file name pattern to compare (repeatable; default *.py)")
+    p.add_argument("--workers", type=int, default=default_workers(), help="hashing threads (default: CPUs + 4, max 32)")
+    p.add_argument("--cache", help="JSON digest cache for server and mirror files, reused across runs")
+    p.add_argument("--json", action="store_true", help='print {"host": [relpath, ...]} for stale hosts only')
+    args = p.parse_args(argv)
+
+    if not args.mirror and not args.tarball:
+        eprint("Give at least one --mirror or --tarball.")
+        return EXIT_ERROR
+    if not os.path.isdir(os.path.join(args.server_root, "stacks")):
+        eprint(f"{args.server_root}/stacks: not a directory")
+        return EXIT_ERROR
+
+    workers = max(1, args.workers)
+    cache = load_cache(args.cache) if args.cache else None
+    index, errors = server_index(args.server_root, args.include or ["*.py"], workers, cache)
+
+    stale: dict[str, list[str]] = {}
+    for mirror in args.mirror:
+        if not os.path.isdir(mirror):
+            errors.append(f"{mirror}: not a directory")
+            continue
+        found, mirror_errors = scan_mirror(mirror, index, workers, cache)
+        errors += mirror_errors
+        for host, rels in found.items():
+            stale.setdefault(host, []).extend(rels)
+    for tarball in args.tarball:
+        try:
+            found = scan_tarball(tarball, index)
+        except (OSError, tarfile.TarError) as exc:
+            errors.append(f"{tarball}: {exc}")
+            continue
+        for host, rels in found.items():
+            stale.setdefault(host, []).extend(rels)
+    if cache is not None:
+        save_cache(args.cache, cache)
+
+    stale_hosts = {host: sorted(set(rels)) for host, rels in sorted(stale.items()) if rels}
+    if args.json:
+        print(json.dumps(stale_hosts, indent=2))
+    else:
+        for host, rels in stale_hosts.items():
+            for rel in rels:
+                print(f"{host}\t{rel}")
+    for error in errors:
+        eprint(error)
+    eprint(f"{len(stale_hosts)} of {len(stale)} hosts cache stale stack files "
+           f"({sum(map(len, stale_hosts.values()))} files; {len(index)} server files indexed)")
+    if errors:
+        return EXIT_ERROR
+    return EXIT_STALE if stale_hosts else EXIT_OK
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
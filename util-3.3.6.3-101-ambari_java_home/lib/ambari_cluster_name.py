@@ -2,22 +2,30 @@
 """
 GET Ambari /api/v1/clusters and print the sole cluster_name to stdout.
 
+With --hosts-file, resolve many Ambari servers concurrently instead and print one line per
+endpoint: "<host>:<port><TAB><name>[,<name>...]" (failures go to stderr). In both modes answers
+can be kept in a JSON cache (--cache, valid for --ttl seconds) so repeat runs make no requests.
+
 Exit codes:
-  0  One cluster; name on stdout only.
+  0  One cluster; name on stdout only. (--hosts-file: every endpoint resolved.)
   1  No cluster, bad JSON, or unexpected response.
   2  Multiple clusters; comma-separated names on stderr (set CLUSTER=...).
   3  HTTP error from Ambari.
   4  Network / TLS / URL error.
+  --hosts-file: the highest code of any endpoint that failed (2 is not a failure there).
 """
 from __future__ import annotations
 
 import argparse
 import base64
 import json
+import os
 import ssl
 import sys
+import time
 import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
 EXIT_OK = 0
 EXIT_NO_CLUSTER = 1
@@ -26,64 +34,61 @@ EXIT_HTTP = 3
 EXIT_NET = 4
 
 
+class LookupFailed(Exception):
+    """A /api/v1/clusters lookup failed; code is one of the EXIT_* values, lines are the messages."""
+
+    def __init__(self, code: int, *lines: str) -> None:
+        super().__init__(lines[0] if lines else "")
+        self.code = code
+        self.lines = lines
+
+
 def eprint(*args: object) -> None:
     print(*args, file=sys.stderr)
 
 
-def hint_http_tls(protocol: str, port: int) -> None:
+def hint_http_tls(protocol: str, port: int) -> str | None:
     if protocol == "http" and port in (443, 8443, 8446, 9443):
-        eprint("Hint: this port often uses TLS; use --protocol https (and --insecure if needed).")
+        return "Hint: this port often uses TLS; use --protocol https (and --insecure if needed)."
+    return None
 
 
-def main(argv: list[str]) -> int:
-    p = argparse.ArgumentParser(description="Print Ambari cluster_name when exactly one cluster exists.")
-    p.add_argument("--host", required=True)
-    p.add_argument("--port", type=int, default=8080)
-    p.add_argument("--protocol", choices=["http", "https"], default="http")
-    p.add_argument("--user", required=True)
-    p.add_argument("--password", required=True)
-    p.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification (HTTPS).")
-    args = p.parse_args(argv)
-
-    url = f"{args.protocol}://{args.host}:{args.port}/api/v1/clusters"
+def fetch_cluster_names(protocol: str, host: str, port: int, user: str, password: str,
+                        insecure: bool, timeout: float) -> list[str]:
+    """Cluster names known to one Ambari server; raises LookupFailed."""
+    url = f"{protocol}://{host}:{port}/api/v1/clusters"
     req = urllib.request.Request(url, method="GET")
-    token = base64.b64encode(f"{args.user}:{args.password}".encode()).decode().replace("\n", "")
+    token = base64.b64encode(f"{user}:{password}".encode()).decode().replace("\n", "")
     req.add_header("Authorization", f"Basic {token}")
     req.add_header("X-Requested-By", "ambari")
 
     ctx = None
-    if args.protocol == "https" and args.insecure:
+    if protocol == "https" and insecure:
         ctx = ssl.create_default_context()
         ctx.check_hostname = False
         ctx.verify_mode = ssl.CERT_NONE
 
+    hint = hint_http_tls(protocol, port)
+    hints = (hint,) if hint else ()
     try:
-        with urllib.request.urlopen(req, context=ctx, timeout=60) as resp:
+        with urllib.request.urlopen(req, context=ctx, timeout=timeout) as resp:
             body = resp.read().decode("utf-8", errors="replace")
             status = resp.status
     except urllib.error.HTTPError as exc:
         snippet = exc.read().decode("utf-8", errors="replace")[:500]
-        eprint(f"HTTP {exc.code} from {url}: {snippet}")
-        hint_http_tls(args.protocol, args.port)
-        return EXIT_HTTP
+        raise LookupFailed(EXIT_HTTP, f"HTTP {exc.code} from {url}: {snippet}", *hints)
     except urllib.error.URLError as exc:
-        eprint(f"Connection error ({url}): {exc.reason!r}")
-        hint_http_tls(args.protocol, args.port)
-        return EXIT_NET
+        raise LookupFailed(EXIT_NET, f"Connection error ({url}): {exc.reason!r}", *hints)
+    except OSError as exc:  # socket timeouts during read are not wrapped in URLError
+        raise LookupFailed(EXIT_NET, f"Connection error ({url}): {exc!r}", *hints)
 
     if status != 200:
-        eprint(f"Unexpected HTTP {status} from {url}")
-        eprint(body[:500])
-        hint_http_tls(args.protocol, args.port)
-        return EXIT_HTTP
+        raise LookupFailed(EXIT_HTTP, f"Unexpected HTTP {status} from {url}", body[:500], *hints)
 
     try:
         data = json.loads(body)
     except json.JSONDecodeError as exc:
-        eprint(f"Invalid JSON from {url}: {exc}")
-        eprint(body[:400])
-        hint_http_tls(args.protocol, args.port)
-        return EXIT_NO_CLUSTER
+        raise LookupFailed(EXIT_NO_CLUSTER, f"Invalid JSON from {url}: {exc}", body[:400], *hints)
 
     items = data.get("items") or []
     names: list[str] = []
@@ -92,6 +97,140 @@ def main(argv: list[str]) -> int:
         n = cl.get("cluster_name")
         if n:
             names.append(str(n))
+    return names
+
+
+def read_hosts_file(path: str, default_port: int) -> list[tuple[str, int]]:
+    """Lines of "host" or "host:port"; blank lines and # comments are skipped, duplicates dropped."""
+    endpoints: list[tuple[str, int]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            host, _, port = line.partition(":")
+            endpoint = (host, int(port) if port else default_port)
+            if endpoint not in endpoints:
+                endpoints.append(endpoint)
+    return endpoints
+
+
+def load_cache(path: str | None) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_cache(path: str, cache: dict) -> None:
+    tmp = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as exc:
+        eprint(f"Could not write cache {path}: {exc}")
+
+
+def resolve_many(args: argparse.Namespace) -> int:
+    try:
+        endpoints = read_hosts_file(args.hosts_file, args.port)
+    except (OSError, ValueError) as exc:
+        eprint(f"Cannot read hosts file {args.hosts_file}: {exc}")
+        return EXIT_NO_CLUSTER
+
+    cache = load_cache(args.cache)
+    now = time.time()
+    results: dict[str, list[str] | LookupFailed] = {}
+    todo = []
+    for host, port in endpoints:
+        key = f"{args.protocol}://{host}:{port}"
+        entry = cache.get(key)
+        if not args.refresh and entry and now - entry.get("fetched_at", 0) <= args.ttl:
+            results[key] = entry["clusters"]
+        else:
+            todo.append((key, host, port))
+
+    def lookup(item: tuple[str, str, int]) -> list[str] | LookupFailed:
+        _, host, port = item
+        try:
+            return fetch_cluster_names(args.protocol, host, port, args.user, args.password, args.insecure, args.timeout)
+        except LookupFailed as exc:
+            return exc
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for (key, _, _), result in zip(todo, pool.map(lookup, todo)):
+                results[key] = result
+                if not isinstance(result, LookupFailed):
+                    cache[key] = {"clusters": result, "fetched_at": int(now)}
+        if args.cache:
+            save_cache(args.cache, cache)
+
+    rc = EXIT_OK
+    report = {}
+    for host, port in endpoints:
+        key = f"{args.protocol}://{host}:{port}"
+        result = results[key]
+        if isinstance(result, LookupFailed):
+            for line in result.lines:
+                eprint(f"{host}:{port}: {line}")
+            rc = max(rc, result.code)
+            continue
+        if not result:
+            eprint(f"{host}:{port}: No clusters in Ambari response (empty items or missing cluster_name).")
+            rc = max(rc, EXIT_NO_CLUSTER)
+        report[f"{host}:{port}"] = result
+        if not args.json:
+            print(f"{host}:{port}\t{','.join(result)}")
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    return rc
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Print Ambari cluster_name when exactly one cluster exists.")
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--host")
+    target.add_argument("--hosts-file", help="resolve every Ambari server listed (host or host:port per line)")
+    p.add_argument("--port", type=int, default=8080, help="port (default for hosts-file lines without one)")
+    p.add_argument("--protocol", choices=["http", "https"], default="http")
+    p.add_argument("--user", required=True)
+    p.add_argument("--password", required=True)
+    p.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification (HTTPS).")
+    p.add_argument("--timeout", type=float, help="seconds per request (default 60, or 10 with --hosts-file)")
+    p.add_argument("--workers", type=int, default=16, help="--hosts-file: concurrent lookups (default 16)")
+    p.add_argument("--cache", help="JSON cache of answers, keyed by protocol://host:port")
+    p.add_argument("--ttl", type=int, default=3600, help="cache lifetime in seconds (default 3600)")
+    p.add_argument("--refresh", action="store_true", help="ignore cached answers (and refresh them)")
+    p.add_argument("--json", action="store_true", help="--hosts-file: print {\"host:port\": [names]} instead of lines")
+    args = p.parse_args(argv)
+
+    if args.hosts_file:
+        if args.timeout is None:
+            args.timeout = 10
+        return resolve_many(args)
+
+    cache = load_cache(args.cache)
+    key = f"{args.protocol}://{args.host}:{args.port}"
+    entry = cache.get(key)
+    if not args.refresh and entry and time.time() - entry.get("fetched_at", 0) <= args.ttl:
+        names = entry["clusters"]
+    else:
+        try:
+            names = fetch_cluster_names(args.protocol, args.host, args.port, args.user, args.password, args.insecure,
+                                        60 if args.timeout is None else args.timeout)
+        except LookupFailed as exc:
+            for line in exc.lines:
+                eprint(line)
+            return exc.code
+        if args.cache:
+            cache[key] = {"clusters": names, "fetched_at": int(time.time())}
+            save_cache(args.cache, cache)
 
     if not names:
         eprint("No clusters in Ambari response (empty items or missing cluster_name).")
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3.11
+"""
+Apply declarative, idempotent edits to the `content` of Ambari *-env config types.
+
+Each content is parsed once into blocks (one shell line, or several joined by trailing
+backslashes); a block that assigns a variable (`[export ]NAME=value`) carries its name and value,
+and every block carries the Java versions selected by the `{% if/elif/else %}` branches around it
+that test `java_version`. All edits for a type run on that block list in one pass, and a type
+whose content comes out identical is reported as compliant and never rewritten.
+
+Rules file (JSON): config type pattern (fnmatch, e.g. "*-env") -> list of edits:
+
+  {"op": "ensure_export", "name": "AMBARI_JAVA_HOME", "value": "{{ambari_java_home}}", "after": "JAVA_HOME"}
+      set the export's value, or add it after the `after` export (its indentation), else at the end.
+  {"op": "replace_jvm_opt", "var": "<regex over variable names>", "opt": "<regex for one option>", "with": "<option>"}
+      replace every whole option matching opt in those variables' values (re.sub template, so \\1
+      works); "with": null removes the option. An option already present is not added twice.
+  {"op": "remove_line", "match": "<regex>"}
+      drop every block whose text matches.
+  {"op": "replace" | "insert_after", ...}
+      text rules from json_content_roundtrip.py, applied to the whole content.
+
+A block edit with "min_java": N only touches blocks outside any java_version guard, or inside
+branches that select Java N or later only; e.g. the `{% elif java_version == 8 %}` branch of an
+ODP env template keeps its JDK 8 flags under a "min_java": 9 rule.
+
+Sources: configs.py JSON files (`<type>.json` / `<type>.raw.json`), or every config type of a
+cluster in one REST call (--host ... --cluster). Output, one line per type:
+  compliant<TAB><type>  |  changed<TAB><type>[<TAB><written file>]  |  error<TAB><type><TAB><reason>
+--diff prints a unified diff after each changed line. Nothing is written without --out-dir or --apply.
+
+Exit codes:
+  0  Every type compliant or patched.
+  1  Bad rules/arguments, or a type could not be processed.
+  3  HTTP error from Ambari.
+  4  Network / TLS / URL error.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import difflib
+import fnmatch
+import json
+import operator
+import os
+import re
+import ssl
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from json_content_roundtrip import apply_rule
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_HTTP = 3
+EXIT_NET = 4
+
+ASSIGNMENT = re.compile(r"^(?P<indent>[ \t]*)(?P<export>export[ \t]+)?(?P<name>[A-Za-z_][A-Za-z0-9_]*)=(?P<value>.*)$", re.DOTALL)
+# An option boundary inside a shell value: start, whitespace, a quote, or the "=" of the assignment.
+OPT_BEFORE = r"(?<![^\s\"'=])"
+OPT_AFTER = r"(?![^\s\"'])"
+# A Jinja if/elif/else/endif tag on a line of its own, and a single java_version[|int] comparison.
+JINJA_BRANCH = re.compile(r"^[ \t]*\{%-?[ \t]*(?P<tag>if|elif|else|endif)\b(?P<test>.*?)-?%\}[ \t]*$")
+JAVA_TEST = re.compile(r"^java_version(?:[ \t]*\|[ \t]*int)?[ \t]*(?P<op>==|!=|<=|>=|<|>)[ \t]*(?P<version>\d+)$")
+JAVA_VERSIONS = frozenset(range(1, 100))
+JAVA_COMPARE = {"==": operator.eq, "!=": operator.ne, "<=": operator.le, ">=": operator.ge, "<": operator.lt, ">": operator.gt}
+
+
+def eprint(*args: object) -> None:
+    print(*args, file=sys.stderr)
+
+
+def java_test(test: str) -> frozenset | None:
+    """Java versions for which an if/elif test holds; None if it does not test java_version.
+
+    A test that mentions java_version but is not a single comparison could hold for any version.
+    """
+    m = JAVA_TEST.match(test.strip())
+    if m:
+        compare, version = JAVA_COMPARE[m.group("op")], int(m.group("version"))
+        return frozenset(v for v in JAVA_VERSIONS if compare(v, version))
+    return JAVA_VERSIONS if "java_version" in test else None
+
+
+def parse_blocks(text: str) -> list[dict]:
+    """Split content into blocks: {"text", "java", "indent", "export", "name", "value"} (name None if not an
+    assignment). "java" is None outside any java_version guard, else the Java versions the enclosing branches select.
+    """
+    blocks: list[dict] = []
+    # One frame per open {% if %}: [versions of the current branch, versions taken by earlier branches, guards java]
+    frames: list[list] = []
+    pending = ""
+    for line in text.splitlines(keepends=True):
+        pending += line
+        if line.rstrip("\r\n").endswith("\\"):
+            continue
+        blocks.append(make_block(pending, frames))
+        pending = ""
+        branch = JINJA_BRANCH.match(line.rstrip("\r\n"))
+        if not branch:
+            continue
+        tag = branch.group("tag")
+        if tag == "if":
+            frames.append([JAVA_VERSIONS, frozenset(), False])
+        if not frames:
+            continue
+        frame = frames[-1]
+        if tag in ("if", "elif"):
+            selected = java_test(branch.group("test"))
+            frame[0] = (JAVA_VERSIONS if selected is None else selected) - frame[1]
+            if selected is not None:
+                frame[1] |= selected
+                frame[2] = True
+        elif tag == "else":
+            frame[0] = JAVA_VERSIONS - frame[1]
+        else:
+            frames.pop()
+    if pending:
+        blocks.append(make_block(pending, frames))
+    return blocks
+
+
+def branch_java(frames: list[list]) -> frozenset | None:
+    """Java versions selected by the open branches that test java_version; None if there are none."""
+    java = None
+    for selected, _, guards in frames:
+        if guards:
+            java = selected if java is None else java & selected
+    return java
+
+
+def make_block(text: str, frames: list[list] | None = None, java: frozenset | None = None) -> dict:
+    """A block of text; java (the selected Java versions) comes from the open branches in frames if given."""
+    if frames is not None:
+        java = branch_java(frames)
+    m = ASSIGNMENT.match(text.rstrip("\r\n"))
+    if not m:
+        return {"text": text, "java": java, "name": None}
+    return {"text": text, "java": java, "indent": m.group("indent"), "export": bool(m.group("export")),
+            "name": m.group("name"), "value": m.group("value")}
+
+
+def in_scope(block: dict, edit: dict) -> bool:
+    """Whether edit may touch block: always without "min_java", else only outside java_version guards or in
+    branches that select Java min_java or later only."""
+    min_java = edit.get("min_java")
+    if min_java is None or block["java"] is None:
+        return True
+    return bool(block["java"]) and min(block["java"]) >= int(min_java)
+
+
+def render(blocks: list[dict]) -> str:
+    return "".join(block["text"] for block in blocks)
+
+
+def export_block(indent: str, name: str, value: str, java: frozenset | None = None) -> dict:
+    return make_block(f"{indent}export {name}={value}\n", java=java)
+
+
+def ensure_export(blocks: list[dict], edit: dict) -> list[dict]:
+    name, value = edit["name"], edit["value"]
+    for i, block in enumerate(blocks):
+        if block["name"] == name and block["export"] and in_scope(block, edit):
+            if block["value"] != value:
+                blocks[i] = export_block(block["indent"], name, value, block["java"])
+            return blocks
+    after = edit.get("after")
+    for i, block in enumerate(blocks):
+        if after and block["name"] == after and block["export"] and in_scope(block, edit):
+            blocks.insert(i + 1, export_block(block["indent"], name, value, block["java"]))
+            return blocks
+    if blocks and not blocks[-1]["text"].endswith("\n"):
+        blocks[-1] = make_block(blocks[-1]["text"] + "\n", java=blocks[-1]["java"])
+    blocks.append(export_block("", name, value))
+    return blocks
+
+
+def replace_jvm_opt(blocks: list[dict], edit: dict) -> list[dict]:
+    var = re.compile(edit["var"])
+    opt = re.compile(OPT_BEFORE + "(?:" + edit["opt"] + ")" + OPT_AFTER)
+    replacement = edit.get("with")
+    for i, block in enumerate(blocks):
+        if not block["name"] or not var.fullmatch(block["name"]) or not in_scope(block, edit) \
+                or not opt.search(block["value"]):
+            continue
+        value = block["value"]
+        present = replacement is not None and re.search(OPT_BEFORE + re.escape(replacement) + OPT_AFTER, value)
+        if replacement is None or present:
+            # Drop the option with the blank before it, or after it when it starts a (continuation) line.
+            value = re.sub(r"(?<=\S)[ \t]+" + opt.pattern + "|" + opt.pattern + r"[ \t]*", "", value)
+        else:
+            value = opt.sub(replacement, value)
+        prefix = block["text"][:len(block["text"]) - len(block["text"].lstrip(" \t"))]
+        head = ("export " if block["export"] else "") + block["name"] + "="
+        newline = block["text"][len(block["text"].rstrip("\r\n")):]
+        blocks[i] = make_block(prefix + head + value + newline, java=block["java"])
+    return blocks
+
+
+def remove_line(blocks: list[dict], edit: dict) -> list[dict]:
+    match = re.compile(edit["match"])
+    return [block for block in blocks if not (match.search(block["text"]) and in_scope(block, edit))]
+
+
+BLOCK_EDITS = {
+    "ensure_export": ensure_export,
+    "replace_jvm_opt": replace_jvm_opt,
+    "remove_line": remove_line,
+}
+
+
+def apply_edits(text: str, edits: list[dict]) -> str:
+    """Run edits in order; the content is parsed once and re-parsed only after a text rule."""
+    blocks = parse_blocks(text)
+    for edit in edits:
+        op = edit.get("op")
+        if op in BLOCK_EDITS:
+            blocks = BLOCK_EDITS[op](blocks, edit)
+        else:
+            blocks = parse_blocks(apply_rule(render(blocks), edit))
+    return render(blocks)
+
+
+def edits_for(rules: dict, config_type: str) -> list[dict]:
+    """All edits whose pattern matches config_type, exact names first, then patterns in file order."""
+    edits = list(rules.get(config_type, []))
+    for pattern, more in rules.items():
+        if pattern != config_type and fnmatch.fnmatchcase(config_type, pattern):
+            edits.extend(more)
+    return edits
+
+
+def config_type_of(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in (".raw.json", ".json"):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def ambari_call(args: argparse.Namespace, method: str, path: str, body: object = None) -> object:
+    """JSON request to the Ambari API; raises urllib.error.HTTPError / URLError."""
+    url = f"{args.protocol}://{args.host}:{args.port}/api/v1{path}"
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    token = base64.b64encode(f"{args.user}:{args.password}".encode()).decode().replace("\n", "")
+    req.add_header("Authorization", f"Basic {token}")
+    req.add_header("X-Requested-By", "ambari")
+    ctx = None
+    if args.protocol == "https" and args.insecure:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    with urllib.request.urlopen(req, context=ctx, timeout=60) as resp:
+        text = resp.read().decode("utf-8", errors="replace")
+    return json.loads(text) if text.strip() else None
+
+
+def fetch_current_configs(args: argparse.Namespace) -> dict[str, dict]:
+    """{type: {"properties", "properties_attributes"}} for every current config type, in one call."""
+    data = ambari_call(args, "GET", f"/clusters/{args.cluster}/configurations/service_config_versions"
+                                    "?is_current=true&fields=configurations")
+    configs: dict[str, dict] = {}
+    for item in data.get("items", []):
+        if item.get("group_id", -1) not in (-1, None):
+            continue  # config groups only override properties; the default group holds content
+        for config in item.get("configurations", []):
+            configs[config["type"]] = {"properties": config.get("properties", {}),
+                                       "properties_attributes": config.get("properties_attributes", {})}
+    return configs
+
+
+def put_config(args: argparse.Namespace, config_type: str, data: dict) -> None:
+    desired = {"type": config_type, "tag": f"version{int(time.time() * 1000)}",
+               "properties": data["properties"], "service_config_version_note": args.note}
+    if data.get("properties_attributes"):
+        desired["properties_attributes"] = data["properties_attributes"]
+    ambari_call(args, "PUT", f"/clusters/{args.cluster}", {"Clusters": {"desired_config": [desired]}})
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Declarative, idempotent edits of *-env `content` across config types.")
+    p.add_argument("--rules", required=True, help="JSON: config type pattern -> list of edits")
+    p.add_argument("configs", nargs="*", help="configs.py JSON files (<type>.json / <type>.raw.json)")
+    p.add_argument("--diff", action="store_true", help="print a unified diff for every changed type")
+    p.add_argument("--out-dir", help="file mode: write changed types here as <type>.json")
+    rest = p.add_argument_group("REST mode (all config types of a cluster in one call)")
+    rest.add_argument("--host")
+    rest.add_argument("--port", type=int, default=8080)
+    rest.add_argument("--protocol", choices=["http", "https"], default="http")
+    rest.add_argument("--user", default=os.environ.get("AMBARI_USER"))
+    rest.add_argument("--password", default=os.environ.get("AMBARI_PASSWORD"))
+    rest.add_argument("--insecure", action="store_true", help="Skip TLS certificate verification (HTTPS).")
+    rest.add_argument("--cluster")
+    rest.add_argument("--apply", action="store_true", help="PUT every changed type as a new config version")
+    rest.add_argument("--note", default="env template patch (env_template_patch.py)", help="config version note")
+    args = p.parse_args(argv)
+
+    try:
+        with open(args.rules, encoding="utf-8") as f:
+            rules = json.load(f)
+    except (OSError, ValueError) as exc:
+        eprint(f"Cannot load rules {args.rules}: {exc}")
+        return EXIT_ERROR
+
+    if args.host:
+        if not (args.cluster and args.user and args.password):
+            eprint("REST mode needs --cluster and --user/--password (or AMBARI_USER/AMBARI_PASSWORD)")
+            return EXIT_ERROR
+        try:
+            configs = fetch_current_configs(args)
+        except urllib.error.HTTPError as exc:
+            eprint(f"HTTP {exc.code} from Ambari: {exc.read().decode('utf-8', errors='replace')[:500]}")
+            return EXIT_HTTP
+        except urllib.error.URLError as exc:
+            eprint(f"Connection error: {exc.reason!r}")
+            return EXIT_NET
+    elif args.configs:
+        configs = {}
+        for path in args.configs:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    configs[config_type_of(path)] = json.load(f)
+            except (OSError, ValueError) as exc:
+                print(f"error\t{config_type_of(path)}\t{exc}")
+                return EXIT_ERROR
+    else:
+        p.error("give configs.py JSON files, or --host/--cluster for REST mode")
+
+    rc = EXIT_OK
+    for config_type in sorted(configs):
+        edits = edits_for(rules, config_type)
+        props = configs[config_type].get("properties") or {}
+        if not edits or "content" not in props:
+            continue
+        before = props["content"] or ""
+        try:
+            after = apply_edits(before, edits)
+        except (KeyError, re.error, ValueError) as exc:
+            print(f"error\t{config_type}\t{exc!r}")
+            rc = EXIT_ERROR
+            continue
+        if after == before:
+            print(f"compliant\t{config_type}")
+            continue
+
+        data = dict(configs[config_type], properties=dict(props, content=after))
+        written = ""
+        try:
+            if args.out_dir:
+                written = os.path.join(args.out_dir, f"{config_type}.json")
+                with open(written, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+            elif args.apply and args.host:
+                put_config(args, config_type, data)
+                written = "applied"
+        except (OSError, urllib.error.URLError) as exc:
+            print(f"error\t{config_type}\t{exc}")
+            rc = EXIT_ERROR
+            continue
+        print(f"changed\t{config_type}" + (f"\t{written}" if written else ""))
+        if args.diff:
+            sys.stdout.writelines(difflib.unified_diff(before.splitlines(keepends=True), after.splitlines(keepends=True),
+                                                       f"a/{config_type}", f"b/{config_type}"))
+    return rc
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,11 +1,272 @@
 #!/usr/bin/env python3.11
-"""Print SHA-256 hex digest of a file (single path argument)."""
+"""
+Print SHA-256 hex digests, or compare two directory trees by digest.
+
+  file_sha256.py <file>                        digest only (used by patch_ambari_java_home.sh)
+  file_sha256.py [options] <path> [<path> ...]  manifest: "<digest>  <path>" per file, sorted by path
+  file_sha256.py compare-tree [options] <left> <right>
+                                               "<status>  <relpath>" for every file that is not identical
+
+Files are streamed in fixed-size chunks, never read whole. Directories are walked recursively.
+In manifest mode files are hashed by a thread pool (hashlib releases the GIL while hashing),
+and the output can be checked later with `sha256sum -c`.
+
+--cache FILE keeps digests in a JSON file keyed by path and (inode, size, mtime_ns); a file whose
+stat still matches is not read again.
+
+Exit codes:
+  0  All files hashed; compare-tree: trees identical.
+  1  Usage error, or at least one path missing / unreadable (reported on stderr; others still listed).
+  2  compare-tree: at least one file differs or exists on one side only.
+"""
+from __future__ import annotations
+
+import argparse
 import hashlib
-import pathlib
+import json
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_DIFFERENT = 2
+
+CHUNK_SIZE = 1024 * 1024
+CACHE_VERSION = 1
+# A file modified this recently could change again within the same mtime tick without its stat
+# changing, so its digest is not cached (same idea as git's "racily clean" index entries).
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def eprint(*args: object) -> None:
+    print(*args, file=sys.stderr)
+
+
+def sha256_file(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """Stream path through SHA-256 with one reused buffer; memory use is chunk_size whatever the file size."""
+    digest = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def load_cache(path: str | None) -> dict:
+    """{"entries": {abspath: [inode, size, mtime_ns, digest]}, "dirty": bool}; empty if path is unset, missing or unreadable."""
+    cache: dict = {"entries": {}, "dirty": False}
+    if not path or not os.path.exists(path):
+        return cache
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as exc:
+        eprint(f"Ignoring unreadable hash cache {path}: {exc}")
+        return cache
+    if not isinstance(data, dict):
+        eprint(f"Ignoring hash cache {path}: not a JSON object")
+        return cache
+    if data.get("version") == CACHE_VERSION and isinstance(data.get("entries"), dict):
+        cache["entries"] = data["entries"]
+    return cache
+
+
+def save_cache(path: str | None, cache: dict) -> None:
+    """Write the cache atomically, dropping entries for files that no longer exist; no-op if nothing was added.
+
+    A cache that cannot be written only costs a re-hash next time, so that is a warning, not an error.
+    """
+    if not path or not cache["dirty"]:
+        return
+    entries = {p: e for p, e in cache["entries"].items() if os.path.exists(p)}
+    tmp = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as exc:
+        eprint(f"Could not write hash cache {path}: {exc}")
+
+
+def cached_sha256(path: str, cache: dict | None) -> str:
+    """sha256_file(path), answered from cache when path's (inode, size, mtime_ns) is unchanged."""
+    if cache is None:
+        return sha256_file(path)
+    key = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = [st.st_ino, st.st_size, st.st_mtime_ns]
+    entry = cache["entries"].get(key)
+    if entry and entry[:3] == stamp:
+        return entry[3]
+    digest = sha256_file(path)
+    if time.time_ns() - st.st_mtime_ns > RACY_WINDOW_NS:
+        cache["entries"][key] = stamp + [digest]
+        cache["dirty"] = True
+    return digest
+
+
+def expand_paths(paths: list[str]) -> tuple[list[str], list[str]]:
+    """Files named directly plus every regular file under the named directories: (files, missing)."""
+    files: list[str] = []
+    missing: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in names
+                             if os.path.isfile(os.path.join(root, name)))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            missing.append(path)
+    return sorted(set(files)), missing
+
+
+def hash_files(files: list[str], workers: int, cache: dict | None = None) -> dict[str, str | OSError]:
+    """{path: hex digest, or the OSError that prevented reading it}."""
+    def one(path: str) -> str | OSError:
+        try:
+            return cached_sha256(path, cache)
+        except OSError as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(files, pool.map(one, files)))
+
+
+def relative_files(root: str) -> dict[str, str]:
+    """{path relative to root: path} for every regular file under root."""
+    files, _ = expand_paths([root])
+    return {os.path.relpath(path, root): path for path in files}
+
+
+def compare_trees(left: str, right: str, workers: int, cache: dict | None,
+                  subset: bool = False) -> tuple[list[tuple[str, str]], list[str]]:
+    """Compare two trees by relative path: ([(status, relpath)], errors).
+
+    status is "differs", "only-left" or "only-right"; identical files are not listed. Files of
+    different size differ without being read. With subset, only the files present in left are
+    considered (right may be a much larger tree, e.g. the live stack under /var/lib/ambari-server).
+    """
+    left_files = relative_files(left)
+    if subset:
+        # Only stat the counterparts instead of walking the whole right tree.
+        right_files = {rel: os.path.join(right, rel) for rel in left_files if os.path.isfile(os.path.join(right, rel))}
+    else:
+        right_files = relative_files(right)
+    report: list[tuple[str, str]] = [("only-left", rel) for rel in left_files if rel not in right_files]
+    if not subset:
+        report += [("only-right", rel) for rel in right_files if rel not in left_files]
+
+    common = []
+    for rel in sorted(set(left_files) & set(right_files)):
+        if os.path.getsize(left_files[rel]) != os.path.getsize(right_files[rel]):
+            report.append(("differs", rel))
+        else:
+            common.append(rel)
+    digests = hash_files([left_files[rel] for rel in common] + [right_files[rel] for rel in common], workers, cache)
+
+    errors = []
+    for rel in common:
+        a, b = digests[left_files[rel]], digests[right_files[rel]]
+        for path, result in ((left_files[rel], a), (right_files[rel], b)):
+            if isinstance(result, OSError):
+                errors.append(f"{path}: {result.strerror}")
+        if isinstance(a, OSError) or isinstance(b, OSError):
+            continue
+        if a != b:
+            report.append(("differs", rel))
+    return sorted(report, key=lambda item: item[1]), errors
+
+
+def default_workers() -> int:
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def main_compare_tree(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(prog="file_sha256.py compare-tree",
+                                description="List files that differ between two directory trees.")
+    p.add_argument("left")
+    p.add_argument("right")
+    p.add_argument("--subset", action="store_true",
+                   help="only compare files present in LEFT (do not report files only in RIGHT)")
+    p.add_argument("--workers", type=int, default=default_workers(), help="hashing threads (default: CPUs + 4, max 32)")
+    p.add_argument("--cache", help="JSON digest cache, reused across runs")
+    args = p.parse_args(argv)
+
+    for root in (args.left, args.right):
+        if not os.path.isdir(root):
+            eprint(f"{root}: not a directory")
+            return EXIT_ERROR
+
+    cache = load_cache(args.cache)
+    report, errors = compare_trees(args.left, args.right, max(1, args.workers), cache, args.subset)
+    save_cache(args.cache, cache)
+    for status, rel in report:
+        print(f"{status}  {rel}")
+    for error in errors:
+        eprint(error)
+    if errors:
+        return EXIT_ERROR
+    return EXIT_DIFFERENT if report else EXIT_OK
+
+
+def main(argv: list[str]) -> int:
+    if argv and argv[0] == "compare-tree":
+        return main_compare_tree(argv[1:])
+
+    p = argparse.ArgumentParser(description="SHA-256 of one file, or a manifest of many files/directories.",
+                                epilog="See also: file_sha256.py compare-tree --help")
+    p.add_argument("paths", nargs="+", help="files and/or directories")
+    p.add_argument("--workers", type=int, default=default_workers(),
+                   help="hashing threads in manifest mode (default: CPUs + 4, max 32)")
+    p.add_argument("--output", "-o", help="write the manifest here instead of stdout")
+    p.add_argument("--manifest", action="store_true", help="manifest output even for a single file")
+    p.add_argument("--cache", help="JSON digest cache, reused across runs")
+    args = p.parse_args(argv)
+
+    cache = load_cache(args.cache) if args.cache else None
+    if len(args.paths) == 1 and not args.manifest and not args.output and os.path.isfile(args.paths[0]):
+        try:
+            print(cached_sha256(args.paths[0], cache))
+        except OSError as exc:
+            eprint(f"{args.paths[0]}: {exc.strerror}")
+            return EXIT_ERROR
+        if cache is not None:
+            save_cache(args.cache, cache)
+        return EXIT_OK
+
+    files, missing = expand_paths(args.paths)
+    rc = EXIT_OK
+    for path in missing:
+        eprint(f"{path}: no such file or directory")
+        rc = EXIT_ERROR
+
+    lines: list[str] = []
+    for path, result in hash_files(files, max(1, args.workers), cache).items():
+        if isinstance(result, OSError):
+            eprint(f"{path}: {result.strerror}")
+            rc = EXIT_ERROR
+            continue
+        lines.append(f"{result}  {path}\n")
+    if cache is not None:
+        save_cache(args.cache, cache)
+
+    if args.output:
+        tmp = args.output + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp, args.output)
+    else:
+        sys.stdout.writelines(lines)
+    return rc
+
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        sys.stderr.write("Usage: file_sha256.py <path>\n")
-        raise SystemExit(1)
-    print(hashlib.sha256(pathlib.Path(sys.argv[1]).read_bytes()).hexdigest())
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,9 +1,107 @@
 #!/usr/bin/env python3.11
-"""Used by patch_ambari_java_home.sh: extract or write back configs.py JSON 'properties.content'."""
+"""Used by patch_ambari_java_home.sh: extract or write back configs.py JSON 'properties.content'.
+
+batch applies text rules to 'properties.content' of many configs.py JSON files in one process.
+Manifest (JSON; relative paths are resolved against the manifest's directory):
+
+  {"rules": {"<set>": [<rule>, ...]} | "<rules.json>",
+   "files": [{"input": "kafka-env.raw.json", "output": "kafka-env.new.json", "rules": "<set>"}, ...]}
+
+Rules, applied in order to the content text:
+  {"op": "replace", "pattern": "<regex>", "replacement": "<re.sub replacement>"}
+  {"op": "insert_after", "anchor": "<regex>", "line": "<text>", "unless": "<regex>"}
+      inserts line (with the anchor line's indentation) after the first line matching anchor;
+      skipped when unless matches any line, or when no line matches anchor.
+
+Only outputs whose content changed are written. One line per file on stdout:
+  changed<TAB><input><TAB><output>   |   unchanged<TAB><input>   |   error<TAB><input><TAB><reason>
+Exit 0 unless a file failed.
+"""
 import json
+import os
+import re
 import sys
 
-USAGE = "Usage: json_content_roundtrip.py extract <config.json> <content.txt>\n       json_content_roundtrip.py merge <config.json> <content.txt> <out.json>\n"
+USAGE = ("Usage: json_content_roundtrip.py extract <config.json> <content.txt>\n"
+         "       json_content_roundtrip.py merge <config.json> <content.txt> <out.json>\n"
+         "       json_content_roundtrip.py batch <manifest.json> [--dry-run]\n")
+
+
+def apply_rule(text: str, rule: dict) -> str:
+    op = rule.get("op")
+    if op == "replace":
+        return re.sub(rule["pattern"], rule["replacement"], text, flags=re.MULTILINE)
+    if op == "insert_after":
+        lines = text.splitlines(keepends=True)
+        if rule.get("unless") and any(re.search(rule["unless"], line) for line in lines):
+            return text
+        anchor = re.compile(rule["anchor"])
+        for i, line in enumerate(lines):
+            if anchor.search(line):
+                indent = line[:len(line) - len(line.lstrip(" \t"))]
+                if not line.endswith("\n"):
+                    lines[i] = line + "\n"
+                lines.insert(i + 1, indent + rule["line"] + "\n")
+                return "".join(lines)
+        return text
+    raise ValueError(f"unknown rule op {op!r} (expected replace, insert_after)")
+
+
+def apply_rules(text: str, rules: list) -> str:
+    for rule in rules:
+        text = apply_rule(text, rule)
+    return text
+
+
+def load_manifest(path: str) -> tuple[dict, list]:
+    """Return (rule sets, file entries) with every path made absolute."""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    rules = manifest.get("rules") or {}
+    if isinstance(rules, str):
+        with open(os.path.join(base, rules), encoding="utf-8") as f:
+            rules = json.load(f)
+    entries = []
+    for entry in manifest.get("files") or []:
+        entry = dict(entry)
+        for key in ("input", "output"):
+            entry[key] = os.path.join(base, entry.get(key) or entry["input"])
+        entries.append(entry)
+    return rules, entries
+
+
+def batch(manifest_path: str, dry_run: bool) -> int:
+    try:
+        rules, entries = load_manifest(manifest_path)
+    except (OSError, ValueError, KeyError) as exc:
+        sys.stderr.write(f"Cannot load manifest {manifest_path}: {exc}\n")
+        return 1
+    rc = 0
+    for entry in entries:
+        src = entry["input"]
+        try:
+            rule_list = entry["rules"] if isinstance(entry["rules"], list) else rules[entry["rules"]]
+            with open(src, encoding="utf-8") as f:
+                data = json.load(f)
+            props = data.get("properties")
+            if not isinstance(props, dict) or "content" not in props:
+                raise ValueError("JSON missing properties.content")
+            before = props["content"] or ""
+            after = apply_rules(before, rule_list)
+        except (OSError, ValueError, KeyError, re.error) as exc:
+            print(f"error\t{src}\t{exc}")
+            rc = 1
+            continue
+        if after == before:
+            print(f"unchanged\t{src}")
+            continue
+        if not dry_run:
+            props["content"] = after
+            with open(entry["output"], "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        print(f"changed\t{src}\t{entry['output']}")
+    return rc
 
 
 def main() -> int:
@@ -43,6 +141,11 @@ def main() -> int:
         with open(outpath, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
         return 0
+    if cmd == "batch":
+        if len(sys.argv) not in (3, 4) or (len(sys.argv) == 4 and sys.argv[3] != "--dry-run"):
+            sys.stderr.write(USAGE)
+            return 1
+        return batch(sys.argv[2], len(sys.argv) == 4)
     sys.stderr.write(USAGE)
     return 1
 
@@ -3,7 +3,7 @@
 # ODP-6189: Use Ambari's JDK (ambari_java_home) for CredentialUtil on ODP 3.3 / Ambari Server.
 #
 # Stack: replace whole .py files from ./files/... (timestamped backup under BACKUP_ROOT).
-# Cluster: configs.py get -> extract content -> sed/awk -> merge JSON -> configs.py set.
+# Cluster: configs.py get (each type) -> one json_content_roundtrip.py batch -> configs.py set (changed types only).
 # After stack *.py changes: restart ambari-agent (and services) so agents drop stale cache — see README.
 #
 # Run on the Ambari Server (root for stack writes under /var/lib/ambari-server/resources).
@@ -23,12 +23,21 @@ CONFIGS_PYTHON_BIN="${CONFIGS_PYTHON_BIN:-$PYTHON_BIN}"
 JSON_TOOL="$SCRIPT_DIR/lib/json_content_roundtrip.py"
 CLUSTER_TOOL="$SCRIPT_DIR/lib/ambari_cluster_name.py"
 SHA256_TOOL="$SCRIPT_DIR/lib/file_sha256.py"
+RULES_FILE="$SCRIPT_DIR/lib/ambari_java_home_rules.json"
 
 AMBARI_HOST="${AMBARI_HOST:-$(hostname -f)}"
 AMBARI_PORT="${AMBARI_PORT-}"
 AMBARI_PROTOCOL="${AMBARI_PROTOCOL:-http}"
 VERSION_NOTE="${VERSION_NOTE:-ODP-6189 ambari_java_home for CredentialUtil (ce-utils util-3.3.6.3-101)}"
 BACKUP_ROOT="${BACKUP_ROOT:-$SCRIPT_DIR/backups}"
+SHA256_CACHE="${SHA256_CACHE:-$BACKUP_ROOT/.sha256-cache.json}"
+
+# Cluster config types whose `content` gets the CredentialUtil rule set (ENV_RULE_SET in RULES_FILE).
+CONFIG_TYPES=(
+  "kafka-env"
+  "cruise-control-env"
+)
+ENV_RULE_SET="credentialutil-java"
 
 STACK_PY_RELS=(
   "stacks/ODP/3.3/services/DRUID/package/scripts/params.py"
@@ -50,7 +59,9 @@ Usage: patch_ambari_java_home.sh [options]
   -h, --help            This help
 
 Env: AMBARI_USER, AMBARI_PASSWORD, CLUSTER (optional), AMBARI_HOST, AMBARI_PORT (1-65535, default 8080),
-     AMBARI_PROTOCOL (http|https), AMBARI_RESOURCES, BACKUP_ROOT, PYTHON_BIN (default python3.11),
+     AMBARI_PROTOCOL (http|https), AMBARI_RESOURCES, BACKUP_ROOT, SHA256_CACHE (digest cache for stack file
+     comparison, default BACKUP_ROOT/.sha256-cache.json), CLUSTER_NAME_CACHE (optional JSON cache for
+     cluster autodiscovery), PYTHON_BIN (default python3.11),
      CONFIGS_PYTHON_BIN (defaults to PYTHON_BIN; set e.g. python2 only for configs.py),
      AMBARI_SSL_VERIFY_STRICT (set to 1 with https to omit configs.py --unsafe; default is verify skip for self-signed)
 EOF
@@ -103,10 +114,6 @@ require_ambari_server_node() {
   fi
 }
 
-file_sha256() {
-  "$PYTHON_BIN" "$SHA256_TOOL" "$1"
-}
-
 need_stack_prereqs() {
   local d="$AMBARI_RESOURCES/stacks/ODP/3.3"
   [[ -d "$d" ]] || die "Missing stack dir: $d (wrong AMBARI_RESOURCES?)"
@@ -130,71 +137,59 @@ ensure_stack_py_sources() {
   fi
 }
 
+# files/ vs. $AMBARI_RESOURCES in one compare-tree pass; digests are cached in SHA256_CACHE, so files
+# unchanged since the last run (same inode/size/mtime) are not read again. Fills STACK_PY_STATUS[rel]
+# with differs / only-left (target missing); files not listed match the bundle.
+declare -A STACK_PY_STATUS=()
+load_stack_py_status() {
+  local out rc line
+  mkdir -p "$(dirname "$SHA256_CACHE")" 2>/dev/null || true
+  set +e
+  out="$("$PYTHON_BIN" "$SHA256_TOOL" compare-tree --subset --cache "$SHA256_CACHE" "$SCRIPT_DIR/files" "$AMBARI_RESOURCES")"
+  rc=$?
+  set -e
+  [[ "$rc" -eq 0 || "$rc" -eq 2 ]] || die "file_sha256.py compare-tree failed (rc=$rc)"
+  while IFS= read -r line; do
+    if [[ -n "$line" ]]; then
+      STACK_PY_STATUS["${line#*  }"]="${line%%  *}"
+    fi
+  done <<<"$out"
+}
+
 replace_stack_py_files() {
   ensure_stack_py_sources
-  local stamp bdir rel src dst
+  load_stack_py_status
+  local stamp bdir rel src dst status installed=0
   stamp="$(date +%Y%m%d%H%M%S)"
   bdir="$BACKUP_ROOT/$stamp"
   for rel in "${STACK_PY_RELS[@]}"; do
     src="$SCRIPT_DIR/files/$rel"
     dst="$AMBARI_RESOURCES/$rel"
+    status="${STACK_PY_STATUS[$rel]:-same}"
     if [[ "$DRY_RUN" -eq 1 ]]; then
-      if [[ ! -f "$dst" ]]; then
-        log "DRY-RUN: target missing: $dst"
-      elif cmp -s "$src" "$dst"; then
-        log "DRY-RUN: $rel unchanged (matches bundle)"
-      else
-        log "DRY-RUN: would replace $rel"
-      fi
+      case "$status" in
+        only-left) log "DRY-RUN: target missing: $dst" ;;
+        same) log "DRY-RUN: $rel unchanged (matches bundle)" ;;
+        *) log "DRY-RUN: would replace $rel" ;;
+      esac
+      continue
+    fi
+    [[ "$status" != "only-left" ]] || die "Target missing on server: $dst"
+    if [[ "$status" == "same" ]]; then
+      log "$rel unchanged (matches bundle); skip."
       continue
     fi
-    [[ -f "$dst" ]] || die "Target missing on server: $dst"
     mkdir -p "$bdir/$(dirname "$rel")"
     cp -a "$dst" "$bdir/$rel"
     cp -a "$src" "$dst"
+    installed=$((installed + 1))
     log "Installed $rel (backup: $bdir/$rel)"
   done
-  if [[ "$DRY_RUN" -eq 0 ]]; then
+  if [[ "$DRY_RUN" -eq 0 && "$installed" -gt 0 ]]; then
     log "Stack Python backups: $bdir"
   fi
 }
 
-# CredentialUtil: PATH java -> $AMBARI_JAVA_HOME/bin/java; export AMBARI_JAVA_HOME after JAVA_HOME.
-transform_env_content_file() {
-  local f="$1" tmp
-  tmp="$(mktemp "${f}.tmp.XXXXXX")" || die "mktemp failed for $f"
-  sed 's|`java -cp "/var/lib/ambari-agent/cred/lib/\*"|`$AMBARI_JAVA_HOME/bin/java -cp "/var/lib/ambari-agent/cred/lib/*"|g' "$f" >"$tmp" || {
-    rm -f "$tmp"
-    die "sed failed on $f"
-  }
-  mv "$tmp" "$f" || {
-    rm -f "$tmp"
-    die "mv failed for $f"
-  }
-  if grep -qE '^[[:space:]]*export AMBARI_JAVA_HOME=' "$f"; then
-    return 0
-  fi
-  tmp="$(mktemp "${f}.tmp.XXXXXX")" || die "mktemp failed for $f"
-  awk '
-    /^[[:space:]]*export JAVA_HOME=/ && !done {
-      print
-      match($0, /^[[:space:]]*/)
-      indent = substr($0, 1, RLENGTH)
-      print indent "export AMBARI_JAVA_HOME={{ambari_java_home}}"
-      done = 1
-      next
-    }
-    { print }
-  ' "$f" >"$tmp" || {
-    rm -f "$tmp"
-    die "awk failed on $f"
-  }
-  mv "$tmp" "$f" || {
-    rm -f "$tmp"
-    die "mv failed for $f"
-  }
-}
-
 # Autodiscover cluster via lib/ambari_cluster_name.py (urllib + JSON).
 detect_cluster_name() {
   if [[ -n "${CLUSTER:-}" ]]; then
@@ -205,13 +200,14 @@ detect_cluster_name() {
     return 1
   fi
   [[ -f "$CLUSTER_TOOL" ]] || die "Missing $CLUSTER_TOOL"
-  local insecure=() err_tmp rc out multi
+  local insecure=() cache=() err_tmp rc out multi
   [[ "${AMBARI_PROTOCOL}" == "https" ]] && insecure=(--insecure)
+  [[ -n "${CLUSTER_NAME_CACHE:-}" ]] && cache=(--cache "$CLUSTER_NAME_CACHE")
   err_tmp="$(mktemp "${TMPDIR:-/tmp}/amb-cn-err.XXXXXX")"
   set +e
   out="$("$PYTHON_BIN" "$CLUSTER_TOOL" \
     --host "$AMBARI_HOST" --port "$AMBARI_PORT" --protocol "$AMBARI_PROTOCOL" \
-    --user "$AMBARI_USER" --password "$AMBARI_PASSWORD" "${insecure[@]}" 2>"$err_tmp")"
+    --user "$AMBARI_USER" --password "$AMBARI_PASSWORD" "${insecure[@]}" "${cache[@]}" 2>"$err_tmp")"
   rc=$?
   set -e
   if [[ "$rc" -eq 0 ]]; then
@@ -229,56 +225,71 @@ detect_cluster_name() {
   return 1
 }
 
-patch_cluster_config_type() {
-  local config_type="$1"
-  local work="$2"
-  local raw="${work}/${config_type}.raw.json"
-  local new="${work}/${config_type}.new.json"
-  local content="${work}/${config_type}.content.sh"
-
-  log "configs.py get: ${config_type}"
-  local ssl_flag=()
+configs_py_ssl_flags() {
+  CONFIGS_SSL_FLAGS=()
   if [[ "${AMBARI_PROTOCOL}" == "https" ]]; then
-    ssl_flag=(-s https)
-    [[ "${AMBARI_SSL_VERIFY_STRICT:-0}" == "1" ]] || ssl_flag+=(--unsafe)
+    CONFIGS_SSL_FLAGS=(-s https)
+    [[ "${AMBARI_SSL_VERIFY_STRICT:-0}" == "1" ]] || CONFIGS_SSL_FLAGS+=(--unsafe)
   fi
+}
 
-  local err
+# configs.py get into $2; returns 1 if the config type does not exist on this cluster.
+get_cluster_config_type() {
+  local config_type="$1" raw="$2" err
+  log "configs.py get: ${config_type}"
   err="$("$CONFIGS_PYTHON_BIN" "$CONFIGS_PY" \
-    -u "$AMBARI_USER" -p "$AMBARI_PASSWORD" "${ssl_flag[@]}" -a get -t "$AMBARI_PORT" \
+    -u "$AMBARI_USER" -p "$AMBARI_PASSWORD" "${CONFIGS_SSL_FLAGS[@]}" -a get -t "$AMBARI_PORT" \
     -l "$AMBARI_HOST" -n "$CLUSTER" -c "$config_type" -f "$raw" 2>&1)" || {
     if echo "$err" | grep -qiE 'not found|missing'; then
       log "Config type ${config_type} not present; skip."
-      return 0
+      return 1
     fi
     die "configs.py get failed (${config_type}): $err"
   }
+}
 
-  "$PYTHON_BIN" "$JSON_TOOL" extract "$raw" "$content" || die "extract content failed (${config_type})"
-
-  local before after
-  before="$(file_sha256 "$content")"
-  transform_env_content_file "$content"
-  after="$(file_sha256 "$content")"
-
-  if [[ "$before" == "$after" ]]; then
-    log "${config_type}: content unchanged; skip set."
-    return 0
-  fi
-
-  "$PYTHON_BIN" "$JSON_TOOL" merge "$raw" "$content" "$new" || die "merge failed (${config_type})"
-
-  if [[ "$DRY_RUN" -eq 1 ]]; then
-    log "DRY-RUN: would configs.py set ${config_type}"
-    return 0
-  fi
+# Get every type in CONFIG_TYPES, transform all their content in one json_content_roundtrip.py batch
+# (rules: lib/ambari_java_home_rules.json), then configs.py set only the types that changed.
+patch_cluster_config_types() {
+  local work="$1" config_type manifest status src out line err
+  local fetched=()
+  manifest="${work}/manifest.json"
+  configs_py_ssl_flags
 
-  log "configs.py set: ${config_type}"
-  err="$("$CONFIGS_PYTHON_BIN" "$CONFIGS_PY" \
-    -u "$AMBARI_USER" -p "$AMBARI_PASSWORD" "${ssl_flag[@]}" -a set -t "$AMBARI_PORT" \
-    -l "$AMBARI_HOST" -n "$CLUSTER" -c "$config_type" -f "$new" \
-    -b "$VERSION_NOTE" 2>&1)" || die "configs.py set failed (${config_type}): $err"
-  log "Updated ${config_type}."
+  for config_type in "${CONFIG_TYPES[@]}"; do
+    get_cluster_config_type "$config_type" "${work}/${config_type}.raw.json" && fetched+=("$config_type")
+  done
+  [[ "${#fetched[@]}" -gt 0 ]] || return 0
+
+  # json.dump, so paths with quotes or backslashes still give a valid manifest
+  "$PYTHON_BIN" -c '
+import json, sys
+rules, rule_set, manifest = sys.argv[1:4]
+files = [{"input": t + ".raw.json", "output": t + ".new.json", "rules": rule_set} for t in sys.argv[4:]]
+with open(manifest, "w") as f:
+    json.dump({"rules": rules, "files": files}, f)
+' "$RULES_FILE" "$ENV_RULE_SET" "$manifest" "${fetched[@]}" || die "could not write ${manifest}"
+
+  out="$("$PYTHON_BIN" "$JSON_TOOL" batch "$manifest")" || die "content transform failed: $out"
+
+  while IFS=$'\t' read -r status src line; do
+    [[ -n "$status" ]] || continue
+    config_type="$(basename "$src" .raw.json)"
+    if [[ "$status" == "unchanged" ]]; then
+      log "${config_type}: content unchanged; skip set."
+      continue
+    fi
+    if [[ "$DRY_RUN" -eq 1 ]]; then
+      log "DRY-RUN: would configs.py set ${config_type}"
+      continue
+    fi
+    log "configs.py set: ${config_type}"
+    err="$("$CONFIGS_PYTHON_BIN" "$CONFIGS_PY" \
+      -u "$AMBARI_USER" -p "$AMBARI_PASSWORD" "${CONFIGS_SSL_FLAGS[@]}" -a set -t "$AMBARI_PORT" \
+      -l "$AMBARI_HOST" -n "$CLUSTER" -c "$config_type" -f "$line" \
+      -b "$VERSION_NOTE" 2>&1)" || die "configs.py set failed (${config_type}): $err"
+    log "Updated ${config_type}."
+  done <<<"$out"
 }
 
 main() {
@@ -293,12 +304,13 @@ main() {
   fi
 
   need_stack_prereqs
+  [[ -f "$SHA256_TOOL" ]] || die "Missing $SHA256_TOOL"
 
   if [[ "$DO_CLUSTER_CONFIG" -eq 1 ]]; then
     [[ -f "$CONFIGS_PY" ]] || die "Missing $CONFIGS_PY"
     [[ -f "$JSON_TOOL" ]] || die "Missing $JSON_TOOL"
+    [[ -f "$RULES_FILE" ]] || die "Missing $RULES_FILE"
     [[ -f "$CLUSTER_TOOL" ]] || die "Missing $CLUSTER_TOOL"
-    [[ -f "$SHA256_TOOL" ]] || die "Missing $SHA256_TOOL"
   fi
 
   if [[ "$DO_STACK_PYTHON" -eq 1 ]]; then
@@ -318,8 +330,7 @@ main() {
     _JAVA_HOME_PATCH_WORK="$(mktemp -d "${TMPDIR:-/tmp}/ambari-java-home.XXXXXX")"
     trap 'rm -rf "${_JAVA_HOME_PATCH_WORK:-}"' EXIT
 
-    patch_cluster_config_type "kafka-env" "$_JAVA_HOME_PATCH_WORK"
-    patch_cluster_config_type "cruise-control-env" "$_JAVA_HOME_PATCH_WORK"
+    patch_cluster_config_types "$_JAVA_HOME_PATCH_WORK"
 
     trap - EXIT
     rm -rf "${_JAVA_HOME_PATCH_WORK}"